@@ -0,0 +1,88 @@
+"""Parity and throughput of the embedding backends.
+
+Run from the api/ directory:
+
+    python -m benchmarks.embedding_backends
+    python -m benchmarks.embedding_backends --threads 4 --sentences 2000
+
+Encodes the same sentences with the torch SentenceTransformer (the
+reference), the ONNX Runtime float32 graph and the dynamically int8
+quantized graph. For each ONNX variant it reports the min and mean cosine
+similarity to the torch embeddings, whether the tolerance documented in
+engine/ml_models/onnx_model.py holds, and sentences per second for
+single-sentence calls and for batches.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from engine.ml_models.embedding_toolbox import EmbeddingToolbox
+
+TOLERANCE = {"onnx": 0.9999, "onnx-int8": 0.98}
+WORDS = ("coffee matcha hike pottery startup networking jazz rust python climbing brunch museum "
+         "volunteer yoga founders design photography board games trivia salsa").split()
+
+
+def corpus(count: int, seed: int) -> list[str]:
+    rng = np.random.default_rng(seed)
+    sentences = []
+    for _ in range(count):
+        words = rng.choice(WORDS, size=rng.integers(4, 40))
+        tags = " ".join(f"#{tag}" for tag in rng.choice(WORDS, size=3, replace=False))
+        sentences.append(" ".join(words) + " " + tags)
+    return sentences
+
+
+def throughput(model, sentences: list[str], batch_size: int) -> tuple[float, float]:
+    start = time.perf_counter()
+    for sentence in sentences[:200]:
+        model.encode(sentence, convert_to_numpy=True, normalize_embeddings=True)
+    single = min(200, len(sentences)) / (time.perf_counter() - start)
+
+    start = time.perf_counter()
+    model.encode(sentences, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+    batched = len(sentences) / (time.perf_counter() - start)
+    return single, batched
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--sentences", type=int, default=1000)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--threads", type=int, help="CPU threads for every backend")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    sentences = corpus(args.sentences, args.seed)
+    variants = {
+        "torch": dict(backend="torch"),
+        "onnx": dict(backend="onnx"),
+        "onnx-int8": dict(backend="onnx", onnx_quantize=True),
+    }
+
+    reference = None
+    print(f"{len(sentences)} sentences, batch size {args.batch_size}, threads {args.threads or 'all'}\n")
+    header = f"{'backend':<12}{'min cos':>10}{'mean cos':>10}{'within tol':>12}{'single/s':>10}{'batch/s':>10}"
+    print(header)
+    print("-" * len(header))
+    for name, options in variants.items():
+        toolbox = EmbeddingToolbox(model_name=args.model, threads=args.threads, **options)
+        toolbox.instantiate()
+        model = toolbox.model
+        model.encode(sentences[:32], batch_size=args.batch_size)  # warm up
+
+        vectors = np.asarray(model.encode(sentences, batch_size=args.batch_size, convert_to_numpy=True,
+                                          normalize_embeddings=True), dtype=np.float32)
+        if reference is None:
+            reference = vectors
+        cosines = (vectors * reference).sum(axis=1)
+        ok = "reference" if name == "torch" else ("yes" if cosines.min() >= TOLERANCE[name] else "NO")
+        single, batched = throughput(model, sentences, args.batch_size)
+        print(f"{name:<12}{cosines.min():>10.5f}{cosines.mean():>10.5f}{ok:>12}{single:>10.0f}{batched:>10.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+"""Encode throughput with and without micro-batching under concurrency.
+
+Run from the api/ directory:
+
+    python -m benchmarks.embedding_batching
+    python -m benchmarks.embedding_batching --threads 32 --requests 2000 --max-wait-ms 2
+
+Simulates concurrent create_event / create_user / feed calls: every thread
+encodes one sentence per call, first straight against the model and then
+through an EmbeddingBatcher, and reports sentences per second, latency
+percentiles and the batcher's average batch size.
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+import numpy as np
+
+from engine.ml_models.embedding_batcher import EmbeddingBatcher
+
+SENTENCES = [
+    "Weekend pottery class for beginners #art #hands-on",
+    "Startup founders breakfast and pitch practice #networking #career",
+    "Sunset trail run followed by smoothies #fitness #outdoors",
+    "Intro to Rust systems programming meetup #tech #learning",
+    "Board game night at the community cafe #games #social",
+]
+
+
+def run(model, threads: int, requests: int) -> tuple[float, list[float]]:
+    latencies: list[float] = []
+    lock = threading.Lock()
+    per_thread = requests // threads
+
+    def worker(offset: int):
+        local = []
+        for i in range(per_thread):
+            start = time.perf_counter()
+            model.encode(SENTENCES[(offset + i) % len(SENTENCES)] + f" {i}", convert_to_numpy=True,
+                         normalize_embeddings=True)
+            local.append(time.perf_counter() - start)
+        with lock:
+            latencies.extend(local)
+
+    start = time.perf_counter()
+    pool = [threading.Thread(target=worker, args=(t,)) for t in range(threads)]
+    for thread in pool:
+        thread.start()
+    for thread in pool:
+        thread.join()
+    return len(latencies) / (time.perf_counter() - start), latencies
+
+
+def report(label: str, throughput: float, latencies: list[float]):
+    ms = np.array(latencies) * 1000
+    print(f"{label:<12}{throughput:>10.0f}/s{statistics.median(ms):>10.1f}{np.percentile(ms, 95):>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--max-batch", type=int, default=64)
+    parser.add_argument("--max-wait-ms", type=float, default=5.0)
+    args = parser.parse_args()
+
+    from sentence_transformers import SentenceTransformer
+    model = SentenceTransformer(args.model)
+    model.encode(SENTENCES)  # warm up
+
+    print(f"{args.threads} threads, {args.requests} single-sentence encodes\n")
+    print(f"{'mode':<12}{'throughput':>12}{'p50 ms':>10}{'p95 ms':>10}")
+    report("direct", *run(model, args.threads, args.requests))
+    batcher = EmbeddingBatcher(model, args.max_batch, args.max_wait_ms / 1000)
+    report("batched", *run(batcher, args.threads, args.requests))
+    print(f"\navg batch size {batcher.stats()['avg_batch_size']:.1f}")
+    batcher.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""End-to-end check of the pgvector backend (sql/001_match_events.sql).
+
+Run from the api/ directory against a database with the events table and
+match_events installed (e.g. `supabase start` plus the sql/ files):
+
+    python -m benchmarks.pgvector_recall
+    python -m benchmarks.pgvector_recall --top-k 50 --seen 0 200 1000 5000
+
+For each mode and seen-list size it queries `PgVectorIndex.search` with
+vectors near real events and checks that it returns exactly
+min(k, unseen events) rows, none of them seen. Half of each seen list is the
+query's own nearest events (a heavy swiper has swiped the closest matches
+first), which is the case a post-filtered HNSW scan fails on. Recall@k
+against exact search over the in-memory catalog is reported alongside.
+Exits non-zero if any query comes back short or contains a seen id.
+"""
+
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+from dotenv import load_dotenv
+from supabase import create_client
+
+from engine.event_catalog import EventCatalog
+from engine.pgvector_index import PgVectorIndex
+
+
+def seen_list(exact, query: np.ndarray, size: int, ids: np.ndarray, rng) -> list[int]:
+    """Half nearest events to the query, half random ones."""
+    nearest = exact.search(query, [], size // 2)
+    random_ids = rng.choice(ids, size=min(size - len(nearest), len(ids)), replace=False).tolist()
+    return list(dict.fromkeys(nearest + random_ids))
+
+
+def run(supabase, catalog: EventCatalog, matcha_mode: bool, top_k: int, seen_sizes: list[int], queries: int,
+        rng) -> int:
+    exact = catalog.index(matcha_mode)
+    ids = np.asarray(exact.ids)
+    if len(ids) == 0:
+        print(f"{'matcha' if matcha_mode else 'coffee'}: no events, skipped")
+        return 0
+    index = PgVectorIndex(supabase, matcha_mode)
+    failures = 0
+
+    print(f"{'matcha' if matcha_mode else 'coffee'}: {len(ids)} events, top_k={top_k}")
+    header = f"{'seen':>8}{'expected':>10}{'min rows':>10}{'recall@k':>10}{'ms/query':>10}  status"
+    print(header)
+    print("-" * len(header))
+    for size in seen_sizes:
+        size = min(size, len(ids))
+        counts, recalls, elapsed, bad = [], [], 0.0, 0
+        expected = None
+        for _ in range(queries):
+            anchor = exact.matrix[rng.integers(0, len(ids))]
+            query = anchor + 0.3 * rng.normal(size=anchor.shape)
+            query = (query / np.linalg.norm(query)).astype(np.float32)
+            seen = seen_list(exact, query, size, ids, rng)
+            expected = min(top_k, len(ids) - len(set(seen)))
+
+            start = time.perf_counter()
+            result = index.search(query, seen, top_k)
+            elapsed += time.perf_counter() - start
+
+            truth = exact.search(query, seen, top_k)
+            counts.append(len(result))
+            recalls.append(len(set(result) & set(truth)) / max(len(truth), 1))
+            if len(result) != expected or set(result) & set(seen):
+                bad += 1
+        failures += bad
+        status = "ok" if not bad else f"FAIL ({bad}/{queries})"
+        print(f"{size:>8}{expected:>10}{min(counts):>10}{np.mean(recalls):>10.4f}"
+              f"{elapsed / queries * 1000:>10.2f}  {status}")
+    print()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--top-k", type=int, default=int(os.environ.get("RECOMMENDATION_QUEUE_SIZE", "50")))
+    parser.add_argument("--seen", type=int, nargs="+", default=[0, 200, 1000, 5000],
+                        help="seen-list sizes to test")
+    parser.add_argument("--queries", type=int, default=20, help="queries per mode and seen size")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    load_dotenv()
+    supabase = create_client(os.environ.get("SUPABASE_URL", ""), os.environ.get("SUPABASE_KEY", ""))
+    catalog = EventCatalog(supabase)
+    catalog.load()
+
+    rng = np.random.default_rng(args.seed)
+    failures = sum(run(supabase, catalog, mode, args.top_k, args.seen, args.queries, rng) for mode in (True, False))
+    if failures:
+        print(f"{failures} queries returned short or seen results")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,94 @@
+"""Accuracy and speed of quantized event scoring against full precision.
+
+Run from the api/ directory:
+
+    python -m benchmarks.quantization_accuracy
+    python -m benchmarks.quantization_accuracy --events 1000000 --queries 200
+    python -m benchmarks.quantization_accuracy --vectors catalog.npy
+
+For every precision it reports recall@k against exact float32 search (codes
+only, and with the float32 re-rank read from the spill file or from memory),
+the mean absolute error of the approximate scores, vector storage held in
+memory per event and mean search latency. Without --vectors
+the catalog is synthetic: normalized 384-dim vectors drawn around random
+topic centroids, which is closer to real MiniLM embeddings than pure noise.
+"""
+
+import argparse
+import time
+
+import numpy as np
+
+from engine.event_index import EventIndex
+from engine.quantized_index import QuantizedEventIndex
+
+
+def synthetic_catalog(events: int, dim: int, topics: int, seed: int) -> np.ndarray:
+    rng = np.random.default_rng(seed)
+    centroids = rng.normal(size=(topics, dim))
+    vectors = centroids[rng.integers(0, topics, events)] + 0.6 * rng.normal(size=(events, dim))
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def build(index: EventIndex, vectors: np.ndarray) -> EventIndex:
+    for event_id, vector in enumerate(vectors):
+        index.add(event_id, vector)
+    return index
+
+
+def run(vectors: np.ndarray, queries: int, top_k: int, seen: int, seed: int):
+    rng = np.random.default_rng(seed + 1)
+    events, dim = vectors.shape
+
+    query_vectors = vectors[rng.integers(0, events, queries)] + 0.3 * rng.normal(size=(queries, dim))
+    query_vectors = (query_vectors / np.linalg.norm(query_vectors, axis=1, keepdims=True)).astype(np.float32)
+    seen_lists = [rng.integers(0, events, seen).tolist() for _ in range(queries)]
+
+    exact = build(EventIndex(dim=dim, capacity=events), vectors)
+    start = time.perf_counter()
+    truth = [exact.search(q, s, top_k) for q, s in zip(query_vectors, seen_lists)]
+    exact_ms = (time.perf_counter() - start) / queries * 1000
+
+    print(f"{events} events x {dim} dims, {queries} queries, top_k={top_k}, {seen} seen per query\n")
+    header = f"{'index':<30}{'recall@k':>10}{'score MAE':>12}{'bytes/event':>13}{'ms/query':>10}"
+    print(header)
+    print("-" * len(header))
+    print(f"{'float32 exact':<30}{1.0:>10.4f}{0.0:>12.2e}{exact._matrix.nbytes / exact._matrix.shape[0]:>13.0f}{exact_ms:>10.2f}")
+
+    for precision in ("float16", "int8"):
+        for suffix, options in (("", {"rerank": 0}), (" + f32 rerank spilled", {}),
+                                (" + f32 rerank in memory", {"keep_full": True})):
+            index = build(QuantizedEventIndex(dim=dim, capacity=events, precision=precision, **options), vectors)
+
+            start = time.perf_counter()
+            results = [index.search(q, s, top_k) for q, s in zip(query_vectors, seen_lists)]
+            elapsed_ms = (time.perf_counter() - start) / queries * 1000
+
+            recall = np.mean([len(set(r) & set(t)) / max(len(t), 1) for r, t in zip(results, truth)])
+            errors = [np.abs(index.approximate_scores(q) - exact.matrix @ q).mean() for q in query_vectors[:20]]
+            label = precision + suffix
+            print(f"{label:<30}{recall:>10.4f}{np.mean(errors):>12.2e}{index.nbytes / index._codes.shape[0]:>13.0f}{elapsed_ms:>10.2f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--events", type=int, default=200000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--topics", type=int, default=500)
+    parser.add_argument("--queries", type=int, default=100)
+    parser.add_argument("--top-k", type=int, default=10)
+    parser.add_argument("--seen", type=int, default=200, help="seen ids excluded per query")
+    parser.add_argument("--vectors", help=".npy file of normalized event vectors to use instead of synthetic data")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    if args.vectors:
+        vectors = np.load(args.vectors).astype(np.float32)
+    else:
+        vectors = synthetic_catalog(args.events, args.dim, args.topics, args.seed)
+    run(vectors, args.queries, args.top_k, args.seen, args.seed)
+
+
+if __name__ == "__main__":
+    main()
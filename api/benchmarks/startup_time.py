@@ -0,0 +1,65 @@
+"""Cold-start time of the API module.
+
+Run from the api/ directory:
+
+    python -m benchmarks.startup_time
+    python -m benchmarks.startup_time --runs 10 --top 15
+
+Imports `main` in fresh interpreters and reports the import time (what
+every worker pays before serving), then lists the slowest modules `main`
+imports according to `python -X importtime`. The embedding model and the event catalog load in
+the background after startup and are reported by GET /health instead.
+"""
+
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+PROBE = "import main"
+
+
+def time_import(env: dict) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", PROBE], check=True, env=env,
+                   stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    return time.perf_counter() - start
+
+
+def slowest_modules(env: dict, top: int) -> list[tuple[int, str]]:
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", PROBE], env=env,
+                            stdout=subprocess.DEVNULL, stderr=subprocess.PIPE, text=True, check=True)
+    rows = []
+    for line in result.stderr.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:"):].split("|")
+        # Only modules imported directly by main (one level of nesting), deeper
+        # ones are already in their parent's total
+        if len(name) - len(name.lstrip()) != 3:
+            continue
+        rows.append((int(cumulative), name.strip()))
+    return sorted(rows, reverse=True)[:top]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=10, help="slowest direct imports of main to list")
+    args = parser.parse_args()
+
+    env = dict(os.environ)
+    env.setdefault("SUPABASE_URL", "http://localhost:54321")
+    env.setdefault("SUPABASE_KEY", "x" * 40)
+
+    times = [time_import(env) for _ in range(args.runs)]
+    print(f"import main: median {statistics.median(times):.3f}s, min {min(times):.3f}s over {args.runs} runs\n")
+    print(f"{'cumulative':>12}  module")
+    for cumulative, name in slowest_modules(env, args.top):
+        print(f"{cumulative / 1e6:>11.3f}s  {name}")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,3 +1,3 @@
-from .analytics import generate_dashboard
+from .analytics import generate_dashboard, agenerate_dashboard
 
-__all__ = ["generate_dashboard"]
\ No newline at end of file
+__all__ = ["generate_dashboard", "agenerate_dashboard"]
\ No newline at end of file
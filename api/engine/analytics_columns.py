@@ -0,0 +1,292 @@
+"""Columnar analytics.
+
+`AnalyticsColumns` holds analytics rows as parallel NumPy arrays (user_id,
+event_id, liked, time_spent, matcha_mode) instead of a list of pydantic
+objects. Every metric `aggregate_mode` reports is a count or a time sum over
+one of four (mode, liked) cells, so a single weighted `np.bincount` over a
+cell code yields both modes at once, and adding a group key to the code
+gives per-user, per-cohort or platform-wide aggregates over millions of rows
+in the same single pass.
+
+`aggregate_modes` returns exactly what `analytics.aggregate_mode` returns for
+each mode (sums are accumulated in row order, like Python's `sum`).
+"""
+
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+# Cell code = mode * 2 + liked; rows with an unknown mode get -1 and are skipped
+CELLS = 4
+COLUMNS = "id, user_id, event_id, time_spent, liked, matcha_mode"
+
+
+def _field(row, name: str):
+    return row.get(name) if isinstance(row, dict) else getattr(row, name, None)
+
+
+class AnalyticsColumns:
+    def __init__(self, user_id: np.ndarray, event_id: np.ndarray, liked: np.ndarray,
+                 time_spent: np.ndarray, matcha_mode: np.ndarray, has_time: Optional[np.ndarray] = None):
+        """
+        :param user_id: int64 user ids (-1 when missing)
+        :type user_id: ndarray
+        :param event_id: int64 event ids (-1 when missing)
+        :type event_id: ndarray
+        :param liked: bool, missing counts as a left swipe
+        :type liked: ndarray
+        :param time_spent: float64 seconds, missing stored as 0
+        :type time_spent: ndarray
+        :param matcha_mode: int8, 1 matcha, 0 coffee, -1 missing
+        :type matcha_mode: ndarray
+        :param has_time: bool, whether time_spent was present (defaults to all True)
+        :type has_time: ndarray or None
+        """
+        self.user_id = np.asarray(user_id, dtype=np.int64)
+        self.event_id = np.asarray(event_id, dtype=np.int64)
+        self.liked = np.asarray(liked, dtype=bool)
+        self.time_spent = np.asarray(time_spent, dtype=np.float64)
+        self.matcha_mode = np.asarray(matcha_mode, dtype=np.int8)
+        self.has_time = np.ones(len(self.user_id), dtype=bool) if has_time is None else np.asarray(has_time, dtype=bool)
+
+    @classmethod
+    def from_records(cls, rows: Iterable[Any]) -> "AnalyticsColumns":
+        """
+        Builds columns from analytics rows.
+
+        :param rows: `Analytics` objects or raw Supabase row dicts
+        :type rows: iterable
+        :return: columns in row order
+        :rtype: AnalyticsColumns
+        """
+        rows = list(rows)
+        n = len(rows)
+        user_id = np.full(n, -1, dtype=np.int64)
+        event_id = np.full(n, -1, dtype=np.int64)
+        liked = np.zeros(n, dtype=bool)
+        time_spent = np.zeros(n, dtype=np.float64)
+        has_time = np.zeros(n, dtype=bool)
+        matcha_mode = np.full(n, -1, dtype=np.int8)
+        for i, row in enumerate(rows):
+            value = _field(row, "user_id")
+            if value is not None:
+                user_id[i] = value
+            value = _field(row, "event_id")
+            if value is not None:
+                event_id[i] = value
+            liked[i] = bool(_field(row, "liked"))
+            value = _field(row, "time_spent")
+            if value is not None:
+                time_spent[i] = value
+                has_time[i] = True
+            value = _field(row, "matcha_mode")
+            if value is not None:
+                matcha_mode[i] = 1 if value else 0
+        return cls(user_id, event_id, liked, time_spent, matcha_mode, has_time)
+
+    @classmethod
+    def concat(cls, parts: Iterable["AnalyticsColumns"]) -> "AnalyticsColumns":
+        """Concatenates column chunks (e.g. one per fetched page)."""
+        parts = list(parts)
+        if not parts:
+            return cls.from_records([])
+        return cls(*(np.concatenate([getattr(p, name) for p in parts])
+                     for name in ("user_id", "event_id", "liked", "time_spent", "matcha_mode", "has_time")))
+
+    @classmethod
+    def load(cls, path: str) -> "AnalyticsColumns":
+        """Reads columns written by `save`."""
+        with np.load(path) as data:
+            return cls(data["user_id"], data["event_id"], data["liked"],
+                       data["time_spent"], data["matcha_mode"], data["has_time"])
+
+    def save(self, path: str):
+        """Writes the columns to an .npz file for repeated reporting runs."""
+        np.savez(path, user_id=self.user_id, event_id=self.event_id, liked=self.liked,
+                 time_spent=self.time_spent, matcha_mode=self.matcha_mode, has_time=self.has_time)
+
+    def __len__(self) -> int:
+        return len(self.user_id)
+
+    def cells(self) -> np.ndarray:
+        """(mode, liked) cell code per row, -1 for rows without a mode."""
+        codes = self.matcha_mode.astype(np.int64) * 2 + self.liked
+        codes[self.matcha_mode < 0] = -1
+        return codes
+
+
+def fetch_columns(supabase, user_ids: Optional[Iterable[int]] = None, page_size: int = 10000) -> AnalyticsColumns:
+    """
+    Pages the analytics table into columns, keyset-paginated on id.
+
+    :param supabase: sync Supabase client
+    :param user_ids: restrict to these users, None loads every row
+    :type user_ids: iterable of int or None
+    :param page_size: rows per request
+    :type page_size: int
+    :rtype: AnalyticsColumns
+    """
+    parts = []
+    last_id = 0
+    user_ids = list(user_ids) if user_ids is not None else None
+    while True:
+        query = supabase.table("analytics").select(COLUMNS).gt("id", last_id)
+        if user_ids is not None:
+            query = query.in_("user_id", user_ids)
+        page = query.order("id").limit(page_size).execute().data
+        if page:
+            parts.append(AnalyticsColumns.from_records(page))
+            last_id = page[-1]["id"]
+        if len(page) < page_size:
+            return AnalyticsColumns.concat(parts)
+
+
+def _mode_metrics(matcha_mode: bool, counts: np.ndarray, times: np.ndarray, timed: np.ndarray,
+                  total: float) -> dict[str, Any]:
+    """`aggregate_mode` output from the (left, right) cells of one mode."""
+    swipes_left, swipes_right = int(counts[0]), int(counts[1])
+    left_time, right_time = float(times[0]), float(times[1])
+    interactions = swipes_left + swipes_right
+    # sum() over only missing/no values is the int 0 in aggregate_mode
+    time_spent_seconds = float(total) if timed.any() else 0
+
+    avg_left_time = left_time / swipes_left if swipes_left else 0.0
+    avg_right_time = right_time / swipes_right if swipes_right else 0.0
+    hesitation_score = avg_right_time / avg_left_time if avg_left_time else 0.0
+
+    return {
+        "mode": matcha_mode,
+        "time_spent_seconds": time_spent_seconds,
+        "swipes_right": swipes_right,
+        "swipes_left": swipes_left,
+        "interactions": interactions,
+        "avg_time_per_interaction": time_spent_seconds / interactions if interactions else 0.0,
+        "like_rate": swipes_right / interactions if interactions else 0.0,
+        "hesitation_score": hesitation_score,
+    }
+
+
+def aggregate_modes(columns: AnalyticsColumns) -> dict[bool, dict[str, Any]]:
+    """
+    Per-mode metrics in one vectorized pass.
+
+    :param columns: analytics columns
+    :type columns: AnalyticsColumns
+    :return: {True: matcha metrics, False: coffee metrics}, same as `aggregate_mode`
+    :rtype: dict
+    """
+    grouped = GroupedAggregates.build(columns, np.zeros(len(columns), dtype=np.int64))
+    if len(grouped.keys) == 0:
+        grouped = GroupedAggregates.empty([0])
+    return grouped.metrics(0)
+
+
+class GroupedAggregates:
+    """Per-group (mode, liked) counts and time sums, one row per group key."""
+
+    def __init__(self, keys: np.ndarray, counts: np.ndarray, times: np.ndarray, timed: np.ndarray,
+                 totals: np.ndarray):
+        """
+        :param keys: sorted unique group keys
+        :type keys: ndarray
+        :param counts: (groups, 4) swipes per cell
+        :type counts: ndarray
+        :param times: (groups, 4) time_spent sums per cell
+        :type times: ndarray
+        :param timed: (groups, 4) rows with a time_spent value per cell
+        :type timed: ndarray
+        :param totals: (groups, 2) time_spent sums per mode, summed in row order
+        :type totals: ndarray
+        """
+        self.keys = keys
+        self.counts = counts
+        self.times = times
+        self.timed = timed
+        self.totals = totals
+
+    @classmethod
+    def empty(cls, keys) -> "GroupedAggregates":
+        keys = np.asarray(keys)
+        shape = (len(keys), CELLS)
+        return cls(keys, np.zeros(shape, dtype=np.int64), np.zeros(shape), np.zeros(shape, dtype=np.int64),
+                   np.zeros((len(keys), 2)))
+
+    @classmethod
+    def build(cls, columns: AnalyticsColumns, group: np.ndarray) -> "GroupedAggregates":
+        """
+        Aggregates rows by an arbitrary per-row group key.
+
+        :param columns: analytics columns
+        :type columns: AnalyticsColumns
+        :param group: one key per row (user id, cohort label, constant for platform-wide)
+        :type group: ndarray
+        :rtype: GroupedAggregates
+        """
+        cells = columns.cells()
+        valid = cells >= 0
+        keys, inverse = np.unique(np.asarray(group)[valid], return_inverse=True)
+        slot = inverse.astype(np.int64).ravel() * CELLS + cells[valid]
+        size = len(keys) * CELLS
+
+        counts = np.bincount(slot, minlength=size)
+        times = np.bincount(slot, weights=columns.time_spent[valid], minlength=size)
+        timed = np.bincount(slot, weights=columns.has_time[valid], minlength=size).astype(np.int64)
+        # Per-mode totals get their own bins rather than left + right, so the
+        # float rounding matches a sequential sum over the mode's rows
+        totals = np.bincount(slot // 2, weights=columns.time_spent[valid], minlength=len(keys) * 2)
+        return cls(keys, counts.reshape(-1, CELLS), times.reshape(-1, CELLS), timed.reshape(-1, CELLS),
+                   totals.reshape(-1, 2))
+
+    @classmethod
+    def by_user(cls, columns: AnalyticsColumns) -> "GroupedAggregates":
+        return cls.build(columns, columns.user_id)
+
+    @classmethod
+    def platform(cls, columns: AnalyticsColumns) -> "GroupedAggregates":
+        return cls.build(columns, np.zeros(len(columns), dtype=np.int64))
+
+    @classmethod
+    def by_cohort(cls, columns: AnalyticsColumns, cohort_of: dict[int, Any], unknown: Any = "unknown") -> "GroupedAggregates":
+        """
+        Aggregates by a user -> cohort mapping (signup month, experiment arm, ...).
+
+        :param cohort_of: cohort label per user id; users not in it fall into `unknown`
+        :type cohort_of: dict
+        """
+        users, inverse = np.unique(columns.user_id, return_inverse=True)
+        labels = np.array([str(cohort_of.get(int(u), unknown)) for u in users])
+        return cls.build(columns, labels[inverse.ravel()] if len(users) else np.array([], dtype=str))
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def metrics(self, i: int) -> dict[bool, dict[str, Any]]:
+        """`aggregate_mode`-shaped metrics of group `i`, keyed by matcha_mode."""
+        return {
+            mode: _mode_metrics(mode, self.counts[i, 2 * int(mode):2 * int(mode) + 2],
+                                self.times[i, 2 * int(mode):2 * int(mode) + 2],
+                                self.timed[i, 2 * int(mode):2 * int(mode) + 2],
+                                self.totals[i, int(mode)])
+            for mode in (True, False)
+        }
+
+    def table(self) -> dict[str, np.ndarray]:
+        """
+        Vectorized summary columns for reporting, one entry per group.
+
+        :return: key plus interactions, like_rate and avg_time per mode
+        :rtype: dict of ndarray
+        """
+        out: dict[str, np.ndarray] = {"key": self.keys}
+        with np.errstate(divide="ignore", invalid="ignore"):
+            for name, mode in (("coffee", 0), ("matcha", 1)):
+                counts = self.counts[:, 2 * mode:2 * mode + 2]
+                times = self.times[:, 2 * mode:2 * mode + 2]
+                interactions = counts.sum(axis=1)
+                out[f"{name}_interactions"] = interactions
+                out[f"{name}_like_rate"] = np.nan_to_num(counts[:, 1] / interactions)
+                out[f"{name}_avg_time"] = np.nan_to_num(self.totals[:, mode] / interactions)
+                avg_left = np.nan_to_num(times[:, 0] / counts[:, 0])
+                avg_right = np.nan_to_num(times[:, 1] / counts[:, 1])
+                out[f"{name}_hesitation"] = np.where(avg_left > 0, avg_right / np.where(avg_left > 0, avg_left, 1), 0.0)
+        return out
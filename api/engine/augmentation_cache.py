@@ -0,0 +1,170 @@
+"""Memoized LLM profile augmentation.
+
+`augment_user_description` is a chat-completion round-trip. The cache keeps
+the last augmented description per (user, mode) together with the analytics
+fingerprint it was computed from, and only recomputes it when
+
+- the user's base description (blurb + tags) changed,
+- the entry is older than `ttl` seconds,
+- the user has swiped `min_new_swipes` more times, or
+- the aggregate from `aggregate_mode` shifted noticeably.
+
+A stale entry is still served while a background thread refreshes it, so only
+a user's very first augmentation blocks a feed request. Concurrent first
+requests for the same (user, mode) share that one computation.
+"""
+
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future, ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Any, Callable, Dict, Optional
+
+AugmentFn = Callable[[str, str], str]
+
+
+@dataclass
+class _Entry:
+    base_description: str
+    aggregate: Dict[str, Any]
+    fingerprint: str
+    swipe_count: int
+    augmented: str
+    computed_at: float
+    refreshing: bool = False
+
+
+def analytics_fingerprint(aggregate: Dict[str, Any]) -> str:
+    """Stable hash of an `aggregate_mode` result."""
+    return hashlib.sha1(repr(sorted(aggregate.items())).encode("utf-8")).hexdigest()
+
+
+class AugmentationCache:
+    def __init__(self, ttl: float = 3600.0, min_new_swipes: int = 5, like_rate_shift: float = 0.2,
+                 avg_time_shift: float = 0.5, max_entries: int = 50000, max_workers: int = 2):
+        """
+        :param ttl: seconds after which an entry is refreshed regardless
+        :type ttl: float
+        :param min_new_swipes: swipes since the last computation that force a refresh
+        :type min_new_swipes: int
+        :param like_rate_shift: absolute like-rate change that forces a refresh
+        :type like_rate_shift: float
+        :param avg_time_shift: relative change in average time per swipe that forces a refresh
+        :type avg_time_shift: float
+        :param max_entries: (user, mode) entries kept before the oldest are dropped
+        :type max_entries: int
+        :param max_workers: background refresh threads
+        :type max_workers: int
+        """
+        self.ttl = ttl
+        self.min_new_swipes = min_new_swipes
+        self.like_rate_shift = like_rate_shift
+        self.avg_time_shift = avg_time_shift
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[int, bool], _Entry] = OrderedDict()
+        self._pending: Dict[tuple[int, bool], tuple[str, Future]] = {}
+        self._lock = threading.Lock()
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="augment")
+
+    def get(self, user_id: int, matcha_mode: bool, base_description: str, aggregate: Dict[str, Any],
+            swipe_count: int, augment: AugmentFn) -> str:
+        """
+        Returns the augmented description for a user, computing it only when
+        there is nothing usable cached.
+
+        :param user_id: id of the user
+        :type user_id: int
+        :param matcha_mode: mode the description is for
+        :type matcha_mode: bool
+        :param base_description: blurb plus #tags
+        :type base_description: str
+        :param aggregate: `aggregate_mode` output for the user's recent swipes
+        :type aggregate: dict
+        :param swipe_count: total swipes of the user so far
+        :type swipe_count: int
+        :param augment: function (base_description, analytics_text) -> augmented text
+        :type augment: callable
+        :return: augmented description
+        :rtype: str
+        """
+        key = (user_id, matcha_mode)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry.base_description == base_description:
+                self._entries.move_to_end(key)
+                if not entry.refreshing and self._is_stale(entry, aggregate, swipe_count):
+                    entry.refreshing = True
+                    self._executor.submit(self._refresh, key, base_description, aggregate, swipe_count, augment)
+                return entry.augmented
+
+            # Nothing usable cached: the first caller computes on the request
+            # path, concurrent callers wait for its result
+            pending = self._pending.get(key)
+            if pending is not None and pending[0] == base_description:
+                future, owner = pending[1], False
+            else:
+                future, owner = Future(), True
+                self._pending[key] = (base_description, future)
+
+        if not owner:
+            return future.result()
+
+        augmented = None
+        try:
+            augmented = self._refresh(key, base_description, aggregate, swipe_count, augment)
+        finally:
+            with self._lock:
+                if self._pending.get(key, (None, None))[1] is future:
+                    del self._pending[key]
+            future.set_result(augmented if augmented is not None else base_description)
+        return future.result()
+
+    def invalidate(self, user_id: int, matcha_mode: bool):
+        """Drops the cached augmentation of one user and mode."""
+        with self._lock:
+            self._entries.pop((user_id, matcha_mode), None)
+
+    def _is_stale(self, entry: _Entry, aggregate: Dict[str, Any], swipe_count: int) -> bool:
+        if time.monotonic() - entry.computed_at > self.ttl:
+            return True
+        if swipe_count - entry.swipe_count >= self.min_new_swipes:
+            return True
+        if analytics_fingerprint(aggregate) == entry.fingerprint:
+            return False
+        old, new = entry.aggregate, aggregate
+        if abs(new.get("like_rate", 0.0) - old.get("like_rate", 0.0)) >= self.like_rate_shift:
+            return True
+        old_time = old.get("avg_time_per_interaction", 0.0)
+        new_time = new.get("avg_time_per_interaction", 0.0)
+        if old_time and abs(new_time - old_time) / old_time >= self.avg_time_shift:
+            return True
+        # Going from no swipes to some is always meaningful
+        return bool(new.get("interactions")) != bool(old.get("interactions"))
+
+    def _refresh(self, key: tuple[int, bool], base_description: str, aggregate: Dict[str, Any],
+                 swipe_count: int, augment: AugmentFn) -> Optional[str]:
+        try:
+            augmented = augment(base_description, str(aggregate))
+        except Exception as e:
+            print(f"[Augmentation] Refresh failed for user {key[0]}: {e}")
+            with self._lock:
+                entry = self._entries.get(key)
+                if entry is not None:
+                    entry.refreshing = False
+            return None
+
+        with self._lock:
+            self._entries[key] = _Entry(
+                base_description=base_description,
+                aggregate=dict(aggregate),
+                fingerprint=analytics_fingerprint(aggregate),
+                swipe_count=swipe_count,
+                augmented=augmented,
+                computed_at=time.monotonic(),
+            )
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return augmented
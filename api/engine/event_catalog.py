@@ -0,0 +1,195 @@
+"""Process-local cache of the events table.
+
+The catalog loads every event once at startup, keeps the rows (without their
+embeddings, which only live decoded in the index) and a per-mode `EventIndex`
+in memory, and afterwards only pulls rows newer than its
+watermark (the highest event id it has seen). It also maintains a
+`TagIndex` over every row for tag breakdowns. `create_event` pushes freshly
+inserted rows in directly so they are recommendable without waiting for the
+next refresh.
+
+Edits to existing rows are not picked up by the incremental refresh; call
+`load()` again to rebuild from scratch.
+
+With `shared_dir` set (multi-worker deployments, see engine/shared_index.py)
+the catalog searches the snapshot a loader process publishes into that
+directory instead of building its own indexes. With `with_embeddings=False`
+(the pgvector backend, which searches inside Postgres) it loads no
+embeddings at all and its indexes stay empty.
+"""
+
+import threading
+from typing import Any, Callable, Optional
+
+from engine.event_index import EventIndex
+from engine.ml_models.embedding_codec import StoredEmbedding
+from engine.shared_index import SharedEventIndex, publish_index, shared_index_path
+from engine.tag_index import TagIndex
+
+PAGE_SIZE = 1000
+# Row columns kept when the catalog indexes no embeddings (shared snapshot or pgvector mode)
+SHARED_COLUMNS = "id, created_at, title, description, tags, matcha_mode, image_link"
+# Otherwise the stored embeddings too, but never the pgvector `embedding`
+# column, which would carry each vector a second time as text
+LOCAL_COLUMNS = SHARED_COLUMNS + ", embeddings"
+
+
+def event_embedding(row: dict[str, Any], matcha_mode: bool) -> Optional[StoredEmbedding]:
+    """
+    Pulls the embedding of the given mode out of an events row.
+
+    :param row: events table row
+    :type row: dict
+    :param matcha_mode: which mode's embedding to read
+    :type matcha_mode: bool
+    :return: stored embedding (encoded text or legacy list), or None
+    :rtype: str or list of float or None
+    """
+    embeddings = row.get("embeddings") or {}
+    return embeddings.get("matcha") if matcha_mode else embeddings.get("coffee")
+
+
+class EventCatalog:
+    def __init__(self, supabase, index_factory: Callable[[], EventIndex] = EventIndex,
+                 shared_dir: Optional[str] = None, with_embeddings: bool = True):
+        """
+        :param supabase: Supabase client used to read the events table
+        :type supabase: Client
+        :param index_factory: builds an empty per-mode embedding index
+        :type index_factory: callable
+        :param shared_dir: directory of published index snapshots to map instead of building indexes
+        :type shared_dir: str or None
+        :param with_embeddings: load and index embeddings; False keeps rows and tags only
+        :type with_embeddings: bool
+        """
+        self.supabase = supabase
+        self.index_factory = index_factory
+        self.shared_dir = shared_dir
+        self.with_embeddings = with_embeddings
+        self.watermark = 0
+        self._lock = threading.RLock()
+        self._rows: dict[bool, dict[int, dict]] = {True: {}, False: {}}
+        self._indexes: dict[bool, EventIndex] = {True: self._new_index(True), False: self._new_index(False)}
+        self.tags = TagIndex()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def load(self):
+        """Drops everything and loads the full events table, one page at a time."""
+        with self._lock:
+            self.watermark = 0
+            self._rows = {True: {}, False: {}}
+            self._indexes = {True: self._new_index(True), False: self._new_index(False)}
+            self.tags = TagIndex()
+            self.refresh()
+
+    def refresh(self) -> int:
+        """
+        Fetches rows with an id above the watermark and adds them.
+
+        :return: number of new rows
+        :rtype: int
+        """
+        added = 0
+        with self._lock:
+            while True:
+                data = (
+                    self.supabase.table("events").select(LOCAL_COLUMNS if self._indexes_embeddings else SHARED_COLUMNS)
+                    .gt("id", self.watermark).order("id")
+                    .limit(PAGE_SIZE).execute()
+                )
+                for row in data.data:
+                    self.add(row)
+                added += len(data.data)
+                if len(data.data) < PAGE_SIZE:
+                    break
+            if added:
+                for index in self._indexes.values():
+                    index.maybe_train()
+        return added
+
+    def add(self, row: dict[str, Any]):
+        """
+        Adds or replaces one events row and its embedding.
+
+        :param row: events table row as returned by Supabase
+        :type row: dict
+        """
+        matcha_mode = bool(row.get("matcha_mode"))
+        with self._lock:
+            embedding = event_embedding(row, matcha_mode)
+            if embedding and self._indexes_embeddings:
+                self._indexes[matcha_mode].add(row["id"], embedding)
+            # The index holds the decoded vector; the encoded copy (and the
+            # pgvector column of rows returned by inserts) is not kept
+            row = {k: v for k, v in row.items() if k not in ("embeddings", "embedding")}
+            self._rows[matcha_mode][row["id"]] = row
+            self.tags.add(row["id"], row.get("tags"), matcha_mode)
+            self.watermark = max(self.watermark, row["id"])
+
+    def events(self, matcha_mode: bool) -> list[dict]:
+        """All cached rows of one mode, in id order."""
+        return list(self._rows[matcha_mode].values())
+
+    def rows(self, matcha_mode: bool) -> dict[int, dict]:
+        """The live {event_id: row} map of one mode (do not mutate)."""
+        return self._rows[matcha_mode]
+
+    def index(self, matcha_mode: bool) -> EventIndex:
+        """The embedding index of one mode."""
+        return self._indexes[matcha_mode]
+
+    def publish(self, directory: str):
+        """
+        Writes both modes' indexes as snapshots for workers in shared mode.
+
+        :param directory: shared snapshot directory
+        :type directory: str
+        """
+        with self._lock:
+            for matcha_mode, index in self._indexes.items():
+                publish_index(index, shared_index_path(directory, matcha_mode))
+
+    @property
+    def _indexes_embeddings(self) -> bool:
+        return self.with_embeddings and not self.shared_dir
+
+    def _new_index(self, matcha_mode: bool) -> EventIndex:
+        if self.shared_dir:
+            return SharedEventIndex(shared_index_path(self.shared_dir, matcha_mode))
+        if not self.with_embeddings:
+            return EventIndex(capacity=1)
+        return self.index_factory()
+
+    def get(self, event_id: int) -> Optional[dict]:
+        """Looks an event up by id in either mode."""
+        return self._rows[True].get(event_id) or self._rows[False].get(event_id)
+
+    def start(self, interval: float):
+        """
+        Starts a daemon thread that calls `refresh()` every `interval` seconds.
+
+        :param interval: seconds between refreshes, <= 0 disables the thread
+        :type interval: float
+        """
+        if interval <= 0 or self._thread is not None:
+            return
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, args=(interval,), daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        """Stops the refresh thread, if running."""
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self, interval: float):
+        while not self._stop.wait(interval):
+            try:
+                added = self.refresh()
+                if added:
+                    print(f"[Catalog] Added {added} new events (watermark {self.watermark})")
+            except Exception as e:
+                print(f"[Catalog] Refresh failed: {e}")
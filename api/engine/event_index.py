@@ -0,0 +1,179 @@
+"""In-process event embedding index.
+
+Keeps every event embedding of one mode in a single contiguous float32 matrix
+with an id -> row map, so a whole catalog is scored with one matrix-vector
+product instead of a Python loop over events.
+"""
+
+from typing import Iterable, Mapping, Optional
+
+import numpy as np
+
+from engine.ml_models.embedding_codec import decode_embedding
+from engine.seen_set import SeenSet
+
+
+class EventIndex:
+    def __init__(self, dim: int = 384, capacity: int = 1024):
+        """
+        Empty index. Rows are appended into a preallocated buffer that grows
+        geometrically, so inserts from `POST /events` are amortised O(1).
+
+        :param dim: embedding dimension (all-MiniLM-L6-v2 is 384)
+        :type dim: int
+        :param capacity: initial number of preallocated rows
+        :type capacity: int
+        """
+        self.dim = dim
+        self._matrix = np.zeros((max(capacity, 1), dim), dtype=np.float32)
+        self._ids = np.zeros(max(capacity, 1), dtype=np.int64)
+        self._row_of: dict[int, int] = {}
+        self._size = 0
+
+    @classmethod
+    def from_dict(cls, event_embeddings_dict: Mapping[int, list[float]], dim: Optional[int] = None) -> "EventIndex":
+        """
+        Builds an index from a {event_id: embedding} dictionary. Values may be
+        lists, arrays or compact encoded embeddings.
+
+        :param event_embeddings_dict: embeddings keyed by event id
+        :type event_embeddings_dict: dict of int to list of float or str
+        :return: populated index
+        :rtype: EventIndex
+        """
+        if dim is None:
+            first = next(iter(event_embeddings_dict.values()), None)
+            dim = decode_embedding(first).shape[0] if first is not None else 384
+        index = cls(dim=dim, capacity=len(event_embeddings_dict))
+        index.add_many(event_embeddings_dict.items())
+        return index
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __contains__(self, event_id: int) -> bool:
+        return event_id in self._row_of
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Event ids in row order (a view, do not mutate)."""
+        return self._ids[:self._size]
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Embedding matrix in row order (a view, do not mutate)."""
+        return self._matrix[:self._size]
+
+    def vector(self, event_id: int) -> Optional[np.ndarray]:
+        """Float32 copy of one event's embedding, or None if it is not indexed."""
+        row = self._row_of.get(event_id)
+        return None if row is None else self._matrix[row].copy()
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        capacity = self._matrix.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+        matrix = np.zeros((capacity, self.dim), dtype=np.float32)
+        matrix[:self._size] = self._matrix[:self._size]
+        ids = np.zeros(capacity, dtype=np.int64)
+        ids[:self._size] = self._ids[:self._size]
+        self._matrix, self._ids = matrix, ids
+
+    def add(self, event_id: int, embedding) -> None:
+        """
+        Inserts or replaces the embedding of one event. Compact encoded
+        embeddings are decoded straight into the matrix row.
+
+        :param event_id: id of the event
+        :type event_id: int
+        :param embedding: embedding of the event
+        :type embedding: list of float, ndarray or encoded str
+        """
+        if not isinstance(embedding, str):
+            embedding = np.asarray(embedding, dtype=np.float32)
+            if embedding.shape != (self.dim,):
+                raise ValueError(f"expected embedding of shape ({self.dim},), got {embedding.shape}")
+
+        row = self._row_of.get(event_id)
+        if row is not None:
+            decode_embedding(embedding, out=self._matrix[row])
+            return
+
+        self._reserve(1)
+        row = self._size
+        try:
+            decode_embedding(embedding, out=self._matrix[row])
+        except ValueError as e:
+            raise ValueError(f"expected embedding of dimension {self.dim}: {e}") from e
+        self._row_of[event_id] = row
+        self._ids[row] = event_id
+        self._size += 1
+
+    def add_many(self, items: Iterable[tuple[int, list[float]]]) -> None:
+        """Inserts many (event_id, embedding) pairs."""
+        for event_id, embedding in items:
+            self.add(event_id, embedding)
+
+    def maybe_train(self) -> bool:
+        """Exact search needs no training; approximate subclasses override this."""
+        return False
+
+    def seen_mask(self, seen: Iterable[int]) -> np.ndarray:
+        """
+        Boolean mask over rows, True where the event has been seen.
+
+        :param seen: ids of events the user has already swiped
+        :type seen: iterable of int or SeenSet
+        :return: mask with one entry per row
+        :rtype: ndarray
+        """
+        return self._seen_mask(seen, self._size)
+
+    def _seen_mask(self, seen: Iterable[int], n: int) -> np.ndarray:
+        # Mask over the first n rows; rows appended meanwhile are left out
+        if isinstance(seen, SeenSet):
+            return seen.mask(self._ids[:n])
+        mask = np.zeros(n, dtype=bool)
+        rows = [row for row in (self._row_of.get(event_id) for event_id in set(seen))
+                if row is not None and row < n]
+        if rows:
+            mask[rows] = True
+        return mask
+
+    def search(self, user_embedding, seen: Iterable[int], top_k: int) -> list[int]:
+        """
+        Returns the ids of the top K unseen events by cosine similarity.
+        Embeddings are normalized, so cosine similarity is a dot product.
+
+        :param user_embedding: embedding of the user
+        :type user_embedding: list of float or ndarray
+        :param seen: ids of events to exclude
+        :type seen: iterable of int
+        :param top_k: number of ids to return
+        :type top_k: int
+        :return: event ids ordered by descending similarity
+        :rtype: list of int
+        """
+        # The catalog refresh thread may append rows during the search: every
+        # array below is cut at the row count read here, once
+        n = self._size
+        if top_k <= 0 or n == 0:
+            return []
+
+        query = np.asarray(user_embedding, dtype=np.float32)
+        scores = self._matrix[:n] @ query
+        scores[self._seen_mask(seen, n)] = -np.inf
+
+        candidates = int(np.count_nonzero(scores != -np.inf))
+        k = min(top_k, candidates)
+        if k == 0:
+            return []
+        if k < n:
+            top_rows = np.argpartition(-scores, k - 1)[:k]
+        else:
+            top_rows = np.arange(n)
+        top_rows = top_rows[np.argsort(-scores[top_rows], kind="stable")]
+        return self._ids[:n][top_rows].tolist()
@@ -0,0 +1,109 @@
+"""Feed assembly pipeline.
+
+A feed request goes through two stages:
+
+    score(ctx)                 -> event ids, best first
+    hydrate(rows, ids, ...)    -> catalog rows for those ids
+
+Hydration looks ids up in the catalog's {id: row} dict and checks them
+against the request's seen set, so assembling a page costs O(limit) rather
+than O(recommended x events). When scoring fails or returns nothing usable,
+the fallback stage (unseen catalog rows in id order by default) fills the
+page instead.
+
+`FeedPipeline` wires the stages together; other feeds (trending, tag-based,
+...) reuse it by passing their own `score`.
+"""
+
+import traceback
+from dataclasses import dataclass, field
+from typing import Any, Callable, Container, Iterable, Mapping, Optional
+
+Rows = Mapping[int, dict]
+
+
+@dataclass
+class FeedContext:
+    user_id: int
+    matcha_mode: bool
+    limit: int
+    # Set or SeenSet, anything with a fast `in`
+    seen: Container[int] = field(default_factory=set)
+    # Feed-specific inputs (blurb, tags, recent swipes, ...)
+    data: dict[str, Any] = field(default_factory=dict)
+
+
+def hydrate(rows: Rows, ids: Iterable[int], seen: Optional[Container[int]] = None, limit: Optional[int] = None) -> list[dict]:
+    """
+    Catalog rows for `ids`, in order, skipping unknown and seen ids.
+
+    :param rows: {event_id: row} map of one mode
+    :type rows: Mapping
+    :param ids: ranked event ids
+    :type ids: iterable of int
+    :param seen: ids to drop
+    :type seen: set, SeenSet or None
+    :param limit: max rows to return
+    :type limit: int or None
+    :rtype: list of dict
+    """
+    out = []
+    for event_id in ids:
+        if seen is not None and event_id in seen:
+            continue
+        row = rows.get(event_id)
+        if row is not None:
+            out.append(row)
+            if limit is not None and len(out) >= limit:
+                break
+    return out
+
+
+def unseen_ids(ctx: Optional[FeedContext], rows: Rows) -> Iterable[int]:
+    """Default fallback: catalog ids in id order (hydrate drops the seen ones)."""
+    # Copy the keys, the catalog's refresh thread may add rows meanwhile
+    return list(rows)
+
+
+class FeedPipeline:
+    def __init__(self, rows: Callable[[bool], Rows], score: Callable[[FeedContext], list[int]],
+                 fallback: Optional[Callable[[FeedContext, Rows], Iterable[int]]] = unseen_ids,
+                 name: str = "Feed"):
+        """
+        :param rows: returns the {event_id: row} map of a mode (e.g. `EventCatalog.rows`)
+        :type rows: callable
+        :param score: ranks events for the request, best first
+        :type score: callable
+        :param fallback: ids to serve when scoring fails or comes back empty, None disables
+        :type fallback: callable or None
+        :param name: log tag
+        :type name: str
+        """
+        self.rows = rows
+        self.score = score
+        self.fallback = fallback
+        self.name = name
+
+    def run(self, ctx: FeedContext) -> list[dict]:
+        """
+        Builds one page of the feed.
+
+        :param ctx: request context
+        :type ctx: FeedContext
+        :return: up to `ctx.limit` unseen catalog rows
+        :rtype: list of dict
+        """
+        rows = self.rows(ctx.matcha_mode)
+        try:
+            ranked = self.score(ctx)
+            page = hydrate(rows, ranked, ctx.seen, ctx.limit)
+            if page or self.fallback is None:
+                return page
+            print(f"[{self.name}] Empty results, using fallback for user {ctx.user_id}")
+        except Exception as e:
+            if self.fallback is None:
+                raise
+            print(f"[{self.name}] Failed for user {ctx.user_id}: {e}")
+            traceback.print_exc()
+            print(f"[{self.name}] Falling back to unseen events")
+        return hydrate(rows, self.fallback(ctx, rows), ctx.seen, ctx.limit)
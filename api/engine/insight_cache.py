@@ -0,0 +1,142 @@
+"""Cached, coalesced dashboard insights.
+
+The AI insight on the analytics dashboard is an LLM round-trip that only
+depends on the numbers the encouragement prompt shows: interactions and like
+rate per mode, total swipes and the top tags. `InsightCache` keeps the last
+insight per user with a fingerprint of exactly those inputs and reuses it
+until they change.
+
+Concurrent requests that miss for the same (user, fingerprint) await one
+shared task instead of each calling the LLM (single-flight). `peek` and
+`schedule` support returning the dashboard numbers immediately and
+delivering the insight on a later poll.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+GenerateFn = Callable[[], Awaitable[str]]
+
+
+def insight_fingerprint(metrics: Dict[str, Any]) -> str:
+    """
+    Stable hash of the dashboard metrics the encouragement prompt uses.
+
+    :param metrics: output of `swipe_metrics` / `stats_metrics`
+    :type metrics: dict
+    :rtype: str
+    """
+    key = (
+        metrics["total_swipes"],
+        tuple((m["interactions"], round(m["like_rate"], 2)) for m in (metrics["coffee"], metrics["matcha"])),
+        tuple(tag[0] for tag in metrics["tags"].get("top_tags", [])[:3]),
+    )
+    return hashlib.sha1(repr(key).encode("utf-8")).hexdigest()
+
+
+class InsightCache:
+    def __init__(self, ttl: float = 86400.0, max_entries: int = 50000):
+        """
+        :param ttl: seconds an insight is reused even if the metrics did not change
+        :type ttl: float
+        :param max_entries: users kept before the least recently used are dropped
+        :type max_entries: int
+        """
+        self.ttl = ttl
+        self.max_entries = max_entries
+        # user_id -> (fingerprint, insight, computed_at)
+        self._entries: OrderedDict[int, tuple[str, str, float]] = OrderedDict()
+        self._inflight: dict[tuple[int, str], asyncio.Task] = {}
+
+        self.hits = 0
+        self.misses = 0
+        self.coalesced = 0
+
+    def peek(self, user_id: int, metrics: Dict[str, Any]) -> Optional[str]:
+        """
+        Cached insight for these metrics, without generating one.
+
+        :return: the insight, or None when missing or out of date
+        :rtype: str or None
+        """
+        entry = self._entries.get(user_id)
+        if entry is None:
+            return None
+        fingerprint, insight, computed_at = entry
+        if fingerprint != insight_fingerprint(metrics) or time.monotonic() - computed_at > self.ttl:
+            return None
+        self._entries.move_to_end(user_id)
+        self.hits += 1
+        return insight
+
+    def pending(self, user_id: int, metrics: Dict[str, Any]) -> bool:
+        """Whether an insight for these metrics is being generated right now."""
+        return (user_id, insight_fingerprint(metrics)) in self._inflight
+
+    async def get(self, user_id: int, metrics: Dict[str, Any], generate: GenerateFn) -> str:
+        """
+        Returns the insight for a user's metrics, generating it at most once.
+
+        :param user_id: id of the user
+        :type user_id: int
+        :param metrics: dashboard metrics the insight is about
+        :type metrics: dict
+        :param generate: coroutine factory calling the LLM
+        :type generate: callable
+        :rtype: str
+        """
+        insight = self.peek(user_id, metrics)
+        if insight is not None:
+            return insight
+        return await asyncio.shield(self.schedule(user_id, metrics, generate))
+
+    def schedule(self, user_id: int, metrics: Dict[str, Any], generate: GenerateFn) -> asyncio.Task:
+        """
+        Starts generating the insight in the background, or joins the
+        generation already in flight for the same metrics.
+
+        :return: task resolving to the insight
+        :rtype: asyncio.Task
+        """
+        key = (user_id, insight_fingerprint(metrics))
+        task = self._inflight.get(key)
+        if task is not None:
+            self.coalesced += 1
+            return task
+
+        self.misses += 1
+        task = asyncio.create_task(self._generate(key, generate))
+        self._inflight[key] = task
+        return task
+
+    async def _generate(self, key: tuple[int, str], generate: GenerateFn) -> str:
+        user_id, fingerprint = key
+        try:
+            insight = await generate()
+        except Exception as e:
+            # Not cached, the next request tries again
+            print(f"[Insights] Generation failed for user {user_id}: {e}")
+            return ""
+        finally:
+            self._inflight.pop(key, None)
+
+        self._entries[user_id] = (fingerprint, insight, time.monotonic())
+        self._entries.move_to_end(user_id)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+        return insight
+
+    def stats(self) -> dict:
+        """Hit/miss counters and sizes."""
+        lookups = self.hits + self.misses + self.coalesced
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "coalesced": self.coalesced,
+            "hit_rate": (self.hits + self.coalesced) / lookups if lookups else 0.0,
+            "entries": len(self._entries),
+            "inflight": len(self._inflight),
+        }
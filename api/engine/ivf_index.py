@@ -0,0 +1,150 @@
+"""Approximate nearest-neighbour event index (inverted file, pure NumPy).
+
+Rows are clustered around `nlist` k-means centroids. A search scores the
+centroids, then only the rows of the `nprobe` closest lists. `nprobe` is the
+recall vs latency knob: `nprobe == nlist` is an exact search, smaller values
+scan proportionally fewer rows.
+
+Until the index holds `min_train_size` rows it behaves exactly like
+`EventIndex`. Inserts after training are assigned to their nearest centroid;
+`maybe_train()` re-clusters once the index has doubled since the last fit.
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+
+from engine.event_index import EventIndex
+
+
+class IVFEventIndex(EventIndex):
+    def __init__(self, dim: int = 384, capacity: int = 1024, nlist: Optional[int] = None,
+                 nprobe: int = 8, min_train_size: int = 20000, kmeans_iters: int = 10,
+                 seed: int = 0):
+        """
+        :param nlist: number of clusters, defaults to ~sqrt(rows) at training time
+        :type nlist: int or None
+        :param nprobe: clusters scanned per query (higher = better recall, slower)
+        :type nprobe: int
+        :param min_train_size: rows needed before clustering kicks in
+        :type min_train_size: int
+        :param kmeans_iters: Lloyd iterations per training run
+        :type kmeans_iters: int
+        """
+        super().__init__(dim=dim, capacity=capacity)
+        self.nlist = nlist
+        self.nprobe = nprobe
+        self.min_train_size = min_train_size
+        self.kmeans_iters = kmeans_iters
+        self._rng = np.random.default_rng(seed)
+        # (centroids, row lists, cached list arrays), swapped as one unit so
+        # a search never sees lists from one fit and centroids from another
+        self._clusters: Optional[tuple[np.ndarray, list[list[int]], list[Optional[np.ndarray]]]] = None
+        self._trained_size = 0
+
+    @property
+    def trained(self) -> bool:
+        return self._clusters is not None
+
+    def add(self, event_id: int, embedding) -> None:
+        is_new = event_id not in self._row_of
+        super().add(event_id, embedding)
+        # A replaced vector keeps its old list until the next re-cluster
+        if self.trained and is_new:
+            centroids, lists, list_arrays = self._clusters
+            row = self._size - 1
+            cluster = int(np.argmax(centroids @ self._matrix[row]))
+            lists[cluster].append(row)
+            list_arrays[cluster] = None
+
+    def maybe_train(self) -> bool:
+        """
+        Clusters the index when it first reaches `min_train_size` rows and
+        again whenever it has doubled since the previous fit.
+
+        :return: whether a training run happened
+        :rtype: bool
+        """
+        if self._size < self.min_train_size:
+            return False
+        if self.trained and self._size < 2 * self._trained_size:
+            return False
+        self.train()
+        return True
+
+    def train(self):
+        """Runs spherical k-means on a sample of rows and rebuilds the lists."""
+        size = self._size
+        nlist = self.nlist or max(1, int(np.sqrt(size)))
+        nlist = min(nlist, size)
+        sample_size = min(size, 64 * nlist)
+        sample = self.matrix[self._rng.choice(size, sample_size, replace=False)]
+
+        centroids = sample[self._rng.choice(sample_size, nlist, replace=False)].copy()
+        for _ in range(self.kmeans_iters):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            empty = norms[:, 0] == 0
+            # Empty clusters keep their previous centroid
+            sums[empty] = centroids[empty]
+            norms[empty] = 1.0
+            centroids = (sums / norms).astype(np.float32)
+
+        assignment = self._assign(self.matrix, centroids)
+        order = np.argsort(assignment, kind="stable")
+        bounds = np.searchsorted(assignment[order], np.arange(nlist + 1))
+        lists = [order[bounds[c]:bounds[c + 1]].tolist() for c in range(nlist)]
+        self._clusters = (centroids, lists, [None] * nlist)
+        self._trained_size = size
+
+    @staticmethod
+    def _assign(matrix: np.ndarray, centroids: np.ndarray, chunk: int = 65536) -> np.ndarray:
+        assignment = np.empty(matrix.shape[0], dtype=np.int64)
+        for start in range(0, matrix.shape[0], chunk):
+            block = matrix[start:start + chunk]
+            assignment[start:start + chunk] = np.argmax(block @ centroids.T, axis=1)
+        return assignment
+
+    @staticmethod
+    def _list_rows(lists: list[list[int]], list_arrays: list[Optional[np.ndarray]], cluster: int) -> np.ndarray:
+        rows = list_arrays[cluster]
+        if rows is None:
+            rows = np.asarray(lists[cluster], dtype=np.int64)
+            list_arrays[cluster] = rows
+        return rows
+
+    def search(self, user_embedding, seen: Iterable[int], top_k: int) -> list[int]:
+        if not self.trained:
+            return super().search(user_embedding, seen, top_k)
+        n = self._size
+        if top_k <= 0 or n == 0:
+            return []
+
+        centroids, lists, list_arrays = self._clusters
+        query = np.asarray(user_embedding, dtype=np.float32)
+        # Rows appended after n are dropped by the length check below
+        seen_mask = self._seen_mask(seen, n)
+        cluster_order = np.argsort(-(centroids @ query))
+        nprobe = max(1, min(self.nprobe, len(cluster_order)))
+
+        # Widen the probe until enough unseen candidates are found
+        while True:
+            rows = np.concatenate([self._list_rows(lists, list_arrays, c) for c in cluster_order[:nprobe]])
+            rows = rows[rows < len(seen_mask)]
+            rows = rows[~seen_mask[rows]]
+            if len(rows) >= top_k or nprobe == len(cluster_order):
+                break
+            nprobe = min(2 * nprobe, len(cluster_order))
+
+        if len(rows) == 0:
+            return []
+        scores = self._matrix[rows] @ query
+        k = min(top_k, len(rows))
+        if k < len(rows):
+            best = np.argpartition(-scores, k - 1)[:k]
+        else:
+            best = np.arange(len(rows))
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return self._ids[rows[best]].tolist()
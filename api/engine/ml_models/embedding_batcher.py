@@ -0,0 +1,171 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future
+from typing import Sequence
+
+import numpy as np
+"""
+Dynamic micro-batching in front of an embedding model
+
+Concurrent requests (create_event, create_user, feed) each encode one sentence, so the model
+runs many batch-of-one forward passes. EmbeddingBatcher queues encode calls and a dedicated
+thread runs everything that arrives within max_wait seconds (or until max_batch texts are
+queued) as one forward pass, then resolves each caller's future with its rows.
+
+Large encodes (bulk imports, embedding migrations) are fed in one chunk at a time, so
+single-text encodes queued meanwhile run between chunks instead of behind the whole request.
+
+It exposes the part of the SentenceTransformer API EmbeddingToolbox uses, so it can stand in
+for the model directly.
+"""
+
+
+class _Job:
+    __slots__ = ("texts", "future", "queued_at")
+
+    def __init__(self, texts: list[str]):
+        self.texts = texts
+        self.future: Future = Future()
+        self.queued_at = time.perf_counter()
+
+
+class EmbeddingBatcher:
+    def __init__(self, model, max_batch: int = 64, max_wait: float = 0.005):
+        """
+        :param model: loaded SentenceTransformer (or RemoteModel)
+        :param max_batch: texts per forward pass; a full batch runs without waiting
+        :type max_batch: int
+        :param max_wait: seconds the first queued text waits for others to join its batch
+        :type max_wait: float
+        """
+        self.model = model
+        self.max_batch = max_batch
+        self.max_wait = max_wait
+        self._queue: deque[_Job] = deque()
+        self._queued_texts = 0
+        self._cond = threading.Condition()
+        self._closed = False
+
+        self.batches = 0
+        self.items = 0
+        self.max_depth = 0
+        self._wait_seconds = 0.0
+        self._encode_seconds = 0.0
+
+        self._thread = threading.Thread(target=self._run, name="embedding-batcher", daemon=True)
+        self._thread.start()
+
+    def submit(self, texts: Sequence[str]) -> Future:
+        """
+        Queues texts for the next batch
+
+        :param texts: texts to encode
+        :type texts: sequence of str
+        :return: future resolving to a (len(texts), dim) float32 matrix
+        :rtype: Future
+        """
+        job = _Job(list(texts))
+        with self._cond:
+            if self._closed:
+                raise RuntimeError("embedding batcher is closed")
+            self._queue.append(job)
+            self._queued_texts += len(job.texts)
+            self.max_depth = max(self.max_depth, self._queued_texts)
+            self._cond.notify()
+        return job.future
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = True) -> np.ndarray:
+        """
+        Blocking SentenceTransformer-style encode through the batcher, always normalized.
+        Lists longer than `batch_size` (capped at max_batch) are queued one chunk at a time
+        """
+        if isinstance(sentences, str):
+            return self.submit([sentences]).result()[0]
+        texts = list(sentences)
+        chunk = max(min(batch_size, self.max_batch), 1)
+        if len(texts) <= chunk:
+            return self.submit(texts).result()
+        # Wait for each chunk before queueing the next, so other callers' jobs get in between
+        return np.concatenate([self.submit(texts[start:start + chunk]).result()
+                               for start in range(0, len(texts), chunk)])
+
+    def get_sentence_embedding_dimension(self) -> int:
+        return self.model.get_sentence_embedding_dimension()
+
+    def close(self):
+        """
+        Stops the batching thread after the queued jobs have run
+        """
+        with self._cond:
+            self._closed = True
+            self._cond.notify()
+        self._thread.join()
+
+    def stats(self) -> dict:
+        """
+        Queue depth and batching counters
+        """
+        return {
+            "queue_depth": self._queued_texts,
+            "max_queue_depth": self.max_depth,
+            "batches": self.batches,
+            "items": self.items,
+            "avg_batch_size": self.items / self.batches if self.batches else 0.0,
+            "avg_wait_ms": self._wait_seconds / self.items * 1000 if self.items else 0.0,
+            "avg_encode_ms": self._encode_seconds / self.batches * 1000 if self.batches else 0.0,
+            "max_batch": self.max_batch,
+            "max_wait_ms": self.max_wait * 1000,
+        }
+
+    def _take_batch(self) -> list[_Job]:
+        with self._cond:
+            while not self._queue and not self._closed:
+                self._cond.wait()
+            if not self._queue:
+                return []
+            # Give other callers up to max_wait (from the oldest job) to join
+            deadline = self._queue[0].queued_at + self.max_wait
+            while self._queued_texts < self.max_batch and not self._closed:
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    break
+                self._cond.wait(remaining)
+
+            jobs, texts = [], 0
+            while self._queue and (not jobs or texts + len(self._queue[0].texts) <= self.max_batch):
+                job = self._queue.popleft()
+                jobs.append(job)
+                texts += len(job.texts)
+            self._queued_texts -= texts
+            return jobs
+
+    def _run(self):
+        while True:
+            jobs = self._take_batch()
+            if not jobs:
+                return
+            texts = [text for job in jobs for text in job.texts]
+            started = time.perf_counter()
+            try:
+                if texts:
+                    vectors = self.model.encode(texts, batch_size=max(self.max_batch, 1),
+                                                convert_to_numpy=True, normalize_embeddings=True)
+                    vectors = np.asarray(vectors, dtype=np.float32)
+                else:
+                    vectors = np.zeros((0, 0), dtype=np.float32)
+            except Exception as e:
+                for job in jobs:
+                    job.future.set_exception(e)
+                continue
+
+            finished = time.perf_counter()
+            self.batches += 1
+            self.items += len(texts)
+            self._encode_seconds += finished - started
+            offset = 0
+            for job in jobs:
+                self._wait_seconds += (started - job.queued_at) * len(job.texts)
+                job.future.set_result(vectors[offset:offset + len(job.texts)])
+                offset += len(job.texts)
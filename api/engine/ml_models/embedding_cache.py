@@ -0,0 +1,121 @@
+import hashlib
+import sqlite3
+import threading
+from collections import OrderedDict
+from typing import Optional
+
+import numpy as np
+"""
+Content-addressed embedding cache
+
+Embeddings are keyed on a SHA-256 of the model name and the exact text that
+would be fed to the model, so an unchanged blurb never hits the model twice.
+A bounded in-memory LRU sits in front of an optional SQLite file that
+survives restarts.
+"""
+class EmbeddingCache:
+    def __init__(self, max_entries: int = 10000, path: Optional[str] = None):
+        """
+        :param max_entries: maximum number of embeddings kept in memory
+        :type max_entries: int
+        :param path: SQLite file for the on-disk tier, None keeps it memory only
+        :type path: str or None
+        """
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self._memory: OrderedDict[str, np.ndarray] = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = None
+        if path:
+            self._db = sqlite3.connect(path, check_same_thread=False)
+            self._db.execute(
+                "CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB NOT NULL)"
+            )
+            self._db.commit()
+
+    @staticmethod
+    def key(model_name: str, text: str) -> str:
+        """
+        Cache key for a text embedded by a given model
+
+        :param model_name: name of the embedding model, plus anything else that changes
+            its vectors (EmbeddingToolbox passes "model|backend|q<quantized>")
+        :type model_name: str
+        :param text: exact text passed to the model
+        :type text: str
+        :return: hex digest
+        :rtype: str
+        """
+        return hashlib.sha256(f"{model_name}\0{text}".encode("utf-8")).hexdigest()
+
+    def get(self, key: str) -> Optional[np.ndarray]:
+        """
+        Looks an embedding up in memory, then on disk
+
+        :param key: value from `key()`
+        :type key: str
+        :return: float32 embedding or None on a miss
+        :rtype: ndarray or None
+        """
+        with self._lock:
+            vector = self._memory.get(key)
+            if vector is not None:
+                self._memory.move_to_end(key)
+                self.hits += 1
+                return vector.copy()
+
+            if self._db is not None:
+                row = self._db.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, vector)
+                    self.disk_hits += 1
+                    return vector.copy()
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, vector: np.ndarray):
+        """
+        Stores an embedding in memory and, when configured, on disk
+
+        :param key: value from `key()`
+        :type key: str
+        :param vector: embedding to store
+        :type vector: ndarray
+        """
+        vector = np.asarray(vector, dtype=np.float32).copy()
+        with self._lock:
+            self._remember(key, vector)
+            if self._db is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector) VALUES (?, ?)",
+                    (key, vector.tobytes()),
+                )
+                self._db.commit()
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def stats(self) -> dict:
+        """
+        Hit/miss counters
+
+        :return: counters and current in-memory size
+        :rtype: dict
+        """
+        lookups = self.hits + self.disk_hits + self.misses
+        return {
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": (self.hits + self.disk_hits) / lookups if lookups else 0.0,
+            "entries": len(self._memory),
+            "max_entries": self.max_entries,
+        }
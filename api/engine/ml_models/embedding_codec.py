@@ -0,0 +1,101 @@
+import base64
+import struct
+from typing import Optional, Sequence, Union
+
+import numpy as np
+"""
+Compact storage format for embeddings
+
+Embeddings are stored as base64 text (so they still fit in the JSON
+`embeddings` column) of a small header followed by the raw little-endian
+vector bytes:
+
+    magic b"CE" | version u8 | dtype u8 | dim u16 | dim * itemsize bytes
+
+That is ~2KB of text for a 384-dim float32 vector (~1KB as float16) instead
+of ~8KB of JSON floats, and decoding is a single `np.frombuffer`.
+Plain lists written before this format existed still decode.
+"""
+MAGIC = b"CE"
+VERSION = 1
+HEADER = struct.Struct("<2sBBH")
+
+DTYPE_CODES = {"float32": 1, "float16": 2}
+CODE_DTYPES = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+
+StoredEmbedding = Union[str, list]
+
+
+def encode_embedding(embedding, dtype: str = "float32") -> str:
+    """
+    Serializes an embedding into the compact text format
+
+    :param embedding: vector to store
+    :type embedding: ndarray or list of float
+    :param dtype: storage precision, "float32" or "float16"
+    :type dtype: str
+    :return: base64 text with header
+    :rtype: str
+    """
+    if dtype not in DTYPE_CODES:
+        raise ValueError(f"Unsupported embedding storage dtype: {dtype}")
+    code = DTYPE_CODES[dtype]
+    vector = np.asarray(embedding, dtype=CODE_DTYPES[code]).ravel()
+    payload = HEADER.pack(MAGIC, VERSION, code, vector.shape[0]) + vector.tobytes()
+    return base64.b64encode(payload).decode("ascii")
+
+
+def decode_embedding(value: StoredEmbedding, out: Optional[np.ndarray] = None) -> np.ndarray:
+    """
+    Decodes a stored embedding (compact text or legacy list) to float32
+
+    :param value: stored embedding
+    :type value: str or list of float
+    :param out: optional preallocated float32 row to decode into
+    :type out: ndarray or None
+    :return: float32 vector (`out` when given)
+    :rtype: ndarray
+    """
+    if isinstance(value, str):
+        raw = base64.b64decode(value)
+        magic, version, code, dim = HEADER.unpack_from(raw)
+        if magic != MAGIC or version != VERSION or code not in CODE_DTYPES:
+            raise ValueError("Unrecognised embedding encoding")
+        vector = np.frombuffer(raw, dtype=CODE_DTYPES[code], count=dim, offset=HEADER.size)
+    else:
+        vector = np.asarray(value, dtype=np.float32)
+
+    if out is None:
+        return vector.astype(np.float32)
+    out[...] = vector
+    return out
+
+
+def decode_many(values: Sequence[StoredEmbedding], dim: int = 384) -> np.ndarray:
+    """
+    Decodes many stored embeddings into one preallocated float32 matrix
+
+    :param values: stored embeddings
+    :type values: sequence of str or list
+    :param dim: embedding dimension
+    :type dim: int
+    :return: matrix of shape (len(values), dim)
+    :rtype: ndarray
+    """
+    matrix = np.empty((len(values), dim), dtype=np.float32)
+    for row, value in enumerate(values):
+        decode_embedding(value, out=matrix[row])
+    return matrix
+
+
+def is_encoded(value: StoredEmbedding) -> bool:
+    """Whether a stored embedding already uses the compact format."""
+    return isinstance(value, str)
+
+
+def stored_dtype(value: StoredEmbedding) -> Optional[str]:
+    """Storage dtype name of a compact embedding, None for legacy lists."""
+    if not is_encoded(value):
+        return None
+    code = base64.b64decode(value[:8])[3]
+    return next((name for name, c in DTYPE_CODES.items() if c == code), None)
@@ -1,21 +1,85 @@
-from sentence_transformers import SentenceTransformer
+import threading
 import numpy as np
-from typing import Optional
+from typing import Optional, Sequence
+
+from engine.ml_models.embedding_cache import EmbeddingCache
+from engine.ml_models.embedding_batcher import EmbeddingBatcher
+from engine.ml_models.model_server import RemoteModel
 """
 Embedding Toolbox using Sentence Transformers
 
 Important to note, the model is instantiated separately to avoid heavy loading during import.
-When using **REMEMBER TO CALL self.instantiate()** after creating an instance of the class.
+sentence_transformers (and torch) are only imported by self.instantiate(); call it from a
+background warmup, otherwise the first encode loads the model itself.
+With model_server set, no model is loaded in this process; encoding goes to the shared
+model server over its Unix socket (see model_server.py).
+backend="onnx" runs the model with ONNX Runtime instead of torch (see onnx_model.py).
+With batch_max_size > 0 every encode goes through an EmbeddingBatcher, so concurrent callers
+share forward passes.
 """
 class EmbeddingToolbox:
-    def __init__(self, model_name: str = 'all-MiniLM-L6-v2'):
+    def __init__(self, model_name: str = 'all-MiniLM-L6-v2', cache: Optional[EmbeddingCache] = None,
+                 model_server: Optional[str] = None, batch_max_size: int = 0, batch_max_wait: float = 0.005,
+                 backend: str = "torch", threads: Optional[int] = None, onnx_quantize: bool = False):
         self.model = model_name
+        self.model_name = model_name
+        self.cache = cache
+        self.model_server = model_server
+        self.batch_max_size = batch_max_size
+        self.batch_max_wait = batch_max_wait
+        if backend not in ("torch", "onnx"):
+            raise ValueError(f"Unsupported embedding backend: {backend}")
+        self.backend = backend
+        self.threads = threads
+        self.onnx_quantize = onnx_quantize
+        # Cached vectors are only reused by the same model, backend and precision.
+        # With model_server the server is assumed to run this configuration
+        # (scripts/model_server.py reads the same EMBEDDING_* variables)
+        self.cache_namespace = f"{model_name}|{backend}|q{int(backend == 'onnx' and onnx_quantize)}"
+        self._lock = threading.Lock()
+        self._loaded = False
+
+    @property
+    def ready(self) -> bool:
+        """Whether the model has been loaded"""
+        return self._loaded
 
     def instantiate(self):
         """
-        Instantiating the actual model
+        Instantiating the actual model, safe to call more than once and from several threads
+        """
+        with self._lock:
+            if self._loaded:
+                return
+            if self.model_server:
+                model = RemoteModel(self.model_server)
+                # Fails here, and is retried on the next encode, if the server is not up
+                model.get_sentence_embedding_dimension()
+                self.model = model
+            elif self.backend == "onnx":
+                from engine.ml_models.onnx_model import OnnxEmbeddingModel
+                self.model = OnnxEmbeddingModel(self.model_name, quantize=self.onnx_quantize, threads=self.threads)
+            else:
+                from sentence_transformers import SentenceTransformer
+                if self.threads:
+                    import torch
+                    torch.set_num_threads(self.threads)
+                self.model = SentenceTransformer(self.model_name)
+            if self.batch_max_size > 0:
+                self.model = EmbeddingBatcher(self.model, self.batch_max_size, self.batch_max_wait)
+            self._loaded = True
+
+    def batch_stats(self) -> Optional[dict]:
+        """
+        Micro-batching counters, None when batching is off or the model is not loaded
         """
-        self.model = SentenceTransformer(self.model)
+        if isinstance(self.model, EmbeddingBatcher):
+            return self.model.stats()
+        return None
+
+    def _ensure_model(self):
+        if not self._loaded:
+            self.instantiate()
 
     def encode(self, blurb: str, tags: list[str], title: Optional[str] = None) -> np.ndarray:
         """
@@ -34,13 +98,64 @@ class EmbeddingToolbox:
         if not isinstance(tags, list):
             raise TypeError("encode expects a list of tags")
 
-        new_text = ""
-        if title is None:
-            new_text = blurb + " " + " ".join([f"#{tag}" for tag in tags])
-        else:
-            new_text = title + blurb + " " + " ".join([f"#{tag}" for tag in tags])
+        new_text = self._compose_text(blurb, tags, title)
+        if self.cache is not None:
+            key = self.cache.key(self.cache_namespace, new_text)
+            cached = self.cache.get(key)
+            if cached is not None:
+                return cached
+
+        self._ensure_model()
         embedding = self.model.encode(new_text, convert_to_numpy=True, normalize_embeddings=True)
+        if self.cache is not None:
+            self.cache.put(key, embedding)
         return embedding
+
+    def encode_batch(self, items: Sequence[tuple[str, list[str], Optional[str]]], batch_size: int = 32) -> np.ndarray:
+        """
+        Encodes many texts in padded batches instead of one forward pass each
+        
+        :param items: (blurb, tags, title) triples, title may be None
+        :type items: sequence of tuple
+        :param batch_size: number of texts per forward pass
+        :type batch_size: int
+        :return: np.ndarray of shape (len(items), dim), rows in input order
+        :rtype: ndarray
+        """
+        texts = []
+        for blurb, tags, title in items:
+            if not isinstance(blurb, str):
+                raise TypeError("encode_batch expects string blurbs")
+            if not isinstance(tags, list):
+                raise TypeError("encode_batch expects lists of tags")
+            texts.append(self._compose_text(blurb, tags, title))
+
+        self._ensure_model()
+        if not texts:
+            return np.zeros((0, self.model.get_sentence_embedding_dimension()), dtype=np.float32)
+        if self.cache is None:
+            return self.model.encode(texts, batch_size=batch_size, convert_to_numpy=True, normalize_embeddings=True)
+
+        # Only run the model on texts the cache has not seen
+        keys = [self.cache.key(self.cache_namespace, text) for text in texts]
+        cached = [self.cache.get(key) for key in keys]
+        missing = [i for i, vector in enumerate(cached) if vector is None]
+        if missing:
+            fresh = self.model.encode([texts[i] for i in missing], batch_size=batch_size,
+                                      convert_to_numpy=True, normalize_embeddings=True)
+            for i, vector in zip(missing, fresh):
+                self.cache.put(keys[i], vector)
+                cached[i] = vector
+        return np.stack(cached).astype(np.float32, copy=False)
+
+    @staticmethod
+    def _compose_text(blurb: str, tags: list[str], title: Optional[str] = None) -> str:
+        """
+        Builds the text that gets embedded: optional title, blurb and #tags
+        """
+        if title is None:
+            return blurb + " " + " ".join([f"#{tag}" for tag in tags])
+        return title + blurb + " " + " ".join([f"#{tag}" for tag in tags])
     
     def compute_similarity(self, emb1: np.ndarray, emb2: np.ndarray) -> float:
         """
@@ -0,0 +1,135 @@
+import json
+import os
+import socket
+import socketserver
+import struct
+import threading
+from typing import Optional
+
+import numpy as np
+
+from engine.ml_models.embedding_batcher import EmbeddingBatcher
+"""
+Local embedding model server
+
+One process loads the SentenceTransformer and serves encode requests over a Unix socket,
+so N API workers share a single copy of the model instead of loading it N times.
+Requests from all workers go through one EmbeddingBatcher and share forward passes.
+Workers use RemoteModel, which quacks like SentenceTransformer for EmbeddingToolbox.
+
+Wire format, both directions length-prefixed:
+
+    request   u32 length | JSON {"texts": [...], "batch_size": n}
+    response  u32 rows | u32 dim | rows * dim float32   (rows == ERROR: u32 length | utf-8 message)
+"""
+LENGTH = struct.Struct("<I")
+SHAPE = struct.Struct("<II")
+ERROR = 0xFFFFFFFF
+
+
+def _recv_exact(sock: socket.socket, size: int) -> bytes:
+    chunks = []
+    while size:
+        chunk = sock.recv(min(size, 1 << 20))
+        if not chunk:
+            raise ConnectionError("model server connection closed")
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+class _Handler(socketserver.BaseRequestHandler):
+    def handle(self):
+        # One connection carries many requests until the client closes it
+        while True:
+            try:
+                (length,) = LENGTH.unpack(_recv_exact(self.request, LENGTH.size))
+            except ConnectionError:
+                return
+            request = json.loads(_recv_exact(self.request, length))
+            try:
+                vectors = self.server.encode(request["texts"], request.get("batch_size", 32))
+            except Exception as e:
+                message = str(e).encode("utf-8")
+                self.request.sendall(SHAPE.pack(ERROR, 0) + LENGTH.pack(len(message)) + message)
+                continue
+            vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(len(request["texts"]), -1)
+            self.request.sendall(SHAPE.pack(*vectors.shape) + vectors.tobytes())
+
+
+class ModelServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+    def __init__(self, socket_path: str, model, max_batch: int = 64, max_wait: float = 0.005):
+        """
+        :param socket_path: Unix socket to listen on, replaced if it exists
+        :type socket_path: str
+        :param model: loaded SentenceTransformer (or an EmbeddingBatcher around one)
+        :param max_batch: texts per forward pass when the model is not batched yet
+        :type max_batch: int
+        :param max_wait: seconds a request waits for others to join its batch
+        :type max_wait: float
+        """
+        if os.path.exists(socket_path):
+            os.unlink(socket_path)
+        # One batcher serializes forward passes and merges concurrent requests
+        self.model = model if isinstance(model, EmbeddingBatcher) else EmbeddingBatcher(model, max_batch, max_wait)
+        super().__init__(socket_path, _Handler)
+
+    def encode(self, texts: list[str], batch_size: int) -> np.ndarray:
+        return self.model.encode(texts, batch_size=batch_size)
+
+
+class RemoteModel:
+    def __init__(self, socket_path: str, timeout: float = 30.0):
+        """
+        Client for ModelServer with the subset of the SentenceTransformer API EmbeddingToolbox uses
+
+        :param socket_path: Unix socket of the model server
+        :type socket_path: str
+        :param timeout: seconds to wait for one response
+        :type timeout: float
+        """
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self._local = threading.local()
+        self._dim: Optional[int] = None
+
+    def _socket(self) -> socket.socket:
+        sock = getattr(self._local, "sock", None)
+        if sock is None:
+            sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            sock.settimeout(self.timeout)
+            sock.connect(self.socket_path)
+            self._local.sock = sock
+        return sock
+
+    def _request(self, texts: list[str], batch_size: int) -> np.ndarray:
+        payload = json.dumps({"texts": texts, "batch_size": batch_size}).encode("utf-8")
+        sock = self._socket()
+        try:
+            sock.sendall(LENGTH.pack(len(payload)) + payload)
+            rows, dim = SHAPE.unpack(_recv_exact(sock, SHAPE.size))
+            if rows == ERROR:
+                (length,) = LENGTH.unpack(_recv_exact(sock, LENGTH.size))
+                raise RuntimeError(f"model server error: {_recv_exact(sock, length).decode('utf-8')}")
+            return np.frombuffer(_recv_exact(sock, rows * dim * 4), dtype=np.float32).reshape(rows, dim)
+        except (OSError, ConnectionError):
+            # Drop the broken connection, the next call reconnects
+            sock.close()
+            self._local.sock = None
+            raise
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = True) -> np.ndarray:
+        """
+        Encodes one text (returns a vector) or a list of texts (returns a matrix), always normalized
+        """
+        if isinstance(sentences, str):
+            return self._request([sentences], batch_size)[0]
+        return self._request(list(sentences), batch_size)
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dim is None:
+            self._dim = self._request([""], 1).shape[1]
+        return self._dim
@@ -0,0 +1,119 @@
+import os
+from typing import Optional
+
+import numpy as np
+"""
+ONNX Runtime backend for the sentence embedding model
+
+Runs the exported all-MiniLM-L6-v2 graph with onnxruntime and the fast `tokenizers` library,
+so CPU-only boxes need neither torch nor sentence_transformers at runtime. The pipeline
+mirrors SentenceTransformer's (tokenize, truncate to 256 tokens, transformer, attention-masked
+mean pooling, L2 normalize), so embeddings match the torch backend within:
+
+    float32 graph   cosine to torch >= 0.9999 for every sentence
+    int8 dynamic    cosine to torch >= 0.98 for every sentence
+
+`python -m benchmarks.embedding_backends` checks both tolerances and measures throughput on
+the current box. The torch backend remains the reference.
+"""
+HF_REPO = "sentence-transformers/{model_name}"
+ONNX_FILE = "onnx/model.onnx"
+MAX_SEQ_LENGTH = 256
+
+
+class OnnxEmbeddingModel:
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2", quantize: bool = False,
+                 threads: Optional[int] = None, model_dir: Optional[str] = None):
+        """
+        Loads the ONNX graph and tokenizer, downloading them from the Hugging Face hub if needed
+
+        :param model_name: sentence-transformers model id
+        :type model_name: str
+        :param quantize: apply dynamic int8 quantization to the weights (cached next to the graph)
+        :type quantize: bool
+        :param threads: intra-op threads, None lets onnxruntime use every core
+        :type threads: int or None
+        :param model_dir: local directory with onnx/model.onnx and tokenizer.json instead of the hub
+        :type model_dir: str or None
+        """
+        import onnxruntime as ort
+        from tokenizers import Tokenizer
+
+        if model_dir is not None:
+            graph_path = os.path.join(model_dir, ONNX_FILE)
+            tokenizer_path = os.path.join(model_dir, "tokenizer.json")
+        else:
+            from huggingface_hub import hf_hub_download
+            repo = HF_REPO.format(model_name=model_name)
+            graph_path = hf_hub_download(repo, ONNX_FILE)
+            tokenizer_path = hf_hub_download(repo, "tokenizer.json")
+
+        if quantize:
+            graph_path = self._quantized(graph_path)
+
+        self.tokenizer = Tokenizer.from_file(tokenizer_path)
+        self.tokenizer.enable_truncation(max_length=MAX_SEQ_LENGTH)
+        self.tokenizer.enable_padding()
+
+        options = ort.SessionOptions()
+        if threads:
+            options.intra_op_num_threads = threads
+        options.inter_op_num_threads = 1
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        self.session = ort.InferenceSession(graph_path, options, providers=["CPUExecutionProvider"])
+        self._inputs = {i.name for i in self.session.get_inputs()}
+        self._dim: Optional[int] = None
+
+    @staticmethod
+    def _quantized(graph_path: str) -> str:
+        """
+        Dynamic int8 quantization of the graph's weights, computed once and cached
+        """
+        quantized_path = graph_path[:-len(".onnx")] + "_dynamic_int8.onnx"
+        if not os.path.exists(quantized_path):
+            from onnxruntime.quantization import QuantType, quantize_dynamic
+            quantize_dynamic(graph_path, quantized_path, weight_type=QuantType.QInt8)
+        return quantized_path
+
+    def _forward(self, texts: list[str]) -> np.ndarray:
+        encodings = self.tokenizer.encode_batch(texts)
+        input_ids = np.array([e.ids for e in encodings], dtype=np.int64)
+        attention_mask = np.array([e.attention_mask for e in encodings], dtype=np.int64)
+        feeds = {"input_ids": input_ids, "attention_mask": attention_mask}
+        if "token_type_ids" in self._inputs:
+            feeds["token_type_ids"] = np.array([e.type_ids for e in encodings], dtype=np.int64)
+
+        token_embeddings = self.session.run(None, feeds)[0]
+        # Mean over real tokens only, like sentence-transformers' Pooling layer
+        mask = attention_mask[:, :, None].astype(np.float32)
+        summed = (token_embeddings * mask).sum(axis=1)
+        return summed / np.clip(mask.sum(axis=1), 1e-9, None)
+
+    def encode(self, sentences, batch_size: int = 32, convert_to_numpy: bool = True,
+               normalize_embeddings: bool = True) -> np.ndarray:
+        """
+        SentenceTransformer-style encode: one text gives a vector, a list gives a matrix
+        """
+        single = isinstance(sentences, str)
+        texts = [sentences] if single else list(sentences)
+        if not texts:
+            return np.zeros((0, self.get_sentence_embedding_dimension()), dtype=np.float32)
+
+        # Batch similar lengths together to keep padding small, then restore order
+        order = np.argsort([-len(text) for text in texts], kind="stable")
+        out = None
+        for start in range(0, len(texts), batch_size):
+            rows = order[start:start + batch_size]
+            vectors = self._forward([texts[i] for i in rows])
+            if out is None:
+                out = np.empty((len(texts), vectors.shape[1]), dtype=np.float32)
+            out[rows] = vectors
+
+        if normalize_embeddings:
+            out /= np.clip(np.linalg.norm(out, axis=1, keepdims=True), 1e-12, None)
+        return out[0] if single else out
+
+    def get_sentence_embedding_dimension(self) -> int:
+        if self._dim is None:
+            self._dim = int(self._forward([""]).shape[1])
+        return self._dim
@@ -1,14 +1,29 @@
 import os
-from openai import OpenAI
 
 class OpenAIClient:
     def __init__(self):
         """
         Initialize OpenAI client using API key from environment.
+        The openai SDK is imported and the clients built on first use.
         """
-        self.client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        self._client = None
+        self._async_client = None
         self.model = "gpt-4o-mini"  # Fast and cheap model
 
+    @property
+    def client(self):
+        if self._client is None:
+            from openai import OpenAI
+            self._client = OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._client
+
+    @property
+    def async_client(self):
+        if self._async_client is None:
+            from openai import AsyncOpenAI
+            self._async_client = AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+        return self._async_client
+
     def generate_content(self, prompt: str) -> str:
         """
         Calls OpenAI to generate content based on the prompt.
@@ -26,11 +41,42 @@ class OpenAIClient:
         )
         return response.choices[0].message.content
 
+    async def agenerate_content(self, prompt: str) -> str:
+        """
+        Async version of generate_content, does not hold a worker thread while waiting.
+
+        :param prompt: prompt to send to OpenAI
+        :type prompt: str
+        :return: response text from OpenAI
+        :rtype: str
+        """
+        response = await self.async_client.chat.completions.create(
+            model=self.model,
+            messages=[{"role": "user", "content": prompt}],
+            max_tokens=500,
+            temperature=0.7
+        )
+        return response.choices[0].message.content
+
     def generate_user_encouragement(self, coffee: dict, matcha: dict, tags: dict, total_swipes: int) -> str:
         """
         Generate an encouraging AI summary for the user based on their overall engagement.
         Returns a single encouraging message string.
         """
+        prompt = self._encouragement_prompt(coffee, matcha, tags, total_swipes)
+        response = self.generate_content(prompt)
+        return response.strip()
+
+    async def agenerate_user_encouragement(self, coffee: dict, matcha: dict, tags: dict, total_swipes: int) -> str:
+        """
+        Async version of generate_user_encouragement.
+        """
+        prompt = self._encouragement_prompt(coffee, matcha, tags, total_swipes)
+        response = await self.agenerate_content(prompt)
+        return response.strip()
+
+    @staticmethod
+    def _encouragement_prompt(coffee: dict, matcha: dict, tags: dict, total_swipes: int) -> str:
         top_tags_text = ""
         if tags.get("top_tags"):
             top_tags_list = ", ".join([tag[0] for tag in tags["top_tags"][:3]])
@@ -53,8 +99,7 @@ Write a warm, encouraging 2-3 sentence summary that:
 
 Tone: Friendly, positive, personalized. Return plain text only.
 """
-        response = self.generate_content(prompt)
-        return response.strip()
+        return prompt
 
     def augment_user_description(self, base_description: str, analytics_text: str) -> str:
         """
@@ -0,0 +1,84 @@
+"""Database-side event search through pgvector.
+
+`PgVectorIndex` has the same `add`/`search` surface as `EventIndex`, but the
+embeddings live in the `events.embedding` vector column and scoring, the seen
+filter and the top-k all happen in the `match_events` RPC (see
+`sql/001_match_events.sql`). Only the k winning ids are transferred.
+
+An index bound to a user with `for_user` does not send the seen list either:
+`match_events` reads `users.seen` itself, and only ids not stored yet (swipes
+still pending in the write-behind queue) go over the wire.
+"""
+
+from typing import Iterable, Optional
+
+import numpy as np
+
+
+class PgVectorIndex:
+    def __init__(self, supabase, matcha_mode: bool, rpc: str = "match_events", user_id: Optional[int] = None,
+                 unsaved_seen: Iterable[int] = ()):
+        """
+        :param supabase: Supabase client with the match_events function installed
+        :type supabase: Client
+        :param matcha_mode: mode this index searches
+        :type matcha_mode: bool
+        :param rpc: name of the Postgres search function
+        :type rpc: str
+        :param user_id: user whose stored seen list the database excludes, see `for_user`
+        :type user_id: int or None
+        :param unsaved_seen: ids to exclude on top of the stored seen list
+        :type unsaved_seen: iterable of int
+        """
+        self.supabase = supabase
+        self.matcha_mode = matcha_mode
+        self.rpc = rpc
+        self.user_id = user_id
+        self.unsaved_seen = sorted(set(unsaved_seen))
+
+    def for_user(self, user_id: int, unsaved_seen: Iterable[int] = ()) -> "PgVectorIndex":
+        """
+        The same index bound to one user: searches exclude that user's
+        `users.seen` inside Postgres and ignore the `seen` argument.
+
+        :param user_id: user the searches are for
+        :type user_id: int
+        :param unsaved_seen: seen ids not in `users.seen` yet
+        :type unsaved_seen: iterable of int
+        :rtype: PgVectorIndex
+        """
+        return PgVectorIndex(self.supabase, self.matcha_mode, self.rpc, user_id, unsaved_seen)
+
+    def add(self, event_id: int, embedding) -> None:
+        """No-op: create_event writes the vector column together with the row."""
+
+    def maybe_train(self) -> bool:
+        """The HNSW index is maintained by Postgres."""
+        return False
+
+    def search(self, user_embedding, seen: Iterable[int], top_k: int) -> list[int]:
+        """
+        Returns the ids of the top K unseen events by cosine similarity.
+
+        :param user_embedding: embedding of the user
+        :type user_embedding: list of float or ndarray
+        :param seen: ids of events to exclude (ignored when bound to a user)
+        :type seen: iterable of int
+        :param top_k: number of ids to return
+        :type top_k: int
+        :return: event ids ordered by descending similarity
+        :rtype: list of int
+        """
+        if top_k <= 0:
+            return []
+        query = np.asarray(user_embedding, dtype=np.float32).tolist()
+        params = {
+            "query_embedding": query,
+            "p_matcha_mode": self.matcha_mode,
+            "p_seen": self.unsaved_seen if self.user_id is not None else sorted(set(seen)),
+            "match_count": top_k,
+        }
+        if self.user_id is not None:
+            params["p_user_id"] = self.user_id
+        data = self.supabase.rpc(self.rpc, params).execute()
+        return [row["id"] for row in data.data]
@@ -0,0 +1,217 @@
+"""Quantized event index.
+
+Stores event vectors as float16 or as symmetric int8 codes with one float32
+scale per vector (2x / ~4x smaller than float32), and scores the whole
+catalog on the quantized codes in fixed-size chunks so no full float32 copy
+of the matrix is ever materialised. The best `top_k * rerank` candidates are
+then re-scored exactly against their float32 vectors.
+
+Only the quantized codes live in memory by default: the float32 vectors are
+spilled to an unlinked, disk-backed memmap file and the re-rank reads just the
+shortlisted rows from it, so the page cache holds what is hot and the rest
+stays on disk. `keep_full=True` keeps them in memory instead (more memory than
+exact search), and `rerank=0` drops them and returns the approximate order.
+
+int8 is the recommended precision: NumPy's float16 -> float32 conversion is
+slow on CPU, so float16 saves memory but scores several times slower than
+float32. `python -m benchmarks.quantization_accuracy` reports recall, score
+error, bytes per event and latency for every mode.
+"""
+
+import tempfile
+from typing import Iterable, Optional
+
+import numpy as np
+
+from engine.event_index import EventIndex
+from engine.ml_models.embedding_codec import decode_embedding
+
+PRECISIONS = {"int8": np.int8, "float16": np.float16}
+
+
+def quantize_int8(vectors: np.ndarray) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Symmetric per-vector int8 quantization.
+
+    :param vectors: float32 matrix (n, dim) or single vector
+    :type vectors: ndarray
+    :return: int8 codes and float32 scales so that vectors ~= codes * scales
+    :rtype: tuple of ndarray
+    """
+    vectors = np.atleast_2d(np.asarray(vectors, dtype=np.float32))
+    scales = np.abs(vectors).max(axis=1) / 127.0
+    scales[scales == 0] = 1.0
+    codes = np.clip(np.rint(vectors / scales[:, None]), -127, 127).astype(np.int8)
+    return codes, scales.astype(np.float32)
+
+
+class QuantizedEventIndex(EventIndex):
+    def __init__(self, dim: int = 384, capacity: int = 1024, precision: str = "int8",
+                 rerank: int = 4, keep_full: bool = False, chunk_rows: int = 256,
+                 spill_dir: Optional[str] = None):
+        """
+        :param precision: "int8" or "float16"
+        :type precision: str
+        :param rerank: candidates re-scored exactly, as a multiple of top_k (0 disables the re-rank)
+        :type rerank: int
+        :param keep_full: keep the float32 re-rank vectors in memory instead of a spill file
+        :type keep_full: bool
+        :param chunk_rows: rows dequantized at a time while scoring; small enough that a
+            float32 chunk stays in cache, which keeps int8 scoring as fast as float32
+        :type chunk_rows: int
+        :param spill_dir: directory of the spill file, default the temp dir (use a disk-backed
+            one: on tmpfs the file is in memory again)
+        :type spill_dir: str or None
+        """
+        if precision not in PRECISIONS:
+            raise ValueError(f"Unsupported precision: {precision}")
+        capacity = max(capacity, 1)
+        self.dim = dim
+        self.precision = precision
+        self.rerank = rerank
+        self.keep_full = keep_full
+        self.chunk_rows = chunk_rows
+        self._codes = np.zeros((capacity, dim), dtype=PRECISIONS[precision])
+        self._scales = np.ones(capacity, dtype=np.float32)
+        # Float32 rows for the re-rank: in memory, in the spill file, or none
+        self._spill = None
+        self._matrix = None
+        if rerank > 0 and keep_full:
+            self._matrix = np.zeros((capacity, dim), dtype=np.float32)
+        elif rerank > 0:
+            self._spill = tempfile.TemporaryFile(dir=spill_dir, prefix="quantized-")
+            self._matrix = self._map_spill(capacity)
+        self._ids = np.zeros(capacity, dtype=np.int64)
+        self._row_of: dict[int, int] = {}
+        self._size = 0
+
+    @property
+    def matrix(self) -> np.ndarray:
+        """Dequantized float32 copy of the rows (allocates, use sparingly)."""
+        if self._matrix is not None:
+            return self._matrix[:self._size]
+        return self._dequantize(0, self._size)
+
+    def vector(self, event_id: int) -> Optional[np.ndarray]:
+        row = self._row_of.get(event_id)
+        if row is None:
+            return None
+        if self._matrix is not None:
+            return self._matrix[row].copy()
+        return self._dequantize(row, row + 1)[0]
+
+    @property
+    def nbytes(self) -> int:
+        """Bytes of vector storage held in memory (the spill file is not counted)."""
+        total = self._codes.nbytes + self._scales.nbytes + self._ids.nbytes
+        if self._matrix is not None and self._spill is None:
+            total += self._matrix.nbytes
+        return total
+
+    def _map_spill(self, capacity: int) -> np.memmap:
+        # Growing the file keeps the rows already written; mappings of the
+        # shorter file stay valid for searches still using them
+        self._spill.truncate(capacity * self.dim * 4)
+        return np.memmap(self._spill, dtype=np.float32, mode="r+", shape=(capacity, self.dim))
+
+    def _reserve(self, extra: int):
+        needed = self._size + extra
+        capacity = self._codes.shape[0]
+        if needed <= capacity:
+            return
+        while capacity < needed:
+            capacity *= 2
+
+        def grow(array: np.ndarray, fill=0) -> np.ndarray:
+            grown = np.full((capacity,) + array.shape[1:], fill, dtype=array.dtype)
+            grown[:self._size] = array[:self._size]
+            return grown
+
+        self._codes = grow(self._codes)
+        self._scales = grow(self._scales, 1)
+        self._ids = grow(self._ids)
+        if self._spill is not None:
+            self._matrix = self._map_spill(capacity)
+        elif self._matrix is not None:
+            self._matrix = grow(self._matrix)
+
+    def add(self, event_id: int, embedding) -> None:
+        vector = decode_embedding(embedding)
+        if vector.shape != (self.dim,):
+            raise ValueError(f"expected embedding of shape ({self.dim},), got {vector.shape}")
+
+        row = self._row_of.get(event_id)
+        if row is None:
+            self._reserve(1)
+            row = self._size
+            self._row_of[event_id] = row
+            self._ids[row] = event_id
+            self._size += 1
+
+        if self.precision == "int8":
+            codes, scales = quantize_int8(vector)
+            self._codes[row] = codes[0]
+            self._scales[row] = scales[0]
+        else:
+            self._codes[row] = vector.astype(np.float16)
+        if self._matrix is not None:
+            self._matrix[row] = vector
+
+    def _dequantize(self, start: int, stop: int) -> np.ndarray:
+        block = self._codes[start:stop].astype(np.float32)
+        if self.precision == "int8":
+            block *= self._scales[start:stop, None]
+        return block
+
+    def approximate_scores(self, query: np.ndarray, n: Optional[int] = None) -> np.ndarray:
+        """
+        Scores every row against `query` using only the quantized codes.
+
+        :param query: float32 query vector
+        :type query: ndarray
+        :param n: score only the first n rows (defaults to all)
+        :type n: int or None
+        :return: one approximate cosine score per row
+        :rtype: ndarray
+        """
+        n = self._size if n is None else n
+        codes, scales = self._codes, self._scales
+        scores = np.empty(n, dtype=np.float32)
+        for start in range(0, n, self.chunk_rows):
+            stop = min(start + self.chunk_rows, n)
+            scores[start:stop] = codes[start:stop].astype(np.float32) @ query
+        if self.precision == "int8":
+            scores *= scales[:n]
+        return scores
+
+    def search(self, user_embedding, seen: Iterable[int], top_k: int) -> list[int]:
+        # Cut at one row count, like EventIndex.search
+        n = self._size
+        if top_k <= 0 or n == 0:
+            return []
+
+        query = np.asarray(user_embedding, dtype=np.float32)
+        full = self._matrix
+        scores = self.approximate_scores(query, n)
+        scores[self._seen_mask(seen, n)] = -np.inf
+
+        candidates = int(np.count_nonzero(scores != -np.inf))
+        k = min(top_k, candidates)
+        if k == 0:
+            return []
+
+        # Shortlist on approximate scores, re-rank exactly when possible
+        shortlist = min(candidates, k * self.rerank) if full is not None else k
+        if shortlist < n:
+            rows = np.argpartition(-scores, shortlist - 1)[:shortlist]
+        else:
+            rows = np.arange(n)
+        rows = rows[np.isfinite(scores[rows])]
+        if full is not None:
+            # Only the shortlisted rows are read (from disk when spilled), in file order
+            rows = np.sort(rows)
+            final_scores = full[rows] @ query
+        else:
+            final_scores = scores[rows]
+        rows = rows[np.argsort(-final_scores, kind="stable")][:k]
+        return self._ids[rows].tolist()
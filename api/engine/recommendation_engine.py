@@ -1,75 +1,121 @@
 """Contains the general embedding functions that call and return embeddings.
 Also contains similarity computation functions. Can be used for recommendation."""
 
-from typing import Iterable
+from typing import Callable, Iterable, Optional
 
 from engine.ml_models.embedding_toolbox import EmbeddingToolbox
 from engine.ml_models.openai_client import OpenAIClient
 from engine.analytics import aggregate_mode
+from engine.augmentation_cache import AugmentationCache
+from engine.event_index import EventIndex
+from engine.ivf_index import IVFEventIndex
+from engine.quantized_index import QuantizedEventIndex
 from models import AnalyticsSwipe
 
+def make_index_factory(backend: str = "exact", **options) -> Callable[[], EventIndex]:
+    """
+    Returns a zero-argument factory for the configured event index backend.
+
+    :param backend: "exact" for brute-force scoring, "ivf" for approximate search,
+        "quantized" for int8/float16 scoring with an exact re-rank
+    :type backend: str
+    :param options: keyword arguments for the index (e.g. nprobe, precision)
+    :return: callable building an empty index
+    :rtype: callable
+    """
+    if backend == "exact":
+        return lambda: EventIndex(**options)
+    if backend == "ivf":
+        return lambda: IVFEventIndex(**options)
+    if backend == "quantized":
+        return lambda: QuantizedEventIndex(**options)
+    raise ValueError(f"Unknown recommender backend: {backend}")
+
 def _update_user_embedding(user_blurb: str, user_tags: list[str], EmbeddingToolbox: EmbeddingToolbox,
-                          analytics_text: str, OpenAIClient: OpenAIClient) -> list[float]:
-    """Updates the user embedding based on their blurb and tags."""
+                          analytics_text: str, OpenAIClient: OpenAIClient,
+                          augment: Optional[Callable[[str], str]] = None) -> list[float]:
+    """Updates the user embedding based on their blurb and tags.
+    `augment` replaces the direct LLM call, e.g. with a cached lookup."""
     adjusted_blurb = user_blurb + " " + " ".join([f"#{tag}" for tag in user_tags])
-    adjusted_blurb = OpenAIClient.augment_user_description(
-        base_description=adjusted_blurb,
-        analytics_text=analytics_text
-    )
+    if augment is None:
+        adjusted_blurb = OpenAIClient.augment_user_description(
+            base_description=adjusted_blurb,
+            analytics_text=analytics_text
+        )
+    else:
+        adjusted_blurb = augment(adjusted_blurb)
     user_embedding = EmbeddingToolbox.encode(adjusted_blurb, user_tags)
     return user_embedding.tolist()
 
-def _get_top_events(user_embedding: list[float], event_embeddings_dict: dict[int, list[float]], 
-                   seen: list[int], EmbeddingToolbox: EmbeddingToolbox, top_k: int) -> list[int]:
+def _get_top_events(user_embedding: list[float], event_index: EventIndex,
+                   seen: list[int], top_k: int) -> list[int]:
     """
-    Given a user embedding and a list of event embeddings, return the top K
-    most similar events based on cosine similarity.
+    Given a user embedding and an index of event embeddings, return the top K
+    most similar unseen events based on cosine similarity.
 
     :param user_embedding: list embedding of the user
     :type user_embedding: list of float
-    :param event_embeddings_dict: list of list embeddings for events
-    :type event_embeddings_dict: dict of int to list of float
+    :param event_index: index over the event embeddings of one mode
+        (EventIndex, IVFEventIndex or PgVectorIndex)
+    :type event_index: EventIndex
+    :param seen: ids of events the user has already swiped
+    :type seen: list of int or SeenSet
     :param top_k: number of top similar events to return
     :type top_k: int
     :return: list of top K most similar event ids
     :rtype: list of ints
     """
-    similarities = []
-    for key in event_embeddings_dict:
-        if not isinstance(event_embeddings_dict[key], list):
-            raise TypeError("event_embeddings_dict values must be list embeddings")
-        
-        if key in seen:
-            continue
-        else:
-            compatability = EmbeddingToolbox.compute_similarity(
-                EmbeddingToolbox.list_to_embedding(user_embedding),
-                EmbeddingToolbox.list_to_embedding(event_embeddings_dict[key])
-            )
-            similarities.append((key, compatability))
-    
-    similarities.sort(key=lambda x: x[1], reverse=True)
-    sorted_ids = [event_id for event_id, _ in similarities]
-    return sorted_ids[:top_k]
+    return event_index.search(user_embedding, seen, top_k)
 
-def recommend_events(event_embeddings_dict: dict[int, list[float]], seen: list[int], EmbeddingToolbox: EmbeddingToolbox, 
+def recommend_events(event_embeddings_dict: Optional[dict[int, list[float]]], seen: list[int], EmbeddingToolbox: EmbeddingToolbox, 
                      user_blurb: str, user_tags: list[str], OpenAIClient: OpenAIClient,
-                     swipes: Iterable[AnalyticsSwipe], matcha_mode: bool, top_k=5) -> list[int]:
+                     swipes: Iterable[AnalyticsSwipe], matcha_mode: bool, top_k=5,
+                     event_index: Optional[EventIndex] = None, user_id: Optional[int] = None,
+                     augmentation_cache: Optional[AugmentationCache] = None,
+                     user_embedding: Optional[list[float]] = None) -> list[int]:
     """Recommends events to the user based on their embedding and event embeddings.
-    USE THIS AS THE MAIN FUNCTION FOR RECOMMENDATION."""
+    USE THIS AS THE MAIN FUNCTION FOR RECOMMENDATION.
+
+    Pass a prebuilt `event_index` for the mode to skip rebuilding the embedding
+    matrix from `event_embeddings_dict` on every call; the dict may then be None.
+    With a `user_id` and `augmentation_cache` the LLM profile augmentation is
+    served from the cache instead of being requested on every call.
+    A `user_embedding` (e.g. the stored vector kept up to date by swipe
+    feedback) is scored as is, skipping the augmentation and the encode."""
+    if event_index is None:
+        event_index = EventIndex.from_dict(event_embeddings_dict)
+    if user_embedding is not None:
+        return _get_top_events(
+            user_embedding=user_embedding,
+            event_index=event_index,
+            seen=seen,
+            top_k=top_k
+        )
     aggregate_mode_data = aggregate_mode(swipes, matcha_mode)
+
+    augment = None
+    if augmentation_cache is not None and user_id is not None:
+        augment = lambda base_description: augmentation_cache.get(
+            user_id=user_id,
+            matcha_mode=matcha_mode,
+            base_description=base_description,
+            aggregate=aggregate_mode_data,
+            swipe_count=len(seen),
+            augment=OpenAIClient.augment_user_description,
+        )
+
     user_embedding = _update_user_embedding(
         user_blurb=user_blurb,
         user_tags=user_tags,
         EmbeddingToolbox=EmbeddingToolbox,
         analytics_text=str(aggregate_mode_data),
-        OpenAIClient=OpenAIClient
+        OpenAIClient=OpenAIClient,
+        augment=augment,
     )
     top_events = _get_top_events(
         user_embedding=user_embedding,
-        event_embeddings_dict=event_embeddings_dict,
+        event_index=event_index,
         seen=seen,
-        EmbeddingToolbox=EmbeddingToolbox,
         top_k=top_k
     )
     return top_events
\ No newline at end of file
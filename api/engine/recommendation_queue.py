@@ -0,0 +1,249 @@
+"""Precomputed per-user recommendation queues.
+
+Scoring a feed page costs a user encode and possibly an LLM augmentation.
+`RecommendationQueues` keeps a ranked queue of the next `size` event ids per
+(user, mode), computed in the background, so `GET /events` usually just
+reads the first unseen ids off it. Serving does not consume ids, swiping
+does: a reload or a dropped client gets the same events again until they
+are swiped. A queue is recomputed in the background when
+
+- fewer than `low_water` unswiped ids are left in it,
+- the user has swiped `refresh_swipes` times since it was computed, or
+- the catalog version moved (new events may outrank the queued ones); the
+  loop started by `start` sweeps these without waiting for a request.
+
+Only a dry queue (a user's first request, or one faster than the refresh)
+computes on the request path. Concurrent refreshes of the same queue share
+one task, and at most `max_concurrency` run at once.
+"""
+
+import asyncio
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Awaitable, Callable, Container, Optional
+
+import numpy as np
+
+ComputeFn = Callable[[int, bool, int], Awaitable[list[int]]]
+Key = tuple[int, bool]
+
+
+@dataclass
+class _Queue:
+    ids: np.ndarray
+    # ids[:cursor] are all swiped
+    cursor: int
+    catalog_version: int
+    swipes: int = 0
+    # Swiped here but maybe not in the caller's seen set yet (write-behind ingestion)
+    swiped_ids: set = field(default_factory=set)
+
+
+class RecommendationQueues:
+    def __init__(self, compute: ComputeFn, size: int = 50, low_water: int = 10, refresh_swipes: int = 5,
+                 catalog_version: Callable[[], int] = lambda: 0, max_concurrency: int = 4,
+                 max_entries: int = 50000):
+        """
+        :param compute: coroutine (user_id, matcha_mode, size) -> ranked event ids
+        :type compute: callable
+        :param size: ids computed per queue
+        :type size: int
+        :param low_water: ids left that trigger a background refresh
+        :type low_water: int
+        :param refresh_swipes: swipes since the last computation that trigger a refresh
+        :type refresh_swipes: int
+        :param catalog_version: returns a number that changes when events are added
+        :type catalog_version: callable
+        :param max_concurrency: refreshes running at the same time
+        :type max_concurrency: int
+        :param max_entries: (user, mode) queues kept before the least recently used are dropped
+        :type max_entries: int
+        """
+        self.compute = compute
+        self.size = size
+        self.low_water = low_water
+        self.refresh_swipes = refresh_swipes
+        self.catalog_version = catalog_version
+        self.max_concurrency = max_concurrency
+        self.max_entries = max_entries
+        self._entries: OrderedDict[Key, _Queue] = OrderedDict()
+        self._inflight: dict[Key, asyncio.Task] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+        self._sweeper: Optional[asyncio.Task] = None
+
+        self.served = 0
+        self.dry = 0
+        self.refreshes = 0
+        self.failures = 0
+
+    async def next(self, user_id: int, matcha_mode: bool, seen: Container[int], limit: int) -> list[int]:
+        """
+        The first `limit` unseen ids of a user's queue, computing the queue
+        first if it runs dry. The ids stay queued until they are swiped.
+
+        :param user_id: id of the user
+        :type user_id: int
+        :param matcha_mode: feed mode
+        :type matcha_mode: bool
+        :param seen: ids the user has already swiped
+        :type seen: set or SeenSet
+        :param limit: ids wanted
+        :type limit: int
+        :return: event ids, best first; fewer than `limit` only if the
+            computation failed or found nothing more
+        :rtype: list of int
+        """
+        key = (user_id, matcha_mode)
+        ids = self._peek(key, seen, limit)
+        if len(ids) < limit:
+            self.dry += 1
+            await asyncio.shield(self.schedule(key))
+            ids += self._peek(key, seen, limit - len(ids), skip=set(ids))
+        elif self._needs_refresh(key):
+            self.schedule(key)
+        self.served += len(ids)
+        return ids
+
+    def swiped(self, user_id: int, matcha_mode: bool, event_id: int):
+        """
+        Consumes a swiped id, refreshing the queue in the background every
+        `refresh_swipes` swipes.
+        """
+        entry = self._entries.get((user_id, matcha_mode))
+        if entry is None:
+            return
+        entry.swiped_ids.add(event_id)
+        entry.swipes += 1
+        if entry.swipes >= self.refresh_swipes:
+            self.schedule((user_id, matcha_mode))
+
+    def start(self, interval: float = 5.0, max_per_sweep: int = 200):
+        """
+        Starts the background loop refreshing queues computed before the
+        catalog version last moved. Call from the running event loop.
+
+        :param interval: seconds between sweeps
+        :type interval: float
+        :param max_per_sweep: refreshes scheduled per sweep, most recently used queues first
+        :type max_per_sweep: int
+        """
+        if self._sweeper is None:
+            self._sweeper = asyncio.create_task(self._sweep_forever(interval, max_per_sweep))
+
+    async def stop(self):
+        """Stops the sweep loop and cancels refreshes in flight."""
+        tasks = list(self._inflight.values())
+        if self._sweeper is not None:
+            tasks.append(self._sweeper)
+            self._sweeper = None
+        for task in tasks:
+            task.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+
+    def sweep(self, max_refreshes: int) -> int:
+        """
+        Schedules refreshes of queues older than the current catalog version.
+
+        :return: refreshes scheduled
+        :rtype: int
+        """
+        version = self.catalog_version()
+        stale = [key for key, entry in reversed(self._entries.items())
+                 if entry.catalog_version != version and key not in self._inflight]
+        for key in stale[:max_refreshes]:
+            self.schedule(key)
+        return min(len(stale), max_refreshes)
+
+    async def _sweep_forever(self, interval: float, max_per_sweep: int):
+        while True:
+            await asyncio.sleep(interval)
+            try:
+                self.sweep(max_per_sweep)
+            except Exception as e:
+                print(f"[RecommendationQueue] Sweep failed: {e}")
+
+    def invalidate(self, user_id: int, matcha_mode: bool):
+        """Drops a queue, the next request computes it again."""
+        self._entries.pop((user_id, matcha_mode), None)
+
+    def schedule(self, key: Key) -> asyncio.Task:
+        """
+        Starts recomputing a queue in the background, or joins the refresh
+        already in flight for it.
+
+        :rtype: asyncio.Task
+        """
+        task = self._inflight.get(key)
+        if task is None:
+            task = asyncio.create_task(self._refresh(key))
+            self._inflight[key] = task
+        return task
+
+    def _peek(self, key: Key, seen: Container[int], limit: int, skip: Container[int] = ()) -> list[int]:
+        entry = self._entries.get(key)
+        if entry is None or limit <= 0:
+            return []
+        self._entries.move_to_end(key)
+        out = []
+        position = entry.cursor
+        while position < len(entry.ids) and len(out) < limit:
+            event_id = int(entry.ids[position])
+            position += 1
+            if event_id in seen or event_id in entry.swiped_ids:
+                # Only a swiped prefix is dropped for good
+                if position - 1 == entry.cursor:
+                    entry.cursor = position
+                continue
+            if event_id not in skip:
+                out.append(event_id)
+        return out
+
+    def _needs_refresh(self, key: Key) -> bool:
+        entry = self._entries.get(key)
+        if entry is None:
+            return False
+        remaining = sum(1 for event_id in entry.ids[entry.cursor:].tolist() if event_id not in entry.swiped_ids)
+        return (remaining < self.low_water
+                or entry.swipes >= self.refresh_swipes
+                or entry.catalog_version != self.catalog_version())
+
+    async def _refresh(self, key: Key):
+        user_id, matcha_mode = key
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.max_concurrency)
+        try:
+            async with self._semaphore:
+                version = self.catalog_version()
+                ids = await self.compute(user_id, matcha_mode, self.size)
+        except Exception as e:
+            # Keep whatever is queued, the next request tries again
+            self.failures += 1
+            print(f"[RecommendationQueue] Refresh failed for user {user_id}: {e}")
+            return
+        finally:
+            self._inflight.pop(key, None)
+
+        self.refreshes += 1
+        previous = self._entries.get(key)
+        self._entries[key] = _Queue(
+            ids=np.asarray(ids, dtype=np.int64),
+            cursor=0,
+            catalog_version=version,
+            # Swipes the computation's seen set may not include yet
+            swiped_ids=previous.swiped_ids & set(ids) if previous is not None else set(),
+        )
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        """Queue counters and sizes."""
+        return {
+            "queues": len(self._entries),
+            "queued_ids": sum(len(e.ids) - e.cursor for e in self._entries.values()),
+            "served": self.served,
+            "dry": self.dry,
+            "refreshes": self.refreshes,
+            "failures": self.failures,
+            "inflight": len(self._inflight),
+        }
@@ -0,0 +1,224 @@
+"""Compact per-user seen sets.
+
+`users.seen` only ever grows, and power users reach thousands of swipes.
+Fetching, parsing and scanning the whole JSON list on every feed request
+costs O(swipes) each time. A `SeenSet` keeps the ids as one sorted int64
+array instead:
+
+- `in` is a binary search,
+- `mask(ids)` checks a whole id vector (e.g. an index's rows) in one
+  vectorized `searchsorted`, and
+- the serialized form is delta + varint encoded, ~1-2 bytes per id.
+
+Serialized layout (base64 text, so it fits a text column):
+
+    magic b"CS" | version u8 | reserved u8 | count u32 | varint(id[0]) | varint(id[i] - id[i-1]) ...
+
+`SeenSetCache` keeps recently used sets per user together with the length
+of the `seen` array they cover. `seen` is append-only, so a cached set that
+covers the first n entries is brought up to date by fetching only entries
+n+1.. (sql/005_seen_sets.sql).
+"""
+
+import base64
+import struct
+import threading
+from collections import OrderedDict
+from typing import Iterable, Iterator, Optional
+
+import numpy as np
+
+MAGIC = b"CS"
+VERSION = 1
+HEADER = struct.Struct("<2sBBI")
+# A uint64 needs at most 10 groups of 7 bits
+MAX_VARINT_BYTES = 10
+
+
+def _varint_encode(values: np.ndarray) -> bytes:
+    values = values.astype(np.uint64)
+    lengths = np.ones(len(values), dtype=np.int64)
+    for k in range(1, MAX_VARINT_BYTES):
+        lengths += (values >> np.uint64(7 * k)) > 0
+    starts = np.concatenate(([0], np.cumsum(lengths)[:-1])).astype(np.int64)
+    out = np.zeros(int(lengths.sum()), dtype=np.uint8)
+    for k in range(int(lengths.max(initial=0))):
+        sel = lengths > k
+        group = (values[sel] >> np.uint64(7 * k)) & np.uint64(0x7F)
+        more = (lengths[sel] > k + 1).astype(np.uint64) << np.uint64(7)
+        out[starts[sel] + k] = (group | more).astype(np.uint8)
+    return out.tobytes()
+
+
+def _varint_decode(data: bytes, count: int) -> np.ndarray:
+    raw = np.frombuffer(data, dtype=np.uint8)
+    ends = np.flatnonzero((raw & 0x80) == 0)
+    if len(ends) != count:
+        raise ValueError(f"expected {count} varints, found {len(ends)}")
+    starts = np.concatenate(([0], ends[:-1] + 1)).astype(np.int64)
+    lengths = ends - starts + 1
+    values = np.zeros(count, dtype=np.uint64)
+    for k in range(int(lengths.max(initial=0))):
+        sel = lengths > k
+        values[sel] |= (raw[starts[sel] + k] & 0x7F).astype(np.uint64) << np.uint64(7 * k)
+    return values
+
+
+class SeenSet:
+    def __init__(self, ids: Iterable[int] = ()):
+        """
+        :param ids: seen event ids, in any order, duplicates allowed
+        :type ids: iterable of int
+        """
+        self._ids = np.unique(np.fromiter(ids, dtype=np.int64))
+
+    @classmethod
+    def _from_sorted(cls, ids: np.ndarray) -> "SeenSet":
+        seen = cls.__new__(cls)
+        seen._ids = ids
+        return seen
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self._ids.tolist())
+
+    def __contains__(self, event_id) -> bool:
+        pos = int(np.searchsorted(self._ids, event_id))
+        return pos < len(self._ids) and self._ids[pos] == event_id
+
+    @property
+    def ids(self) -> np.ndarray:
+        """Sorted unique ids (a view, do not mutate)."""
+        return self._ids
+
+    def mask(self, ids) -> np.ndarray:
+        """
+        Vectorized membership test.
+
+        :param ids: event ids to check, e.g. an index's row ids
+        :type ids: ndarray or sequence of int
+        :return: boolean array, True where the id has been seen
+        :rtype: ndarray
+        """
+        ids = np.asarray(ids, dtype=np.int64)
+        if len(self._ids) == 0 or len(ids) == 0:
+            return np.zeros(len(ids), dtype=bool)
+        pos = np.minimum(np.searchsorted(self._ids, ids), len(self._ids) - 1)
+        return self._ids[pos] == ids
+
+    def add(self, event_id: int) -> bool:
+        """
+        Adds one id in place.
+
+        :return: whether the id was new
+        :rtype: bool
+        """
+        pos = int(np.searchsorted(self._ids, event_id))
+        if pos < len(self._ids) and self._ids[pos] == event_id:
+            return False
+        self._ids = np.insert(self._ids, pos, event_id)
+        return True
+
+    def union(self, ids: Iterable[int]) -> "SeenSet":
+        """A new set with `ids` added; this one is left untouched."""
+        extra = np.fromiter(ids, dtype=np.int64)
+        if len(extra) == 0:
+            return self._from_sorted(self._ids)
+        return self._from_sorted(np.union1d(self._ids, extra))
+
+    def to_bytes(self) -> bytes:
+        if len(self._ids) and self._ids[0] < 0:
+            raise ValueError("seen sets only store non-negative ids")
+        deltas = np.diff(self._ids, prepend=np.int64(0))
+        return HEADER.pack(MAGIC, VERSION, 0, len(self._ids)) + _varint_encode(deltas)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> "SeenSet":
+        if len(data) < HEADER.size:
+            raise ValueError("seen set is truncated")
+        magic, version, _, count = HEADER.unpack_from(data)
+        if magic != MAGIC or version != VERSION:
+            raise ValueError("not a serialized seen set")
+        deltas = _varint_decode(data[HEADER.size:], count)
+        return cls._from_sorted(np.cumsum(deltas, dtype=np.uint64).astype(np.int64))
+
+    def encode(self) -> str:
+        """Serialized form as base64 text."""
+        return base64.b64encode(self.to_bytes()).decode("ascii")
+
+    @classmethod
+    def decode(cls, text: str) -> "SeenSet":
+        return cls.from_bytes(base64.b64decode(text))
+
+
+class SeenSetCache:
+    def __init__(self, max_entries: int = 50000):
+        """
+        :param max_entries: users kept before the least recently used are dropped
+        :type max_entries: int
+        """
+        self.max_entries = max_entries
+        self._entries: OrderedDict[int, tuple[SeenSet, int]] = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.tail_loads = 0
+        self.full_loads = 0
+
+    def get(self, user_id: int) -> Optional[tuple[SeenSet, int]]:
+        """
+        Cached set of a user and the `seen` length it covers, or None.
+        """
+        with self._lock:
+            entry = self._entries.get(user_id)
+            if entry is not None:
+                self._entries.move_to_end(user_id)
+            return entry
+
+    def resume_from(self, user_id: int, seen_count: int) -> tuple[SeenSet, int]:
+        """
+        Where loading a user's set should start for a `seen` array of
+        `seen_count` entries: the cached set and the number of entries it
+        covers, or an empty set and 0 if nothing usable is cached.
+        A cache hit is a result covering all `seen_count` entries. A cached set
+        covering more entries than `seen_count` (a lagging replica, or a swipe
+        racing the read) is the fresher one and is returned as is.
+        """
+        entry = self.get(user_id)
+        with self._lock:
+            if entry is not None and entry[1] >= seen_count:
+                self.hits += 1
+            elif entry is not None and entry[1] < seen_count:
+                self.tail_loads += 1
+            else:
+                self.full_loads += 1
+                return SeenSet(), 0
+        return entry
+
+    def put(self, user_id: int, seen: SeenSet, seen_count: int):
+        """
+        Stores a user's set covering the first `seen_count` entries of `seen`.
+        """
+        with self._lock:
+            current = self._entries.get(user_id)
+            # Concurrent loads may finish out of order, keep the fresher one
+            if current is not None and current[1] > seen_count:
+                return
+            self._entries[user_id] = (seen, seen_count)
+            self._entries.move_to_end(user_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def invalidate(self, user_id: int):
+        with self._lock:
+            self._entries.pop(user_id, None)
+
+    def stats(self) -> dict:
+        return {
+            "users": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "tail_loads": self.tail_loads,
+            "full_loads": self.full_loads,
+        }
@@ -0,0 +1,205 @@
+"""Event embedding matrix shared across worker processes.
+
+With several uvicorn workers every process used to hold its own copy of the
+event embeddings. In shared mode one loader process
+(`python -m scripts.publish_catalog`) keeps the catalog and writes each
+mode's ids and float32 matrix to a snapshot file; workers map the file
+read-only with `np.memmap`, so the matrix lives once in the page cache no
+matter how many workers run.
+
+Snapshot layout (little-endian), rows sorted by event id:
+
+    magic b"CEIX" | version u32 | dim u32 | count u64 | generation u64
+    padding to 64 bytes | ids int64[count] | padding to 64 | float32[count, dim]
+
+Snapshots are replaced atomically (write to a temp file, then `os.replace`),
+so a worker still searching an old mapping keeps a consistent view until it
+remaps on its next check.
+"""
+
+import numbers
+import os
+import struct
+import tempfile
+import threading
+import time
+from typing import Iterable, Optional
+
+import numpy as np
+
+from engine.event_index import EventIndex
+from engine.seen_set import SeenSet
+
+MAGIC = b"CEIX"
+VERSION = 1
+HEADER = struct.Struct("<4sIIQQ")
+ALIGN = 64
+
+
+def _aligned(offset: int) -> int:
+    return (offset + ALIGN - 1) // ALIGN * ALIGN
+
+
+def shared_index_path(directory: str, matcha_mode: bool) -> str:
+    """Snapshot file of one mode inside the shared directory."""
+    return os.path.join(directory, f"events-{'matcha' if matcha_mode else 'coffee'}.idx")
+
+
+def publish_index(index: EventIndex, path: str) -> int:
+    """
+    Writes an index's ids and vectors to a snapshot file, atomically.
+
+    :param index: populated index (any backend, vectors are read via `matrix`)
+    :type index: EventIndex
+    :param path: destination snapshot file
+    :type path: str
+    :return: generation number written
+    :rtype: int
+    """
+    ids = np.asarray(index.ids, dtype=np.int64)
+    order = np.argsort(ids, kind="stable")
+    matrix = np.ascontiguousarray(index.matrix[order], dtype=np.float32)
+    generation = time.time_ns()
+
+    ids_offset = _aligned(HEADER.size)
+    matrix_offset = _aligned(ids_offset + ids.nbytes)
+    directory = os.path.dirname(path) or "."
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=".events-", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(HEADER.pack(MAGIC, VERSION, index.dim, len(ids), generation))
+            f.seek(ids_offset)
+            f.write(ids[order].tobytes())
+            f.seek(matrix_offset)
+            f.write(matrix.tobytes())
+            f.truncate(matrix_offset + matrix.nbytes)
+        os.chmod(tmp_path, 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return generation
+
+
+class MappedSnapshot(EventIndex):
+    """Read-only `EventIndex` over one mapped snapshot file."""
+
+    def __init__(self, path: str):
+        raw = np.memmap(path, dtype=np.uint8, mode="r")
+        magic, version, dim, count, generation = HEADER.unpack_from(raw[:HEADER.size].tobytes())
+        if magic != MAGIC or version != VERSION:
+            raise ValueError(f"{path} is not an event index snapshot")
+
+        ids_offset = _aligned(HEADER.size)
+        matrix_offset = _aligned(ids_offset + count * 8)
+        self.dim = dim
+        self.generation = generation
+        self._ids = raw[ids_offset:ids_offset + count * 8].view(np.int64)
+        self._matrix = raw[matrix_offset:matrix_offset + count * dim * 4].view(np.float32).reshape(count, dim)
+        # Rows are sorted by id, so lookups use searchsorted instead of a
+        # per-worker id -> row dict
+        self._row_of = {}
+        self._size = int(count)
+
+    def _rows(self, event_ids: Iterable[int]) -> np.ndarray:
+        # numbers.Integral also takes NumPy integers (ids coming from arrays)
+        wanted = np.fromiter((e for e in set(event_ids) if isinstance(e, numbers.Integral)), dtype=np.int64)
+        if self._size == 0 or len(wanted) == 0:
+            return np.zeros(0, dtype=np.int64)
+        rows = np.minimum(np.searchsorted(self._ids, wanted), self._size - 1)
+        return rows[self._ids[rows] == wanted]
+
+    def __contains__(self, event_id: int) -> bool:
+        return len(self._rows([event_id])) == 1
+
+    def vector(self, event_id: int) -> Optional[np.ndarray]:
+        rows = self._rows([event_id])
+        return np.array(self._matrix[rows[0]]) if len(rows) else None
+
+    def add(self, event_id: int, embedding) -> None:
+        raise TypeError("Mapped snapshots are read-only, publish a new snapshot instead")
+
+    def _seen_mask(self, seen: Iterable[int], n: int) -> np.ndarray:
+        # Snapshots never grow, n is always the full size
+        if isinstance(seen, SeenSet):
+            return seen.mask(self._ids)
+        mask = np.zeros(self._size, dtype=bool)
+        mask[self._rows(seen)] = True
+        return mask
+
+
+class SharedEventIndex(EventIndex):
+    def __init__(self, path: str, dim: int = 384, check_interval: float = 1.0):
+        """
+        Worker-side view of a published snapshot, remapped when the loader
+        publishes a new one. `add` is a no-op: new events become searchable
+        once the loader picks them up and republishes.
+
+        :param path: snapshot file written by `publish_index`
+        :type path: str
+        :param dim: embedding dimension, used while no snapshot exists yet
+        :type dim: int
+        :param check_interval: min seconds between checks for a new snapshot
+        :type check_interval: float
+        """
+        self.path = path
+        self.dim = dim
+        self.check_interval = check_interval
+        self._snapshot: Optional[MappedSnapshot] = None
+        self._stat: Optional[tuple[int, int]] = None
+        self._checked_at = 0.0
+        self._lock = threading.Lock()
+        self.refresh(force=True)
+
+    def refresh(self, force: bool = False) -> bool:
+        """
+        Remaps the snapshot if the file was replaced.
+
+        :return: whether a new snapshot was mapped
+        :rtype: bool
+        """
+        now = time.monotonic()
+        if not force and now - self._checked_at < self.check_interval:
+            return False
+        with self._lock:
+            self._checked_at = now
+            try:
+                st = os.stat(self.path)
+            except FileNotFoundError:
+                return False
+            if (st.st_ino, st.st_mtime_ns) == self._stat:
+                return False
+            self._snapshot = MappedSnapshot(self.path)
+            self._stat = (st.st_ino, st.st_mtime_ns)
+            return True
+
+    def _current(self) -> EventIndex:
+        self.refresh()
+        return self._snapshot if self._snapshot is not None else EventIndex(self.dim, capacity=1)
+
+    def __len__(self) -> int:
+        return len(self._current())
+
+    def __contains__(self, event_id: int) -> bool:
+        return event_id in self._current()
+
+    @property
+    def ids(self) -> np.ndarray:
+        return self._current().ids
+
+    @property
+    def matrix(self) -> np.ndarray:
+        return self._current().matrix
+
+    def vector(self, event_id: int) -> Optional[np.ndarray]:
+        return self._current().vector(event_id)
+
+    def add(self, event_id: int, embedding) -> None:
+        pass
+
+    def seen_mask(self, seen: Iterable[int]) -> np.ndarray:
+        return self._current().seen_mask(seen)
+
+    def search(self, user_embedding, seen: Iterable[int], top_k: int) -> list[int]:
+        # One snapshot for the whole search, even if a new one lands meanwhile
+        return self._current().search(user_embedding, seen, top_k)
@@ -0,0 +1,378 @@
+"""Write-behind swipe ingestion.
+
+`SwipeQueue.put` appends a swipe to a local append-only journal and an
+in-memory bounded queue, then returns; a background thread hands swipes to
+`flush` in batches once `flush_size` are pending or `flush_interval` seconds
+have passed. Every record carries an `ingest_id`, so a batch replayed after a
+crash between the database commit and the journal checkpoint is ignored by
+`record_swipes` (sql/003_record_swipes.sql) instead of being counted twice.
+
+A batch the store rejects (`rejects` says the error is the rows' fault, e.g.
+a constraint violation), or one that failed `max_attempts` times in a row, is
+retried one swipe at a time; swipes that still fail are appended to the
+dead-letter file `<journal_path>.dead` (with the error) and skipped, so one
+bad row does not hold up every later swipe.
+
+Every process journals to its own files, so uvicorn workers never truncate
+each other's unflushed swipes:
+
+    <journal_path>.<pid>            one JSON record per line, with a "seq" number
+    <journal_path>.<pid>.committed  highest seq known to be flushed
+
+A process holds an exclusive lock on its journal while it runs. On start it
+replays its own journal and adopts those of processes that exited without
+draining (any journal it can lock), so each leftover swipe is replayed by
+exactly one worker. The journal is truncated whenever the queue drains
+completely.
+"""
+
+import glob
+import json
+import os
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Callable, Optional
+
+try:
+    import fcntl
+except ImportError:  # Windows: no journal locking, other journals are not adopted
+    fcntl = None
+
+
+class SwipeQueueFull(Exception):
+    """Raised by `put` when the queue stays full for the whole timeout."""
+
+
+class SwipeQueue:
+    def __init__(self, flush: Callable[[list[dict]], None], journal_path: Optional[str] = None,
+                 max_pending: int = 10000, flush_size: int = 500, flush_interval: float = 1.0,
+                 fsync: bool = False, retry_backoff: float = 1.0, max_attempts: int = 10,
+                 rejects: Optional[Callable[[Exception], bool]] = None):
+        """
+        :param flush: writes one batch of swipe records, raising on failure
+        :type flush: callable
+        :param journal_path: base path of the per-process journals, None disables durability
+        :type journal_path: str or None
+        :param max_pending: swipes held before `put` applies backpressure
+        :type max_pending: int
+        :param flush_size: swipes per batch; reaching it triggers a flush
+        :type flush_size: int
+        :param flush_interval: max seconds a swipe waits before being flushed
+        :type flush_interval: float
+        :param fsync: fsync the journal on every put (durable across power loss)
+        :type fsync: bool
+        :param retry_backoff: seconds to wait after a failed flush, doubled per retry up to 30s
+        :type retry_backoff: float
+        :param max_attempts: failed flushes of one batch before its failing swipes are dead-lettered
+        :type max_attempts: int
+        :param rejects: whether a flush error is caused by the swipes themselves rather than an outage
+        :type rejects: callable or None
+        """
+        self.flush = flush
+        self.journal_path = journal_path
+        self.max_pending = max_pending
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.fsync = fsync
+        self.retry_backoff = retry_backoff
+        self.max_attempts = max_attempts
+        self.rejects = rejects or (lambda e: False)
+
+        self._pending: deque[dict] = deque()
+        self._cond = threading.Condition()
+        self._stopping = False
+        self._thread: Optional[threading.Thread] = None
+        self._journal = None
+        self._path: Optional[str] = None
+        self._seq = 0
+        self._committed = 0
+
+        self.accepted = 0
+        self.flushed = 0
+        self.batches = 0
+        self.rejected = 0
+        self.failed_flushes = 0
+        self.dead_lettered = 0
+
+    def start(self):
+        """Replays unflushed journal records, then starts the flush thread."""
+        if self.journal_path:
+            self._path = f"{self.journal_path}.{os.getpid()}"
+            self._journal = _open_locked(self._path)
+            replayed = self._replay()
+            if replayed:
+                print(f"[SwipeQueue] Replaying {replayed} swipes from {self.journal_path}.*")
+        self._stopping = False
+        self._thread = threading.Thread(target=self._run, name="swipe-queue", daemon=True)
+        self._thread.start()
+
+    def stop(self, timeout: Optional[float] = None):
+        """
+        Stops accepting swipes, flushes what it can and joins the thread.
+        A failing flush is not retried once stopping; whatever is still
+        pending stays in the journal and is replayed by the next `start`.
+
+        :param timeout: seconds to wait for the drain, None waits indefinitely
+        :type timeout: float or None
+        """
+        with self._cond:
+            self._stopping = True
+            self._cond.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+            if self._thread.is_alive():
+                print(f"[SwipeQueue] Drain timed out with {len(self._pending)} swipes pending")
+            self._thread = None
+        # Under the lock, so a flush finishing late does not checkpoint into a closed file
+        with self._cond:
+            if self._pending:
+                where = f"left in {self._path}" if self._path else "lost (no journal)"
+                print(f"[SwipeQueue] {len(self._pending)} unflushed swipes {where}")
+            if self._journal is not None:
+                self._journal.close()
+                self._journal = None
+
+    def put(self, record: dict, timeout: Optional[float] = 0.0) -> str:
+        """
+        Journals and enqueues one swipe.
+
+        :param record: analytics row (user_id, event_id, time_spent, liked, matcha_mode)
+        :type record: dict
+        :param timeout: seconds to wait for room when full, 0 fails immediately, None waits forever
+        :type timeout: float or None
+        :return: ingest id assigned to the swipe
+        :rtype: str
+        :raises SwipeQueueFull: if there was no room within `timeout`
+        """
+        with self._cond:
+            if self._stopping:
+                raise SwipeQueueFull("Swipe queue is shutting down")
+            if not self._cond.wait_for(lambda: len(self._pending) < self.max_pending, timeout):
+                self.rejected += 1
+                raise SwipeQueueFull(f"{len(self._pending)} swipes pending")
+
+            self._seq += 1
+            record = dict(record, ingest_id=record.get("ingest_id") or str(uuid.uuid4()), seq=self._seq)
+            if self._journal is not None:
+                self._journal.write(json.dumps(record) + "\n")
+                self._journal.flush()
+                if self.fsync:
+                    os.fsync(self._journal.fileno())
+            self._pending.append(record)
+            self.accepted += 1
+            if len(self._pending) >= self.flush_size:
+                self._cond.notify_all()
+            return record["ingest_id"]
+
+    def pending_for(self, user_id: int) -> list[dict]:
+        """
+        Accepted swipes of one user that are not flushed yet, oldest first, so
+        reads can include them before `record_swipes` lands them.
+
+        :return: copies of the pending records
+        :rtype: list of dict
+        """
+        with self._cond:
+            return [dict(record) for record in self._pending if record["user_id"] == user_id]
+
+    def stats(self) -> dict:
+        """Queue depth and throughput counters."""
+        return {
+            "pending": len(self._pending),
+            "max_pending": self.max_pending,
+            "accepted": self.accepted,
+            "flushed": self.flushed,
+            "batches": self.batches,
+            "rejected": self.rejected,
+            "failed_flushes": self.failed_flushes,
+            "dead_lettered": self.dead_lettered,
+        }
+
+    def _run(self):
+        backoff = self.retry_backoff
+        attempts = 0
+        while True:
+            with self._cond:
+                deadline = time.monotonic() + self.flush_interval
+                while not self._stopping and len(self._pending) < self.flush_size:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.wait(remaining)
+                if not self._pending:
+                    if self._stopping:
+                        return
+                    continue
+                batch = [self._pending[i] for i in range(min(self.flush_size, len(self._pending)))]
+
+            try:
+                dead = self._flush_batch(batch, give_up=attempts + 1 >= self.max_attempts)
+            except Exception as e:
+                attempts += 1
+                self.failed_flushes += 1
+                with self._cond:
+                    if self._stopping:
+                        # The journal still has the swipes, replay picks them up
+                        print(f"[SwipeQueue] Flush of {len(batch)} swipes failed while stopping: {e}")
+                        return
+                    print(f"[SwipeQueue] Flush of {len(batch)} swipes failed, retrying in {backoff:.0f}s: {e}")
+                    # Woken early by stop()
+                    self._cond.wait(backoff)
+                backoff = min(backoff * 2, 30.0)
+                continue
+            attempts = 0
+            backoff = self.retry_backoff
+
+            with self._cond:
+                for _ in batch:
+                    self._pending.popleft()
+                self.flushed += len(batch) - len(dead)
+                self.dead_lettered += len(dead)
+                self.batches += 1
+                self._checkpoint(batch[-1]["seq"])
+                self._cond.notify_all()
+
+    def _flush_batch(self, batch: list[dict], give_up: bool) -> list[dict]:
+        """
+        Flushes one batch, falling back to one swipe at a time when the store
+        rejects it or `give_up` is set.
+
+        :return: swipes written to the dead-letter file instead
+        :rtype: list of dict
+        """
+        try:
+            self.flush(_without_seq(batch))
+            return []
+        except Exception as e:
+            if not (give_up or self.rejects(e)):
+                raise
+
+        dead = []
+        for record in batch:
+            try:
+                self.flush(_without_seq([record]))
+            except Exception as e:
+                # An outage is retried as a whole batch (already written swipes
+                # are deduplicated by ingest_id), unless we are giving up
+                if not (give_up or self.rejects(e)):
+                    raise
+                dead.append(dict(_without_seq([record])[0], error=str(e)))
+        if dead:
+            self._dead_letter(dead)
+        return dead
+
+    def _dead_letter(self, records: list[dict]):
+        print(f"[SwipeQueue] Dead-lettering {len(records)} swipes: {records[0]['error']}")
+        if not self.journal_path:
+            return
+        # One write per batch in append mode, so workers do not interleave lines
+        with open(self.journal_path + ".dead", "a", encoding="utf-8") as f:
+            f.write("".join(json.dumps(record) + "\n" for record in records))
+
+    def _checkpoint(self, seq: int):
+        """Records `seq` as flushed and truncates the journal once empty."""
+        self._committed = seq
+        if self._journal is None:
+            return
+        if not self._pending:
+            self._journal.truncate(0)
+            self._journal.seek(0)
+            self._seq = self._committed = 0
+        with open(self._path + ".committed", "w", encoding="utf-8") as f:
+            f.write(str(self._committed))
+
+    def _replay(self) -> int:
+        """Loads the unflushed records of this process's journal and of abandoned ones."""
+        records = _unflushed(self._path, self._journal)
+        for path in glob.glob(glob.escape(self.journal_path) + ".*"):
+            if path == self._path or not path.rpartition(".")[2].isdigit():
+                continue
+            records.extend(_adopt(path))
+
+        # Rewrite this process's journal with only the unflushed records, renumbered
+        self._journal.seek(0)
+        self._journal.truncate()
+        for seq, record in enumerate(records, start=1):
+            record["seq"] = seq
+            self._journal.write(json.dumps(record) + "\n")
+        self._journal.flush()
+        with open(self._path + ".committed", "w", encoding="utf-8") as f:
+            f.write("0")
+
+        self._pending.extend(records)
+        self._seq = len(records)
+        self._committed = 0
+        return len(records)
+
+
+def _without_seq(records: list[dict]) -> list[dict]:
+    return [{k: v for k, v in record.items() if k != "seq"} for record in records]
+
+
+def _open_locked(path: str):
+    """Opens a journal for appending and holds an exclusive lock on it."""
+    while True:
+        journal = open(path, "a+", encoding="utf-8")
+        if fcntl is None:
+            return journal
+        fcntl.flock(journal.fileno(), fcntl.LOCK_EX)
+        # Another worker may have adopted and removed the file meanwhile
+        try:
+            if os.stat(path).st_ino == os.fstat(journal.fileno()).st_ino:
+                return journal
+        except FileNotFoundError:
+            pass
+        journal.close()
+
+
+def _unflushed(path: str, journal) -> list[dict]:
+    """Records of an open journal with a seq above its committed mark."""
+    committed = 0
+    try:
+        with open(path + ".committed", encoding="utf-8") as f:
+            committed = int(f.read().strip() or 0)
+    except FileNotFoundError:
+        pass
+
+    records = []
+    journal.seek(0)
+    for line in journal:
+        try:
+            record = json.loads(line)
+        except json.JSONDecodeError:
+            # Torn last line from a crash mid-write
+            continue
+        if record["seq"] > committed:
+            records.append(record)
+    return records
+
+
+def _adopt(path: str) -> list[dict]:
+    """
+    Takes over the journal of a process that exited, if no live process holds
+    it. The file is emptied and removed while locked, so it is adopted once.
+    """
+    if fcntl is None:
+        return []
+    try:
+        journal = open(path, "r+", encoding="utf-8")
+    except FileNotFoundError:
+        return []
+    with journal:
+        try:
+            fcntl.flock(journal.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            # Held by a running worker
+            return []
+        records = _unflushed(path, journal)
+        journal.truncate(0)
+        for name in (path, path + ".committed"):
+            try:
+                os.unlink(name)
+            except FileNotFoundError:
+                pass
+    if records:
+        print(f"[SwipeQueue] Adopted {len(records)} unflushed swipes from {path}")
+    return records
@@ -0,0 +1,149 @@
+"""Event -> tag index for tag breakdowns.
+
+Analytics rows only carry event ids, so counting a user's tags used to need
+a join against the events table. `TagIndex` interns every tag string to a
+small int once and stores each event's tag ids as a slice of one flat int32
+array, so counting tags over a user's liked or seen events is a gather plus
+one `np.bincount`.
+
+`EventCatalog` owns the index and feeds it every row it loads or receives
+from `create_event`, so it is always in sync with the catalog.
+"""
+
+import threading
+from typing import Any, Iterable, Optional
+
+import numpy as np
+
+
+def _normalize(tag: Any) -> str:
+    return str(tag).strip().lower()
+
+
+class TagIndex:
+    def __init__(self, capacity: int = 1024):
+        """
+        :param capacity: initial number of events (and tag slots) to allocate
+        :type capacity: int
+        """
+        capacity = max(capacity, 1)
+        self._lock = threading.Lock()
+        self._tag_id: dict[str, int] = {}
+        self._tags: list[str] = []
+        self._row_of: dict[int, int] = {}
+        # Row r owns _flat[_start[r]:_start[r] + _length[r]]
+        self._start = np.zeros(capacity, dtype=np.int64)
+        self._length = np.zeros(capacity, dtype=np.int32)
+        self._mode = np.zeros(capacity, dtype=np.int8)
+        self._flat = np.zeros(capacity * 4, dtype=np.int32)
+        self._rows = 0
+        self._used = 0
+
+    def __len__(self) -> int:
+        return self._rows
+
+    @property
+    def tags(self) -> list[str]:
+        """Interned tag strings, indexed by tag id."""
+        return self._tags
+
+    def _intern(self, tag: str) -> int:
+        tag_id = self._tag_id.get(tag)
+        if tag_id is None:
+            tag_id = len(self._tags)
+            self._tag_id[tag] = tag_id
+            self._tags.append(tag)
+        return tag_id
+
+    def _grow(self, array: np.ndarray, needed: int) -> np.ndarray:
+        if needed <= array.shape[0]:
+            return array
+        capacity = array.shape[0]
+        while capacity < needed:
+            capacity *= 2
+        grown = np.zeros(capacity, dtype=array.dtype)
+        grown[:array.shape[0]] = array
+        return grown
+
+    def add(self, event_id: int, tags: Optional[Iterable[Any]], matcha_mode: bool = False):
+        """
+        Adds or replaces the tags of one event.
+
+        Replacing appends a new slice; the old one is only reclaimed when the
+        catalog rebuilds the index.
+
+        :param event_id: events.id
+        :type event_id: int
+        :param tags: the event's tags, normalized to lowercase
+        :type tags: iterable or None
+        :param matcha_mode: mode of the event
+        :type matcha_mode: bool
+        """
+        names = list(dict.fromkeys(t for t in map(_normalize, tags or []) if t))
+        with self._lock:
+            ids = [self._intern(name) for name in names]
+            row = self._row_of.get(event_id)
+            if row is None:
+                row = self._rows
+                self._start = self._grow(self._start, row + 1)
+                self._length = self._grow(self._length, row + 1)
+                self._mode = self._grow(self._mode, row + 1)
+            self._flat = self._grow(self._flat, self._used + len(ids))
+            self._flat[self._used:self._used + len(ids)] = ids
+            self._start[row] = self._used
+            self._length[row] = len(ids)
+            self._mode[row] = 1 if matcha_mode else 0
+            self._used += len(ids)
+            if event_id not in self._row_of:
+                self._row_of[event_id] = row
+                self._rows += 1
+
+    def _rows_for(self, event_ids: Iterable[Any]) -> np.ndarray:
+        rows = []
+        for event_id in event_ids:
+            try:
+                row = self._row_of.get(int(event_id))
+            except (TypeError, ValueError):
+                continue
+            if row is not None:
+                rows.append(row)
+        return np.asarray(rows, dtype=np.int64)
+
+    def counts(self, event_ids: Iterable[Any], matcha_mode: Optional[bool] = None) -> tuple[np.ndarray, int]:
+        """
+        Tag occurrence counts over a set of events.
+
+        :param event_ids: event ids; unknown ids are ignored
+        :type event_ids: iterable
+        :param matcha_mode: only count events of this mode, None counts both
+        :type matcha_mode: bool or None
+        :return: counts indexed by tag id, and how many of the events have any tag
+        :rtype: tuple of (ndarray, int)
+        """
+        rows = self._rows_for(event_ids)
+        start, length, flat = self._start, self._length, self._flat
+        if matcha_mode is not None and len(rows):
+            rows = rows[self._mode[rows] == (1 if matcha_mode else 0)]
+        lengths = length[rows].astype(np.int64)
+        total = int(lengths.sum())
+        if total == 0:
+            return np.zeros(len(self._tags), dtype=np.int64), 0
+
+        # Gather every row's slice at once: position i of the output belongs to
+        # row r and reads flat[start[r] + (i - first output position of r)]
+        firsts = np.cumsum(lengths) - lengths
+        positions = np.repeat(start[rows] - firsts, lengths) + np.arange(total)
+        counts = np.bincount(flat[positions], minlength=len(self._tags))
+        return counts, int(np.count_nonzero(lengths))
+
+    def top_tags(self, event_ids: Iterable[Any], k: int = 10, matcha_mode: Optional[bool] = None) -> list[list]:
+        """
+        Most frequent tags over a set of events.
+
+        :return: [[tag, count], ...] by descending count, ties by tag
+        :rtype: list of list
+        """
+        counts, _ = self.counts(event_ids, matcha_mode)
+        present = np.flatnonzero(counts)
+        ordered = sorted(present.tolist(), key=lambda t: (-counts[t], self._tags[t]))
+        return [[self._tags[t], int(counts[t])] for t in ordered[:k]]
@@ -0,0 +1,157 @@
+"""Feedback-driven user embeddings.
+
+`create_user` stores a coffee and a matcha vector per user. Instead of
+re-encoding an LLM-rewritten profile for every feed, each swipe nudges the
+stored vector of its mode with an exponential moving average:
+
+    u' = normalize((1 - a) * u + a * (+e if liked else -e))
+    a  = rate * clip(time_spent / dwell_seconds, min_weight, 1)
+
+where `e` is the swiped event's embedding and `rate` is `like_rate` for right
+swipes and `dislike_rate` for left ones. Longer looks count more, and a quick
+flick still moves the vector a little. The scorer then uses `u'` directly.
+
+`UserVectors` caches vectors per (user, mode), with the row's
+`embedding_version`, so a swipe costs one vector update plus the write of the
+new vector. The write is a compare-and-set on that version
+(sql/006_user_embedding_feedback.sql): when another worker or task wrote first,
+the caller reloads the vector and applies its swipe again, so concurrent
+swipes never drop each other's steps.
+"""
+
+import time
+from collections import OrderedDict
+from typing import Any, Mapping, Optional
+
+import numpy as np
+
+from engine.ml_models.embedding_codec import decode_embedding
+
+MODES = {True: "matcha", False: "coffee"}
+
+
+def feedback_update(user_vector: np.ndarray, event_vector: np.ndarray, liked: bool, time_spent: Optional[float],
+                    like_rate: float = 0.15, dislike_rate: float = 0.05, dwell_seconds: float = 10.0,
+                    min_weight: float = 0.2) -> np.ndarray:
+    """
+    One EMA step of a user vector towards (or away from) a swiped event.
+
+    :param user_vector: current normalized user embedding
+    :type user_vector: ndarray
+    :param event_vector: normalized embedding of the swiped event
+    :type event_vector: ndarray
+    :param liked: right swipe
+    :type liked: bool
+    :param time_spent: seconds the event was on screen
+    :type time_spent: float or None
+    :return: updated, normalized user embedding
+    :rtype: ndarray
+    """
+    weight = min(max((time_spent or 0.0) / dwell_seconds, min_weight), 1.0)
+    alpha = (like_rate if liked else dislike_rate) * weight
+    target = event_vector if liked else -event_vector
+    updated = (1.0 - alpha) * np.asarray(user_vector, dtype=np.float32) + alpha * target
+    norm = float(np.linalg.norm(updated))
+    if norm < 1e-6:
+        return np.asarray(user_vector, dtype=np.float32)
+    return (updated / norm).astype(np.float32)
+
+
+class UserVectors:
+    def __init__(self, like_rate: float = 0.15, dislike_rate: float = 0.05, dwell_seconds: float = 10.0,
+                 min_weight: float = 0.2, ttl: float = 300.0, max_entries: int = 50000):
+        """
+        :param like_rate: EMA step for a right swipe with full attention
+        :type like_rate: float
+        :param dislike_rate: EMA step away from a left-swiped event
+        :type dislike_rate: float
+        :param dwell_seconds: time on screen that gives a swipe full weight
+        :type dwell_seconds: float
+        :param min_weight: weight of a swipe with no time on screen
+        :type min_weight: float
+        :param ttl: seconds a cached vector is served to the feed before reloading it
+            (other workers may have updated it meanwhile; writes never rely on it)
+        :type ttl: float
+        :param max_entries: (user, mode) vectors kept before the least recently used are dropped
+        :type max_entries: int
+        """
+        self.like_rate = like_rate
+        self.dislike_rate = dislike_rate
+        self.dwell_seconds = dwell_seconds
+        self.min_weight = min_weight
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: OrderedDict[tuple[int, bool], tuple[np.ndarray, int, float]] = OrderedDict()
+
+        self.hits = 0
+        self.misses = 0
+        self.updates = 0
+        self.conflicts = 0
+
+    def get(self, user_id: int, matcha_mode: bool) -> Optional[np.ndarray]:
+        """Cached vector of a user and mode, or None when missing or expired."""
+        entry = self.entry(user_id, matcha_mode)
+        return None if entry is None else entry[0]
+
+    def entry(self, user_id: int, matcha_mode: bool) -> Optional[tuple[np.ndarray, int]]:
+        """Cached vector of a user and mode with its row version, or None when missing or expired."""
+        key = (user_id, matcha_mode)
+        entry = self._entries.get(key)
+        if entry is None or time.monotonic() - entry[2] > self.ttl:
+            self.misses += 1
+            return None
+        self._entries.move_to_end(key)
+        self.hits += 1
+        return entry[0], entry[1]
+
+    def put(self, user_id: int, matcha_mode: bool, vector: np.ndarray, version: int):
+        key = (user_id, matcha_mode)
+        current = self._entries.get(key)
+        # A slower load must not replace a vector written after it was read
+        if current is not None and current[1] > version:
+            return
+        self._entries[key] = (np.asarray(vector, dtype=np.float32), version, time.monotonic())
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def load(self, user_id: int, embeddings: Mapping[str, Any], version: int):
+        """
+        Caches both modes from a `users.embeddings` value.
+
+        :param embeddings: {"coffee": stored, "matcha": stored}, either may be missing
+        :type embeddings: dict
+        :param version: the row's `embedding_version`
+        :type version: int
+        """
+        for matcha_mode, name in MODES.items():
+            stored = embeddings.get(name)
+            if stored:
+                self.put(user_id, matcha_mode, decode_embedding(stored), version)
+
+    def invalidate(self, user_id: int):
+        """Drops both cached modes of a user, e.g. after losing a compare-and-set."""
+        for matcha_mode in MODES:
+            self._entries.pop((user_id, matcha_mode), None)
+        self.conflicts += 1
+
+    def step(self, vector: np.ndarray, event_vector: np.ndarray, liked: bool,
+             time_spent: Optional[float]) -> np.ndarray:
+        """
+        One swipe applied to `vector` with this instance's rates. Nothing is
+        cached: the caller stores the result with `put` once its write succeeded.
+        """
+        if event_vector.shape != vector.shape:
+            raise ValueError(f"event embedding has shape {event_vector.shape}, user embedding {vector.shape}")
+        self.updates += 1
+        return feedback_update(vector, event_vector, liked, time_spent, self.like_rate, self.dislike_rate,
+                               self.dwell_seconds, self.min_weight)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "hits": self.hits,
+            "misses": self.misses,
+            "updates": self.updates,
+            "conflicts": self.conflicts,
+        }
@@ -0,0 +1,100 @@
+"""Background warmup and startup timing.
+
+Loading the embedding model (torch + sentence-transformers) and the event
+catalog takes seconds. `Warmup` runs each of those steps on its own daemon
+thread from the FastAPI lifespan, so the server starts accepting requests
+(health checks, `/events/{id}`, `/swipe`) right away. Routes that need a
+component call `wait(name)` first.
+
+Every step's duration, plus the phases recorded with `mark`, end up in
+`report()`, which `/health` serves and which is printed once warmup is done,
+so cold-start regressions show up in the logs.
+"""
+
+import threading
+import time
+from typing import Callable, Optional
+
+
+class Warmup:
+    def __init__(self, started_at: Optional[float] = None):
+        """
+        :param started_at: `time.perf_counter()` at process start, defaults to now
+        :type started_at: float or None
+        """
+        self.started_at = time.perf_counter() if started_at is None else started_at
+        self._last_mark = self.started_at
+        self._phases: dict[str, float] = {}
+        self._steps: dict[str, dict] = {}
+        self._done: dict[str, threading.Event] = {}
+        self._lock = threading.Lock()
+
+    def mark(self, phase: str):
+        """Records the time since the previous mark (or process start) as `phase`."""
+        now = time.perf_counter()
+        self._phases[phase] = now - self._last_mark
+        self._last_mark = now
+
+    def start(self, steps: dict[str, Callable[[], None]]):
+        """
+        Runs every step on its own daemon thread.
+
+        :param steps: step name -> callable doing the work
+        :type steps: dict
+        """
+        for name in steps:
+            self._steps[name] = {"status": "pending", "seconds": None, "error": None}
+            self._done[name] = threading.Event()
+        for name, step in steps.items():
+            threading.Thread(target=self._run, args=(name, step), name=f"warmup-{name}", daemon=True).start()
+
+    def _run(self, name: str, step: Callable[[], None]):
+        start = time.perf_counter()
+        try:
+            step()
+            status, error = "ready", None
+        except Exception as e:
+            status, error = "failed", str(e)
+            print(f"[Warmup] {name} failed: {e}")
+        with self._lock:
+            self._steps[name].update(status=status, seconds=round(time.perf_counter() - start, 3), error=error)
+            self._done[name].set()
+            finished = all(event.is_set() for event in self._done.values())
+        if finished:
+            self._phases["warmup"] = time.perf_counter() - self._last_mark
+            print(f"[Startup] {self.summary()}")
+
+    def ready(self, name: Optional[str] = None) -> bool:
+        """Whether one step (or every step, when `name` is None) finished successfully."""
+        names = [name] if name is not None else list(self._steps)
+        return all(self._steps.get(n, {}).get("status") == "ready" for n in names)
+
+    def wait(self, name: str, timeout: Optional[float] = None) -> bool:
+        """
+        Blocks until a step finishes.
+
+        :param name: step name; unknown steps count as ready
+        :type name: str
+        :param timeout: seconds to wait, None waits indefinitely
+        :type timeout: float or None
+        :return: whether the step finished successfully in time
+        :rtype: bool
+        """
+        event = self._done.get(name)
+        if event is None:
+            return True
+        return event.wait(timeout) and self.ready(name)
+
+    def report(self) -> dict:
+        """Startup phases and warmup steps with their durations in seconds."""
+        return {
+            "ready": self.ready(),
+            "phases": {phase: round(seconds, 3) for phase, seconds in self._phases.items()},
+            "steps": {name: dict(step) for name, step in self._steps.items()},
+        }
+
+    def summary(self) -> str:
+        """One-line startup timing report."""
+        phases = ", ".join(f"{phase} {seconds:.2f}s" for phase, seconds in self._phases.items())
+        steps = ", ".join(f"{name} {step['status']} {step['seconds']}s" for name, step in self._steps.items())
+        return f"{phases} | {steps}"
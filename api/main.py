@@ -1,27 +1,161 @@
+import asyncio
 import os
+import time
+# Process start, for the startup timing report
+STARTED_AT = time.perf_counter()
+from contextlib import asynccontextmanager
 from typing import Optional
 
 from dotenv import load_dotenv
 from fastapi import FastAPI, HTTPException
-from supabase import create_client, Client
+from supabase import create_client, acreate_client, AsyncClient, Client
+from postgrest.exceptions import APIError
 import numpy as np
-from engine.analytics import generate_dashboard
+from engine.analytics import agenerate_dashboard, agenerate_insights, stats_metrics, tag_breakdown
 from fastapi.middleware.cors import CORSMiddleware
 
 from engine.ml_models.openai_client import OpenAIClient
 from engine.ml_models.embedding_toolbox import EmbeddingToolbox
-from engine.recommendation_engine import recommend_events
+from engine.ml_models.embedding_cache import EmbeddingCache
+from engine.ml_models.embedding_codec import decode_embedding, encode_embedding
+from engine.recommendation_engine import recommend_events, make_index_factory
+from engine.event_catalog import EventCatalog, event_embedding
+from engine.feed import FeedContext, FeedPipeline, hydrate, unseen_ids
+from engine.seen_set import SeenSet, SeenSetCache
+from engine.recommendation_queue import RecommendationQueues
+from engine.user_vectors import MODES, UserVectors
+from engine.pgvector_index import PgVectorIndex
+from engine.swipe_queue import SwipeQueue, SwipeQueueFull
+from engine.augmentation_cache import AugmentationCache
+from engine.insight_cache import InsightCache
+from engine.warmup import Warmup
 
 load_dotenv()
 
 from models import (
-    Event, EventCreate,
-    User, UserCreate,
+    EventCreate, EventPublic,
+    UserCreate, UserPublic,
     SwipeRequest, SwipeResponse,
-    Analytics, Dashboard,
+    Analytics, Dashboard, Insights,
 )
 
-app = FastAPI()
+# Seconds between incremental event catalog refreshes (0 disables)
+CATALOG_REFRESH_SECONDS = float(os.environ.get("CATALOG_REFRESH_SECONDS", "30"))
+
+# Event index backend: "exact" (brute force), "ivf" (approximate),
+# "quantized" (int8/float16 scoring + exact re-rank) or "pgvector"
+# (top-k inside Postgres, see sql/001_match_events.sql)
+RECOMMENDER_BACKEND = os.environ.get("RECOMMENDER_BACKEND", "exact")
+# IVF clusters scanned per query, trades recall for latency
+IVF_NPROBE = int(os.environ.get("IVF_NPROBE", "8"))
+# Quantized backend: "int8" or "float16", shortlist multiple re-scored in
+# float32 (0 disables the re-rank), whether those float32 vectors stay in memory
+# rather than in a disk-backed spill file, and the spill file's directory
+QUANTIZED_PRECISION = os.environ.get("QUANTIZED_PRECISION", "int8")
+QUANTIZED_RERANK = int(os.environ.get("QUANTIZED_RERANK", "4"))
+QUANTIZED_KEEP_FULL = os.environ.get("QUANTIZED_KEEP_FULL", "0") == "1"
+QUANTIZED_SPILL_DIR = os.environ.get("QUANTIZED_SPILL_DIR") or None
+# Texts per SentenceTransformer forward pass for bulk encoding
+EMBEDDING_BATCH_SIZE = int(os.environ.get("EMBEDDING_BATCH_SIZE", "64"))
+# Rows per Supabase insert for bulk imports
+INSERT_CHUNK_SIZE = 500
+# Embeddings kept in the in-memory LRU, and optional SQLite file behind it
+EMBEDDING_CACHE_SIZE = int(os.environ.get("EMBEDDING_CACHE_SIZE", "10000"))
+EMBEDDING_CACHE_PATH = os.environ.get("EMBEDDING_CACHE_PATH") or None
+# Precision of stored embeddings: "float32" or "float16"
+EMBEDDING_STORAGE_DTYPE = os.environ.get("EMBEDDING_STORAGE_DTYPE", "float32")
+# LLM profile augmentation: max age in seconds and swipes that force a refresh
+AUGMENTATION_TTL_SECONDS = float(os.environ.get("AUGMENTATION_TTL_SECONDS", "3600"))
+AUGMENTATION_REFRESH_SWIPES = int(os.environ.get("AUGMENTATION_REFRESH_SWIPES", "5"))
+# Dashboard AI insights: max age in seconds, and whether the analytics endpoint
+# returns without waiting for a missing insight (clients poll /analytics/insights)
+INSIGHT_TTL_SECONDS = float(os.environ.get("INSIGHT_TTL_SECONDS", "86400"))
+DEFER_AI_INSIGHTS = os.environ.get("DEFER_AI_INSIGHTS", "false").lower() == "true"
+# Swipe ingestion: "direct" (one RPC per swipe) or "queued" (write-behind
+# batches, see engine/swipe_queue.py and sql/003_record_swipes.sql).
+# Queued swipes reach the database up to SWIPE_FLUSH_INTERVAL_SECONDS later:
+# the worker that took a swipe merges its pending swipes into that user's seen
+# set, liked events and dashboard, but other workers only see it once flushed
+SWIPE_INGEST_MODE = os.environ.get("SWIPE_INGEST_MODE", "direct")
+# Journal base path; each worker writes <path>.<pid> and adopts those of exited workers
+SWIPE_JOURNAL_PATH = os.environ.get("SWIPE_JOURNAL_PATH", "swipes.journal")
+SWIPE_QUEUE_MAX_PENDING = int(os.environ.get("SWIPE_QUEUE_MAX_PENDING", "10000"))
+SWIPE_FLUSH_SIZE = int(os.environ.get("SWIPE_FLUSH_SIZE", "500"))
+SWIPE_FLUSH_INTERVAL_SECONDS = float(os.environ.get("SWIPE_FLUSH_INTERVAL_SECONDS", "1.0"))
+# Failed flushes of one batch before the swipes that keep failing go to <path>.dead
+SWIPE_FLUSH_MAX_ATTEMPTS = int(os.environ.get("SWIPE_FLUSH_MAX_ATTEMPTS", "10"))
+# Max seconds shutdown waits for the queue to drain; the rest stays journaled
+SWIPE_QUEUE_DRAIN_SECONDS = float(os.environ.get("SWIPE_QUEUE_DRAIN_SECONDS", "10"))
+# Embedding inference: "torch" (reference) or "onnx" (ONNX Runtime, optionally
+# int8-quantized, needs requirements-onnx.txt), and CPU threads per process
+# (unset uses every core)
+EMBEDDING_BACKEND = os.environ.get("EMBEDDING_BACKEND", "torch")
+EMBEDDING_ONNX_QUANTIZE = os.environ.get("EMBEDDING_ONNX_QUANTIZE", "false").lower() == "true"
+EMBEDDING_THREADS = int(os.environ.get("EMBEDDING_THREADS", "0")) or None
+# Micro-batching of concurrent encode calls: max texts per forward pass
+# (0 disables) and max milliseconds a call waits for others to join
+EMBEDDING_BATCH_MAX_SIZE = int(os.environ.get("EMBEDDING_BATCH_MAX_SIZE", "64"))
+EMBEDDING_BATCH_MAX_WAIT_MS = float(os.environ.get("EMBEDDING_BATCH_MAX_WAIT_MS", "5"))
+# Multi-worker sharing: directory of event index snapshots published by
+# scripts/publish_catalog.py, and Unix socket of scripts/model_server.py
+SHARED_CATALOG_DIR = os.environ.get("SHARED_CATALOG_DIR") or None
+EMBEDDING_MODEL_SOCKET = os.environ.get("EMBEDDING_MODEL_SOCKET") or None
+# Seen sets (sql/005_seen_sets.sql): users cached per process, and seen
+# entries loaded at once that make the packed form get written back
+SEEN_CACHE_MAX_USERS = int(os.environ.get("SEEN_CACHE_MAX_USERS", "50000"))
+SEEN_PACK_MIN_TAIL = int(os.environ.get("SEEN_PACK_MIN_TAIL", "200"))
+# Precomputed recommendation queues: ids computed per (user, mode) in the
+# background (0 disables and scores every request), ids left that trigger a
+# refresh, swipes that trigger one, and refreshes running at once
+RECOMMENDATION_QUEUE_SIZE = int(os.environ.get("RECOMMENDATION_QUEUE_SIZE", "50"))
+RECOMMENDATION_QUEUE_LOW_WATER = int(os.environ.get("RECOMMENDATION_QUEUE_LOW_WATER", "10"))
+RECOMMENDATION_QUEUE_REFRESH_SWIPES = int(os.environ.get("RECOMMENDATION_QUEUE_REFRESH_SWIPES", "5"))
+RECOMMENDATION_QUEUE_CONCURRENCY = int(os.environ.get("RECOMMENDATION_QUEUE_CONCURRENCY", "4"))
+# Seconds between sweeps that refresh queues computed before new catalog events
+RECOMMENDATION_QUEUE_SWEEP_SECONDS = float(os.environ.get("RECOMMENDATION_QUEUE_SWEEP_SECONDS", "5"))
+# User vectors: "text" (default) re-encodes the blurb, tags and LLM-augmented
+# profile on every scoring run; "feedback" instead scores the stored vector
+# that every swipe nudges (engine/user_vectors.py,
+# sql/006_user_embedding_feedback.sql), so blurb and tag edits and the
+# augmentation no longer reach the feed. EMA steps for right and left swipes,
+# seconds on screen that give a swipe full weight, and compare-and-set retries
+# per swipe when other writes of the user's vector win
+USER_VECTOR_SOURCE = os.environ.get("USER_VECTOR_SOURCE", "text")
+USER_VECTOR_LIKE_RATE = float(os.environ.get("USER_VECTOR_LIKE_RATE", "0.15"))
+USER_VECTOR_DISLIKE_RATE = float(os.environ.get("USER_VECTOR_DISLIKE_RATE", "0.05"))
+USER_VECTOR_DWELL_SECONDS = float(os.environ.get("USER_VECTOR_DWELL_SECONDS", "10"))
+USER_VECTOR_WRITE_ATTEMPTS = int(os.environ.get("USER_VECTOR_WRITE_ATTEMPTS", "5"))
+# Max seconds a feed request waits for the catalog warmup before answering 503
+WARMUP_WAIT_SECONDS = float(os.environ.get("WARMUP_WAIT_SECONDS", "30"))
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    global async_supabase
+    warmup.mark("import")
+    async_supabase = await acreate_client(
+        os.environ.get("SUPABASE_URL", ""),
+        os.environ.get("SUPABASE_KEY", "")
+    )
+    if SWIPE_INGEST_MODE == "queued":
+        swipe_queue.start()
+    warmup.mark("lifespan")
+    # Model and catalog load in the background; the server is up meanwhile
+    warmup.start({
+        "catalog": _load_catalog,
+        "embedding_model": embedding_toolbox.instantiate,
+    })
+    if RECOMMENDATION_QUEUE_SIZE > 0:
+        recommendation_queues.start(RECOMMENDATION_QUEUE_SWEEP_SECONDS)
+    yield
+    await recommendation_queues.stop()
+    if SWIPE_INGEST_MODE == "queued":
+        # Drain pending swipes; anything left stays in the journal for replay
+        await asyncio.to_thread(swipe_queue.stop, SWIPE_QUEUE_DRAIN_SECONDS)
+    event_catalog.stop()
+
+
+app = FastAPI(lifespan=lifespan)
 
 # CORS middleware
 app.add_middleware(
@@ -32,19 +166,275 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Supabase client
+# Supabase clients: sync for threadpool routes and background threads,
+# async (created in lifespan) for the async routes
 supabase: Client = create_client(
     os.environ.get("SUPABASE_URL", ""),
     os.environ.get("SUPABASE_KEY", "")
 )
+async_supabase: Optional[AsyncClient] = None
 
 openai_client = OpenAIClient()
+augmentation_cache = AugmentationCache(ttl=AUGMENTATION_TTL_SECONDS, min_new_swipes=AUGMENTATION_REFRESH_SWIPES)
+seen_sets = SeenSetCache(max_entries=SEEN_CACHE_MAX_USERS)
+user_vectors = UserVectors(like_rate=USER_VECTOR_LIKE_RATE, dislike_rate=USER_VECTOR_DISLIKE_RATE,
+                           dwell_seconds=USER_VECTOR_DWELL_SECONDS)
+insight_cache = InsightCache(ttl=INSIGHT_TTL_SECONDS)
+
+embedding_cache = EmbeddingCache(max_entries=EMBEDDING_CACHE_SIZE, path=EMBEDDING_CACHE_PATH)
+# The model itself loads during warmup (or on first encode)
+embedding_toolbox = EmbeddingToolbox(
+    cache=embedding_cache,
+    model_server=EMBEDDING_MODEL_SOCKET,
+    batch_max_size=EMBEDDING_BATCH_MAX_SIZE,
+    batch_max_wait=EMBEDDING_BATCH_MAX_WAIT_MS / 1000,
+    backend=EMBEDDING_BACKEND,
+    threads=EMBEDDING_THREADS,
+    onnx_quantize=EMBEDDING_ONNX_QUANTIZE,
+)
+
+# In-memory events table with per-mode embedding indexes
+index_options = {}
+if RECOMMENDER_BACKEND == "ivf":
+    index_options = {"nprobe": IVF_NPROBE}
+elif RECOMMENDER_BACKEND == "quantized":
+    index_options = {"precision": QUANTIZED_PRECISION, "rerank": QUANTIZED_RERANK, "keep_full": QUANTIZED_KEEP_FULL,
+                     "spill_dir": QUANTIZED_SPILL_DIR}
+catalog_backend = "exact" if RECOMMENDER_BACKEND == "pgvector" else RECOMMENDER_BACKEND
+if SHARED_CATALOG_DIR and catalog_backend != "exact":
+    # Workers map the loader's float32 snapshot and search it exactly
+    print(f"[Catalog] Warning: RECOMMENDER_BACKEND={RECOMMENDER_BACKEND} is ignored with SHARED_CATALOG_DIR set, "
+          f"workers search the shared snapshot exactly")
+# The pgvector backend searches in Postgres: the catalog keeps rows and tags only
+event_catalog = EventCatalog(supabase, make_index_factory(catalog_backend, **index_options),
+                             shared_dir=SHARED_CATALOG_DIR, with_embeddings=RECOMMENDER_BACKEND != "pgvector")
+
+def _load_catalog():
+    # Keep retrying; feed requests get a 503 until the first load succeeds
+    delay = 1.0
+    while True:
+        try:
+            event_catalog.load()
+            break
+        except Exception as e:
+            print(f"[Catalog] Initial load failed, retrying in {delay:.0f}s: {e}")
+            time.sleep(delay)
+            delay = min(delay * 2, 30.0)
+    print(f"[Catalog] Loaded {len(event_catalog.events(True))} matcha and {len(event_catalog.events(False))} coffee events")
+    event_catalog.start(CATALOG_REFRESH_SECONDS)
+
+warmup = Warmup(STARTED_AT)
+
+# Database-side search indexes, keyed by matcha_mode (pgvector backend only)
+pgvector_indexes = {mode: PgVectorIndex(supabase, mode) for mode in (True, False)}
+
+def _flush_swipes(batch: list[dict]):
+    supabase.rpc("record_swipes", {"p_swipes": batch}).execute()
+
+def _swipes_rejected(e: Exception) -> bool:
+    """Whether record_swipes failed on the rows themselves (data or constraint error), not an outage."""
+    return isinstance(e, APIError) and str(e.code or "")[:2] in ("22", "23")
+
+# Write-behind swipe queue (queued ingest mode only)
+swipe_queue = SwipeQueue(
+    _flush_swipes,
+    journal_path=SWIPE_JOURNAL_PATH,
+    max_pending=SWIPE_QUEUE_MAX_PENDING,
+    flush_size=SWIPE_FLUSH_SIZE,
+    flush_interval=SWIPE_FLUSH_INTERVAL_SECONDS,
+    max_attempts=SWIPE_FLUSH_MAX_ATTEMPTS,
+    rejects=_swipes_rejected,
+)
+
+@app.get("/health")
+def get_health():
+    """Liveness plus warmup state and startup timings; never waits on warmup."""
+    return {"status": "ok", **warmup.report()}
+
+@app.get("/stats")
+def get_stats():
+    """Process-local cache and engine counters."""
+    return {
+        "embedding_cache": embedding_cache.stats(),
+        "insight_cache": insight_cache.stats(),
+        "embedding_batcher": embedding_toolbox.batch_stats(),
+        "swipe_queue": swipe_queue.stats(),
+        "seen_sets": seen_sets.stats(),
+        "recommendation_queues": recommendation_queues.stats(),
+        "user_vectors": user_vectors.stats(),
+    }
 
-embedding_toolbox = EmbeddingToolbox()
-embedding_toolbox.instantiate()
+# Response projections: public models carry no embeddings, and `fields=`
+# narrows them further, both in the Supabase select and in the JSON
+def _fields(model, fields: Optional[str]) -> list[str]:
+    """Columns to select for a public response model, id always included."""
+    if not fields:
+        return list(model.model_fields)
+    requested = [name.strip() for name in fields.split(",") if name.strip()]
+    unknown = [name for name in requested if name not in model.model_fields]
+    if unknown:
+        raise HTTPException(status_code=400, detail=f"Unknown fields: {', '.join(unknown)}")
+    return list(dict.fromkeys(["id", *requested]))
+
+def _project(row: dict, columns: list[str]) -> dict:
+    """Keeps only `columns` of an in-memory row."""
+    return {name: row.get(name) for name in columns}
 
 # Events
-@app.post("/events", response_model=Event)
+def _pending_swipes(user_id: int) -> list[dict]:
+    """Swipes this worker accepted for the user that are not in the database yet."""
+    if SWIPE_INGEST_MODE != "queued":
+        return []
+    return swipe_queue.pending_for(user_id)
+
+async def _seen_set(user_id: int, seen_count: int) -> SeenSet:
+    """
+    The user's seen ids for a `seen` array of `seen_count` entries, plus their
+    swipes still pending in this worker's queue.
+    """
+    seen = await _stored_seen_set(user_id, seen_count)
+    pending = _pending_swipes(user_id)
+    return seen.union([record["event_id"] for record in pending]) if pending else seen
+
+async def _stored_seen_set(user_id: int, seen_count: int) -> SeenSet:
+    """
+    The user's seen ids for a `seen` array of `seen_count` entries. Only the
+    entries the cached (or stored packed) set does not cover are fetched.
+    """
+    seen, offset = seen_sets.resume_from(user_id, seen_count)
+    if offset >= seen_count:
+        return seen
+    if offset == 0:
+        packed = await async_supabase.table("users").select("seen_packed, seen_packed_count").eq("id", user_id).execute()
+        row = packed.data[0] if packed.data else {}
+        if row.get("seen_packed") and (row.get("seen_packed_count") or 0) <= seen_count:
+            seen, offset = SeenSet.decode(row["seen_packed"]), row["seen_packed_count"]
+
+    tail = await async_supabase.rpc("seen_tail", {"p_user_id": user_id, "p_offset": offset}).execute()
+    tail = tail.data or []
+    seen = seen.union(tail)
+    seen_sets.put(user_id, seen, offset + len(tail))
+
+    # Long catch-up: store the packed set so other workers start from it
+    if len(tail) >= SEEN_PACK_MIN_TAIL:
+        try:
+            await async_supabase.table("users").update({
+                "seen_packed": seen.encode(),
+                "seen_packed_count": offset + len(tail),
+            }).eq("id", user_id).execute()
+        except APIError as e:
+            print(f"[Seen] Could not store packed seen set for user {user_id}: {e}")
+    return seen
+
+def _score_recommendations(ctx: FeedContext) -> list[int]:
+    """Scoring stage of the main feed: the recommendation engine over the mode's index."""
+    if RECOMMENDER_BACKEND == "pgvector":
+        # match_events excludes users.seen itself; only unflushed swipes are sent
+        pending = [record["event_id"] for record in _pending_swipes(ctx.user_id)]
+        event_index = pgvector_indexes[ctx.matcha_mode].for_user(ctx.user_id, pending)
+    else:
+        event_index = event_catalog.index(ctx.matcha_mode)
+
+    user_blurb = ctx.data["blurb"]
+    print(f"[Recommendation] User {ctx.user_id}: {len(event_catalog.rows(ctx.matcha_mode))} events, {len(ctx.seen)} seen")
+    blurb_preview = user_blurb[:50] + '...' if len(user_blurb) > 50 else user_blurb if user_blurb else '(empty)'
+    print(f"[Recommendation] User blurb: '{blurb_preview}' | Tags: {ctx.data['tags']}")
+
+    recommended_ids = recommend_events(
+        event_embeddings_dict=None,
+        seen=ctx.data["seen"],
+        EmbeddingToolbox=embedding_toolbox,
+        user_blurb=user_blurb,
+        user_tags=ctx.data["tags"],
+        OpenAIClient=openai_client,
+        swipes=[Analytics(**record) for record in ctx.data["swipes"]],
+        matcha_mode=ctx.matcha_mode,
+        top_k=ctx.limit,
+        event_index=event_index,
+        user_id=ctx.user_id,
+        augmentation_cache=augmentation_cache,
+        user_embedding=ctx.data.get("user_vector"),
+    )
+    print(f"[Recommendation] Got {len(recommended_ids)} recommendations: {recommended_ids}")
+    return recommended_ids
+
+# Falls back to unseen catalog events if scoring fails or comes back empty
+recommendation_feed = FeedPipeline(rows=event_catalog.rows, score=_score_recommendations, name="Recommendation")
+
+async def _feed_context(user_id: int, matcha_mode: bool, limit: int) -> FeedContext:
+    """Loads everything the recommendation feed scores with."""
+    user_vector = None
+    columns = "seen_count, tags, matcha_blurb, coffee_blurb"
+    if USER_VECTOR_SOURCE == "feedback":
+        user_vector = user_vectors.get(user_id, matcha_mode)
+        if user_vector is None:
+            columns += ", embeddings, embedding_version"
+    # Get user data (blurb, tags, seen count) and the user's last 5 swipes in
+    # this mode concurrently; the mode's events come from the in-memory catalog
+    user_data, analytics_data = await asyncio.gather(
+        async_supabase.table("users").select(columns).eq("id", user_id).execute(),
+        async_supabase.table("analytics").select("*").eq("user_id", user_id).eq("matcha_mode", matcha_mode)
+            .order("created_at", desc=True).limit(5).execute(),
+    )
+    if not user_data.data:
+        raise HTTPException(status_code=404, detail="User not found")
+    user = user_data.data[0]
+    if USER_VECTOR_SOURCE == "feedback" and user_vector is None:
+        # A swipe may have cached a newer vector while the row was loading
+        user_vector = user_vectors.get(user_id, matcha_mode)
+        if user_vector is None:
+            user_vectors.load(user_id, user.get("embeddings") or {}, user.get("embedding_version") or 0)
+            user_vector = user_vectors.get(user_id, matcha_mode)
+
+    seen = await _seen_set(user_id, user.get("seen_count") or 0)
+    user_blurb = user.get("matcha_blurb") if matcha_mode else user.get("coffee_blurb")
+    return FeedContext(user_id=user_id, matcha_mode=matcha_mode, limit=limit, seen=seen, data={
+        "seen": seen,
+        # Users without a stored vector fall back to encoding their profile
+        "user_vector": user_vector,
+        "blurb": user_blurb or "",
+        "tags": user.get("tags") or [],
+        "swipes": analytics_data.data,
+    })
+
+async def _catalog_ready() -> bool:
+    """Whether the event catalog is loaded, waiting up to WARMUP_WAIT_SECONDS while it still loads."""
+    # Once warmup is done, skip the worker thread the blocking wait would take
+    if warmup.ready("catalog"):
+        return True
+    return await asyncio.to_thread(warmup.wait, "catalog", WARMUP_WAIT_SECONDS)
+
+async def _compute_queue(user_id: int, matcha_mode: bool, size: int) -> list[int]:
+    """Ranks the next `size` events of a user's queue."""
+    if not await _catalog_ready():
+        raise RuntimeError("event catalog is still loading")
+    ctx = await _feed_context(user_id, matcha_mode, size)
+    return await asyncio.to_thread(_score_recommendations, ctx)
+
+# Swipes and new catalog events (the watermark moves, swept by start()) refresh queues
+recommendation_queues = RecommendationQueues(
+    _compute_queue,
+    size=RECOMMENDATION_QUEUE_SIZE,
+    low_water=RECOMMENDATION_QUEUE_LOW_WATER,
+    refresh_swipes=RECOMMENDATION_QUEUE_REFRESH_SWIPES,
+    catalog_version=lambda: event_catalog.watermark,
+    max_concurrency=RECOMMENDATION_QUEUE_CONCURRENCY,
+)
+
+def _event_row(event: EventCreate, embedding) -> dict:
+    """Builds the events row for `event`, storing its embedding under its mode."""
+    encoded = encode_embedding(embedding, EMBEDDING_STORAGE_DTYPE)
+
+    event_data = event.model_dump()
+    if event.matcha_mode:
+        event_data["embeddings"] = {"matcha": encoded}
+    else:
+        event_data["embeddings"] = {"coffee": encoded}
+    if RECOMMENDER_BACKEND == "pgvector":
+        event_data["embedding"] = embedding.tolist() if hasattr(embedding, 'tolist') else list(embedding)
+    return event_data
+
+@app.post("/events", response_model=EventPublic)
 def create_event(event: EventCreate):
     """Create a new event."""
     tags = event.tags or []
@@ -53,148 +443,207 @@ def create_event(event: EventCreate):
 
     # Generate embedding for the designated mode
     embedding = embedding_toolbox.encode(description, tags, title)
-    embedding_list = embedding.tolist() if hasattr(embedding, 'tolist') else list(embedding)
-
-    event_data = event.model_dump()
-    if event.matcha_mode:
-        event_data["embeddings"] = {"matcha": embedding_list}
-    else:
-        event_data["embeddings"] = {"coffee": embedding_list}
+    event_data = _event_row(event, embedding)
 
     data = supabase.table("events").insert(event_data).execute()
+    event_catalog.add(data.data[0])
     return data.data[0]
 
-@app.get("/events", response_model=list[Event])
-def get_events(user_id: int, matcha_mode: bool, limit: int = 10):
+@app.post("/events/batch", response_model=list[EventPublic])
+def create_events_batch(events: list[EventCreate]):
+    """Bulk-import events: one batched encode and chunked multi-row inserts."""
+    embeddings = embedding_toolbox.encode_batch(
+        [(event.description or "", event.tags or [], event.title) for event in events],
+        batch_size=EMBEDDING_BATCH_SIZE,
+    )
+    rows = [_event_row(event, embedding) for event, embedding in zip(events, embeddings)]
+
+    created = []
+    for start in range(0, len(rows), INSERT_CHUNK_SIZE):
+        data = supabase.table("events").insert(rows[start:start + INSERT_CHUNK_SIZE]).execute()
+        for row in data.data:
+            event_catalog.add(row)
+        created.extend(data.data)
+    return created
+
+@app.get("/events", response_model=list[EventPublic], response_model_exclude_unset=True)
+async def get_events(user_id: int, matcha_mode: bool, limit: int = 10, fields: Optional[str] = None):
     """
     Get events for a user filtered by mode (matcha or coffee).
-    Uses the recommendation engine for personalized suggestions.
+    Uses the recommendation engine for personalized suggestions, served from
+    the user's precomputed queue when there is one.
     Falls back to unseen events if recommendation fails.
+    `fields` is an optional comma-separated subset of event fields.
     """
-    # Get user data (blurb, tags, seen)
-    user_data = supabase.table("users").select("*").eq("id", user_id).execute()
-    if not user_data.data:
-        raise HTTPException(status_code=404, detail="User not found")
-    user = user_data.data[0]
-
-    seen = user.get("seen") or []
-    user_tags = user.get("tags") or []
-    user_blurb = user.get("matcha_blurb") if matcha_mode else user.get("coffee_blurb")
-    user_blurb = user_blurb or ""
-
-    # Get events for the requested mode
-    events_data = supabase.table("events").select("*").eq("matcha_mode", matcha_mode).execute()
-    all_events = events_data.data
-
-    # TRY to use recommendation engine, but fall back if it fails
-    try:
-        # Build event embeddings dictionary {event_id: embedding}
-        event_embeddings_dict = {}
-        for event in all_events:
-            if event.get("embeddings"):
-                emb = event["embeddings"].get("matcha") if matcha_mode else event["embeddings"].get("coffee")
-                if emb:
-                    event_embeddings_dict[event["id"]] = emb
-
-        print(f"[Recommendation] User {user_id}: {len(event_embeddings_dict)} events with embeddings, {len(seen)} seen")
-        blurb_preview = user_blurb[:50] + '...' if len(user_blurb) > 50 else user_blurb if user_blurb else '(empty)'
-        print(f"[Recommendation] User blurb: '{blurb_preview}' | Tags: {user_tags}")
-
-        # Get user's swipe analytics for the last 5 seen events (or fewer)
-        last_5_seen = seen[-5:] if len(seen) > 5 else seen
-        swipes = []
-        if last_5_seen:
-            analytics_data = supabase.table("analytics").select("*").eq("user_id", user_id).eq("matcha_mode", matcha_mode).in_("event_id", last_5_seen).execute()
-            swipes = [Analytics(**record) for record in analytics_data.data]
-
-        # Get recommended event IDs
-        recommended_ids = recommend_events(
-            event_embeddings_dict=event_embeddings_dict,
-            seen=seen,
-            EmbeddingToolbox=embedding_toolbox,
-            user_blurb=user_blurb,
-            user_tags=user_tags,
-            OpenAIClient=openai_client,
-            swipes=swipes,
-            matcha_mode=matcha_mode,
-            top_k=limit
-        )
-
-        print(f"[Recommendation] Got {len(recommended_ids)} recommendations: {recommended_ids}")
-
-        # Return recommended events in order
-        recommended_events = []
-        for event_id in recommended_ids:
-            for event in all_events:
-                if event["id"] == event_id:
-                    recommended_events.append(event)
-                    break
-
-        # If recommendations are empty, fall back
-        if not recommended_events:
-            print(f"[Recommendation] Empty results, using fallback for user {user_id}")
-            raise ValueError("Empty recommendations")
-
-    except Exception as e:
-        # FALLBACK: If recommendation engine fails, return unseen events
-        print(f"[Recommendation] Failed for user {user_id}: {e}")
-        import traceback
-        traceback.print_exc()
-        print(f"[Recommendation] Falling back to unseen events")
-        unseen_events = [e for e in all_events if e["id"] not in seen]
-        recommended_events = unseen_events[:limit]
-
-    return recommended_events
-
-@app.get("/events/all", response_model=list[Event])
-def get_all_events(matcha_mode: bool, limit: int = 20):
+    columns = _fields(EventPublic, fields)
+    if not await _catalog_ready():
+        raise HTTPException(status_code=503, detail="Event catalog is still loading")
+
+    if 0 < limit <= RECOMMENDATION_QUEUE_SIZE:
+        # Cheap path: pop the precomputed queue, only the seen set is loaded
+        user_data = await async_supabase.table("users").select("seen_count").eq("id", user_id).execute()
+        if not user_data.data:
+            raise HTTPException(status_code=404, detail="User not found")
+        seen = await _seen_set(user_id, user_data.data[0].get("seen_count") or 0)
+        event_ids = await recommendation_queues.next(user_id, matcha_mode, seen, limit)
+        rows = event_catalog.rows(matcha_mode)
+        events = hydrate(rows, event_ids, seen, limit)
+        if not events:
+            # The queue's computation already failed or came back empty, do
+            # not score again here: serve unseen events
+            print(f"[Recommendation] Empty queue for user {user_id}, serving unseen events")
+            events = hydrate(rows, unseen_ids(None, rows), seen, limit)
+        return [_project(event, columns) for event in events]
+
+    ctx = await _feed_context(user_id, matcha_mode, limit)
+    # Scoring is CPU-bound, keep it (and hydration) off the event loop
+    events = await asyncio.to_thread(recommendation_feed.run, ctx)
+
+    # Catalog rows still hold embeddings; only the public columns go out
+    return [_project(event, columns) for event in events]
+
+@app.get("/events/all", response_model=list[EventPublic], response_model_exclude_unset=True)
+async def get_all_events(matcha_mode: bool, limit: int = 20, fields: Optional[str] = None):
     """
     Get all events filtered by mode without personalization.
     Use this as a fallback when recommendation engine returns empty results.
     """
-    events_data = supabase.table("events").select("*").eq("matcha_mode", matcha_mode).limit(limit).execute()
+    columns = ", ".join(_fields(EventPublic, fields))
+    events_data = await async_supabase.table("events").select(columns).eq("matcha_mode", matcha_mode).limit(limit).execute()
     return events_data.data
 
-@app.get("/events/{event_id}", response_model=Event)
-def get_event(event_id: int):
+@app.get("/events/{event_id}", response_model=EventPublic, response_model_exclude_unset=True)
+async def get_event(event_id: int, fields: Optional[str] = None):
     """Get a specific event by ID."""
-    data = supabase.table("events").select("*").eq("id", event_id).execute()
+    columns = ", ".join(_fields(EventPublic, fields))
+    data = await async_supabase.table("events").select(columns).eq("id", event_id).execute()
     if not data.data:
         raise HTTPException(status_code=404, detail="Event not found")
     return data.data[0]
 
 # Swipes/Analytics
+async def _event_vector(event_id: int, matcha_mode: bool) -> Optional[np.ndarray]:
+    """An event's embedding from the catalog index, or from its row when the catalog holds none (pgvector)."""
+    vector = event_catalog.index(matcha_mode).vector(event_id)
+    if vector is None and RECOMMENDER_BACKEND == "pgvector":
+        data = await async_supabase.table("events").select("embeddings").eq("id", event_id).execute()
+        stored = event_embedding(data.data[0], matcha_mode) if data.data else None
+        vector = decode_embedding(stored) if stored else None
+    return vector
+
+async def _apply_feedback(user_id: int, matcha_mode: bool, event_id: int, liked: bool, time_spent: float):
+    """
+    Moves the user's stored vector of the mode by one swipe and writes it back
+    with a compare-and-set on the row's embedding_version; a lost race
+    reloads the vector and applies the swipe again.
+    """
+    try:
+        event_vector = await _event_vector(event_id, matcha_mode)
+        if event_vector is None:
+            return
+        for _ in range(USER_VECTOR_WRITE_ATTEMPTS):
+            entry = user_vectors.entry(user_id, matcha_mode)
+            if entry is None:
+                data = await async_supabase.table("users").select("embeddings, embedding_version").eq("id", user_id).execute()
+                if not data.data:
+                    return
+                row = data.data[0]
+                user_vectors.load(user_id, row.get("embeddings") or {}, row.get("embedding_version") or 0)
+                entry = user_vectors.entry(user_id, matcha_mode)
+                if entry is None:
+                    return
+            vector, version = entry
+            updated = user_vectors.step(vector, event_vector, liked, time_spent)
+            written = await async_supabase.rpc("set_user_embedding", {
+                "p_user_id": user_id,
+                "p_mode": MODES[matcha_mode],
+                "p_embedding": encode_embedding(updated, EMBEDDING_STORAGE_DTYPE),
+                "p_version": version,
+            }).execute()
+            if written.data is not None:
+                user_vectors.put(user_id, matcha_mode, updated, written.data)
+                return
+            # Another worker or swipe wrote first: reload and reapply
+            user_vectors.invalidate(user_id)
+        print(f"[Feedback] Gave up updating the vector of user {user_id} after {USER_VECTOR_WRITE_ATTEMPTS} conflicts")
+    except Exception as e:
+        print(f"[Feedback] Could not update the vector of user {user_id}: {e}")
+
+# Feedback runs after the response; keep references so tasks are not collected
+_feedback_tasks: set[asyncio.Task] = set()
+
+def _schedule_feedback(swipe: SwipeRequest, liked: bool, time_spent: float):
+    if USER_VECTOR_SOURCE != "feedback":
+        return
+    task = asyncio.create_task(_apply_feedback(swipe.user_id, swipe.matcha_mode, swipe.event_id, liked, time_spent))
+    _feedback_tasks.add(task)
+    task.add_done_callback(_feedback_tasks.discard)
+
+async def _check_swipe(swipe: SwipeRequest):
+    """
+    404s a swipe on an unknown user or event before it is queued, as the
+    direct path does. Users with a cached seen set and events in the catalog
+    skip the lookup.
+    """
+    checks = []
+    if seen_sets.get(swipe.user_id) is None:
+        checks.append(("User", async_supabase.table("users").select("id").eq("id", swipe.user_id).execute()))
+    if swipe.event_id not in event_catalog.rows(swipe.matcha_mode):
+        checks.append(("Event", async_supabase.table("events").select("id").eq("id", swipe.event_id)
+                       .eq("matcha_mode", swipe.matcha_mode).execute()))
+    results = await asyncio.gather(*(query for _, query in checks))
+    for (name, _), result in zip(checks, results):
+        if not result.data:
+            raise HTTPException(status_code=404, detail=f"{name} not found")
+
 @app.post("/swipe", response_model=SwipeResponse)
-def swipe_event(swipe: SwipeRequest):
+async def swipe_event(swipe: SwipeRequest):
     """Record a swipe (left/right) on an event for a user."""
     time_spent = (swipe.view_end - swipe.view_start).total_seconds()
     liked = swipe.direction == "right"
 
-    analytics_record = {
-        "user_id": swipe.user_id,
-        "event_id": swipe.event_id,
-        "time_spent": time_spent,
-        "liked": liked,
-        "matcha_mode": swipe.matcha_mode,
-    }
-    data = supabase.table("analytics").insert(analytics_record).execute()
-
-    # Append event_id to user's seen array
-    user_data = supabase.table("users").select("seen, liked_events").eq("id", swipe.user_id).execute()
-    seen = user_data.data[0]["seen"] or []
-    seen.append(swipe.event_id)
-
-    # If liked, also add to liked_events list
-    update_data = {"seen": seen}
-    if liked:
-        liked_events = user_data.data[0].get("liked_events") or []
-        liked_events.append(swipe.event_id)
-        update_data["liked_events"] = liked_events
+    if SWIPE_INGEST_MODE == "queued":
+        await _check_swipe(swipe)
+        try:
+            swipe_queue.put({
+                "user_id": swipe.user_id,
+                "event_id": swipe.event_id,
+                "time_spent": time_spent,
+                "liked": liked,
+                "matcha_mode": swipe.matcha_mode,
+            })
+        except SwipeQueueFull:
+            raise HTTPException(status_code=503, detail="Swipe queue full, retry shortly",
+                                headers={"Retry-After": "1"})
+        _schedule_feedback(swipe, liked, time_spent)
+        recommendation_queues.swiped(swipe.user_id, swipe.matcha_mode, swipe.event_id)
+        return SwipeResponse(
+            user_id=swipe.user_id,
+            event_id=swipe.event_id,
+            time_spent=time_spent,
+            liked=liked,
+            matcha_mode=swipe.matcha_mode,
+        )
 
-    supabase.table("users").update(update_data).eq("id", swipe.user_id).execute()
+    # Analytics insert plus seen/liked append in one transaction
+    # (sql/002_record_swipe.sql)
+    try:
+        data = await async_supabase.rpc("record_swipe", {
+            "p_user_id": swipe.user_id,
+            "p_event_id": swipe.event_id,
+            "p_time_spent": time_spent,
+            "p_liked": liked,
+            "p_matcha_mode": swipe.matcha_mode,
+        }).execute()
+    except APIError as e:
+        if e.code == "P0002":
+            raise HTTPException(status_code=404, detail="User not found")
+        raise
+    _schedule_feedback(swipe, liked, time_spent)
+    recommendation_queues.swiped(swipe.user_id, swipe.matcha_mode, swipe.event_id)
 
     return SwipeResponse(
-        id=data.data[0]["id"],
+        id=data.data,
         user_id=swipe.user_id,
         event_id=swipe.event_id,
         time_spent=time_spent,
@@ -203,81 +652,122 @@ def swipe_event(swipe: SwipeRequest):
     )
 
 # Users
-@app.post("/users", response_model=User)
+@app.post("/users", response_model=UserPublic)
 def create_user(user: UserCreate):
     """Create a new user."""
     tags = user.tags or []
     coffee_blurb = user.coffee_blurb or ""
     matcha_blurb = user.matcha_blurb or ""
 
-    coffee_embedding = embedding_toolbox.encode(coffee_blurb, tags, None)
-    matcha_embedding = embedding_toolbox.encode(matcha_blurb, tags, None)
-
-    # Convert numpy arrays to Python lists
-    coffee_embeddings = coffee_embedding.tolist() if hasattr(coffee_embedding, 'tolist') else list(coffee_embedding)
-    matcha_embeddings = matcha_embedding.tolist() if hasattr(matcha_embedding, 'tolist') else list(matcha_embedding)
+    coffee_embedding, matcha_embedding = embedding_toolbox.encode_batch(
+        [(coffee_blurb, tags, None), (matcha_blurb, tags, None)]
+    )
 
     user_data = user.model_dump()
     user_data["embeddings"] = {
-        "coffee": coffee_embeddings,
-        "matcha": matcha_embeddings,
+        "coffee": encode_embedding(coffee_embedding, EMBEDDING_STORAGE_DTYPE),
+        "matcha": encode_embedding(matcha_embedding, EMBEDDING_STORAGE_DTYPE),
     }
 
     data = supabase.table("users").insert(user_data).execute()
     return data.data[0]
 
 
-@app.get("/users/{user_id}", response_model=User)
-def get_user(user_id: int):
+@app.get("/users/{user_id}", response_model=UserPublic, response_model_exclude_unset=True)
+async def get_user(user_id: int, fields: Optional[str] = None):
     """Get a user by ID."""
-    data = supabase.table("users").select("*").eq("id", user_id).execute()
+    columns = ", ".join(_fields(UserPublic, fields))
+    data = await async_supabase.table("users").select(columns).eq("id", user_id).execute()
     if not data.data:
         raise HTTPException(status_code=404, detail="User not found")
     return data.data[0]
 
 
-@app.get("/users/{user_id}/liked-events", response_model=list[Event])
-def get_liked_events(user_id: int, matcha_mode: Optional[bool] = None):
+@app.get("/users/{user_id}/liked-events", response_model=list[EventPublic], response_model_exclude_unset=True)
+async def get_liked_events(user_id: int, matcha_mode: Optional[bool] = None, fields: Optional[str] = None):
     """Get all liked events for a user, optionally filtered by mode."""
+    columns = ", ".join(_fields(EventPublic, fields))
     # Get user's liked_events list
-    user_data = supabase.table("users").select("liked_events").eq("id", user_id).execute()
+    user_data = await async_supabase.table("users").select("liked_events").eq("id", user_id).execute()
     if not user_data.data:
         raise HTTPException(status_code=404, detail="User not found")
 
     liked_event_ids = user_data.data[0].get("liked_events") or []
+    liked_event_ids += [record["event_id"] for record in _pending_swipes(user_id) if record["liked"]]
     if not liked_event_ids:
         return []
 
     # Fetch the actual events
-    query = supabase.table("events").select("*").in_("id", liked_event_ids)
+    query = async_supabase.table("events").select(columns).in_("id", liked_event_ids)
     if matcha_mode is not None:
         query = query.eq("matcha_mode", matcha_mode)
-    events_data = query.execute()
+    events_data = await query.execute()
 
     return events_data.data
 
 
 # Analytics
-@app.get("/users/{user_id}/analytics", response_model=Dashboard)
-def get_user_analytics(user_id: int, matcha_mode: Optional[bool] = None):
-    """Get analytics for a user, optionally filtered by mode."""
-    # Get user data
-    user_data = supabase.table("users").select("*").eq("id", user_id).execute()
-    if not user_data.data:
-        raise HTTPException(status_code=404, detail="User not found")
-    user = User(**user_data.data[0])
-    
-    # Get analytics data
-    query = supabase.table("analytics").select("*").eq("user_id", user_id)
+def _merge_pending(user: UserPublic, stats_rows: list[dict], pending: list[dict],
+                   matcha_mode: Optional[bool]) -> list[dict]:
+    """Adds swipes pending in this worker to a user row and its `user_mode_stats` rows."""
+    user.seen_count = (user.seen_count or 0) + len(pending)
+    user.liked_events = (user.liked_events or []) + [record["event_id"] for record in pending if record["liked"]]
+
+    by_mode = {bool(row.get("matcha_mode")): dict(row) for row in stats_rows}
+    for record in pending:
+        mode = bool(record["matcha_mode"])
+        if matcha_mode is not None and mode != matcha_mode:
+            continue
+        row = by_mode.setdefault(mode, {"user_id": user.id, "matcha_mode": mode})
+        row["interactions"] = (row.get("interactions") or 0) + 1
+        row["time_spent_seconds"] = (row.get("time_spent_seconds") or 0) + record["time_spent"]
+        if record["liked"]:
+            row["swipes_right"] = (row.get("swipes_right") or 0) + 1
+            row["right_time_seconds"] = (row.get("right_time_seconds") or 0) + record["time_spent"]
+    return list(by_mode.values())
+
+async def _user_metrics(user_id: int, matcha_mode: Optional[bool]) -> tuple[UserPublic, dict]:
+    """Loads a user and builds their dashboard metrics."""
+    # Get user data and the running per-mode aggregates (sql/004_user_mode_stats.sql)
+    # concurrently; at most two stats rows regardless of history length
+    query = async_supabase.table("user_mode_stats").select("*").eq("user_id", user_id)
     if matcha_mode is not None:
         query = query.eq("matcha_mode", matcha_mode)
-    data = query.execute()
-    
-    # Convert to Analytics objects
-    analytics_list = [Analytics(**record) for record in data.data]
-    
-    # Generate dashboard using existing function
-    dashboard_data = generate_dashboard(user_id, analytics_list, openai_client)
+    # Everything but the seen array: its length comes from seen_count and its
+    # ids from the (cached) seen set
+    columns = ", ".join(name for name in UserPublic.model_fields if name != "seen")
+    user_data, stats_data = await asyncio.gather(
+        async_supabase.table("users").select(columns).eq("id", user_id).execute(),
+        query.execute(),
+    )
+    if not user_data.data:
+        raise HTTPException(status_code=404, detail="User not found")
+    user = UserPublic(**user_data.data[0])
+    seen = await _seen_set(user_id, user.seen_count or 0)
+    stats_rows = stats_data.data
+    pending = _pending_swipes(user_id)
+    if pending:
+        stats_rows = _merge_pending(user, stats_rows, pending, matcha_mode)
+
+    # Generate dashboard using existing function; tags come from the in-memory
+    # event->tag index over the user's liked and seen events
+    tags = tag_breakdown(event_catalog.tags, user.liked_events or [], seen.ids.tolist(), matcha_mode)
+    return user, stats_metrics(stats_rows, tags)
+
+@app.get("/users/{user_id}/analytics", response_model=Dashboard)
+async def get_user_analytics(user_id: int, matcha_mode: Optional[bool] = None, defer_insights: Optional[bool] = None):
+    """Get analytics for a user, optionally filtered by mode.
+
+    AI insights are cached per user until the metrics change. With
+    defer_insights (default DEFER_AI_INSIGHTS) a missing insight is generated in
+    the background and ai_insights is empty; poll /users/{id}/analytics/insights.
+    """
+    user, metrics = await _user_metrics(user_id, matcha_mode)
+    defer = DEFER_AI_INSIGHTS if defer_insights is None else defer_insights
+    dashboard_data = await agenerate_dashboard(
+        user_id, [], openai_client, metrics=metrics,
+        insight_cache=insight_cache, defer_insight=defer,
+    )
     
     # Transform the data to match frontend expectations
     # Your analytics.py returns different field names than frontend expects
@@ -318,3 +808,10 @@ def get_user_analytics(user_id: int, matcha_mode: Optional[bool] = None):
         tags=tags_transformed,
         ai_insights=dashboard_data.ai_insights,
     )
+
+@app.get("/users/{user_id}/analytics/insights", response_model=Insights)
+async def get_user_insights(user_id: int, matcha_mode: Optional[bool] = None, wait: bool = False):
+    """AI insights for the user's current dashboard, ready=False while still generating."""
+    _, metrics = await _user_metrics(user_id, matcha_mode)
+    ai_insights = await agenerate_insights(user_id, metrics, openai_client, insight_cache, wait=wait)
+    return Insights(user_id=user_id, ready=ai_insights is not None, ai_insights=ai_insights or [])
@@ -24,6 +24,21 @@ class User(BaseModel):
     liked_events: Optional[list[int]] = None
 
 
+class UserPublic(BaseModel):
+    """User as returned by the API: no embeddings, and every field but id
+    can be left out with `fields=`."""
+    id: int
+    created_at: Optional[datetime] = None
+    name: Optional[str] = None
+    matcha_blurb: Optional[str] = None
+    coffee_blurb: Optional[str] = None
+    tags: Optional[list[Any]] = None
+    seen: Optional[list[Any]] = None
+    # Length of seen (generated column, sql/005_seen_sets.sql)
+    seen_count: Optional[int] = None
+    liked_events: Optional[list[int]] = None
+
+
 class UserCreate(BaseModel):
     name: Optional[str] = None
     matcha_blurb: Optional[str] = None
@@ -43,6 +58,18 @@ class Event(BaseModel):
     image_link: Optional[str] = None
 
 
+class EventPublic(BaseModel):
+    """Event as returned by the API: no embeddings, and every field but id
+    can be left out with `fields=`."""
+    id: int
+    created_at: Optional[datetime] = None
+    title: Optional[str] = None
+    description: Optional[str] = None
+    tags: Optional[list[Any]] = None
+    matcha_mode: Optional[bool] = None
+    image_link: Optional[str] = None
+
+
 class EventCreate(BaseModel):
     title: str
     description: Optional[str] = None
@@ -61,7 +88,7 @@ class SwipeRequest(BaseModel):
     matcha_mode: bool
 
 class SwipeResponse(BaseModel):
-    id: int
+    id: Optional[int] = None  # None when the swipe was queued, not yet written
     user_id: int
     event_id: int
     time_spent: float
@@ -83,8 +110,13 @@ class Analytics(BaseModel):
     liked: Optional[bool] = None
     matcha_mode: Optional[bool] = None
 
+class Insights(BaseModel):
+    user_id: int
+    ready: bool  # False while the insight is still being generated
+    ai_insights: List[str]
+
 class Dashboard(BaseModel):
-    person: Union[User, int]  # Can be User object or user_id int
+    person: Union[UserPublic, int]  # Can be User object or user_id int
     coffee: Dict[str, Any]
     matcha: Dict[str, Any]
     total_swipes: int
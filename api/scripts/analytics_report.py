@@ -0,0 +1,92 @@
+"""Platform, cohort and per-user swipe analytics for internal reporting.
+
+Run from the api/ directory:
+
+    python -m scripts.analytics_report                          # platform-wide
+    python -m scripts.analytics_report --group-by cohort        # by signup month
+    python -m scripts.analytics_report --group-by user --csv users.csv
+    python -m scripts.analytics_report --cache analytics.npz    # reuse a snapshot
+
+The analytics table is paged straight into NumPy columns and every group is
+aggregated in one vectorized pass (engine/analytics_columns.py), so millions
+of rows take seconds once fetched. --cache writes the fetched columns on the
+first run and reads them back afterwards.
+"""
+
+import argparse
+import csv
+import os
+import sys
+import time
+
+from dotenv import load_dotenv
+from supabase import create_client
+
+from engine.analytics_columns import AnalyticsColumns, GroupedAggregates, fetch_columns
+
+
+def signup_cohorts(supabase, page_size: int = 10000) -> dict[int, str]:
+    """Maps every user id to its signup month, e.g. "2025-11"."""
+    cohorts: dict[int, str] = {}
+    last_id = 0
+    while True:
+        page = (
+            supabase.table("users").select("id, created_at")
+            .gt("id", last_id).order("id").limit(page_size).execute()
+        ).data
+        for row in page:
+            cohorts[row["id"]] = (row.get("created_at") or "unknown")[:7]
+        if page:
+            last_id = page[-1]["id"]
+        if len(page) < page_size:
+            return cohorts
+
+
+def write_table(table: dict, out):
+    writer = csv.writer(out)
+    names = list(table)
+    writer.writerow(names)
+    for i in range(len(table["key"])):
+        writer.writerow([table[name][i].item() if hasattr(table[name][i], "item") else table[name][i]
+                         for name in names])
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--group-by", choices=["platform", "cohort", "user"], default="platform")
+    parser.add_argument("--cache", help=".npz snapshot of the analytics columns, written if missing")
+    parser.add_argument("--csv", help="write the report here instead of stdout")
+    args = parser.parse_args()
+
+    load_dotenv()
+    supabase = create_client(os.environ.get("SUPABASE_URL", ""), os.environ.get("SUPABASE_KEY", ""))
+
+    start = time.perf_counter()
+    if args.cache and os.path.exists(args.cache):
+        columns = AnalyticsColumns.load(args.cache)
+    else:
+        columns = fetch_columns(supabase)
+        if args.cache:
+            columns.save(args.cache)
+    loaded = time.perf_counter()
+
+    if args.group_by == "user":
+        grouped = GroupedAggregates.by_user(columns)
+    elif args.group_by == "cohort":
+        grouped = GroupedAggregates.by_cohort(columns, signup_cohorts(supabase))
+    else:
+        grouped = GroupedAggregates.platform(columns)
+    table = grouped.table()
+    done = time.perf_counter()
+
+    print(f"[Report] {len(columns)} swipes loaded in {loaded - start:.1f}s, "
+          f"{len(grouped)} groups aggregated in {done - loaded:.2f}s", file=sys.stderr)
+    if args.csv:
+        with open(args.csv, "w", newline="", encoding="utf-8") as f:
+            write_table(table, f)
+    else:
+        write_table(table, sys.stdout)
+
+
+if __name__ == "__main__":
+    main()
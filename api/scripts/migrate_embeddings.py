@@ -0,0 +1,90 @@
+"""Rewrite stored embeddings from JSON float lists to the compact format.
+
+Run from the api/ directory:
+
+    python -m scripts.migrate_embeddings --dry-run
+    python -m scripts.migrate_embeddings --dtype float16
+    python -m scripts.migrate_embeddings --vector-column   # also fill events.embedding
+
+Rows already in the compact format are skipped (unless --dtype differs and
+--reencode is passed), so the script is safe to re-run.
+"""
+
+import argparse
+import os
+
+from dotenv import load_dotenv
+from supabase import create_client
+
+from engine.ml_models.embedding_codec import DTYPE_CODES, decode_embedding, encode_embedding, is_encoded, stored_dtype
+
+PAGE_SIZE = 500
+
+
+def _needs_rewrite(value, dtype: str, reencode: bool) -> bool:
+    if not is_encoded(value):
+        return True
+    return reencode and stored_dtype(value) != dtype
+
+
+def migrate_table(supabase, table: str, dtype: str, dry_run: bool, reencode: bool, vector_column: bool) -> int:
+    """
+    Re-encodes every embedding of one table.
+
+    :param table: "events" or "users"
+    :type table: str
+    :return: number of rows rewritten
+    :rtype: int
+    """
+    rewritten = 0
+    last_id = 0
+    while True:
+        page = (
+            supabase.table(table).select("id, embeddings")
+            .gt("id", last_id).order("id").limit(PAGE_SIZE).execute()
+        ).data
+        for row in page:
+            last_id = row["id"]
+            embeddings = row.get("embeddings") or {}
+            if not any(_needs_rewrite(v, dtype, reencode) for v in embeddings.values() if v):
+                if not vector_column:
+                    continue
+
+            update = {
+                "embeddings": {mode: encode_embedding(decode_embedding(v), dtype) if v else v
+                               for mode, v in embeddings.items()},
+            }
+            if vector_column and table == "events":
+                vector = next((v for v in embeddings.values() if v), None)
+                if vector is not None:
+                    update["embedding"] = decode_embedding(vector).tolist()
+
+            rewritten += 1
+            if not dry_run:
+                supabase.table(table).update(update).eq("id", row["id"]).execute()
+
+        if len(page) < PAGE_SIZE:
+            return rewritten
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dtype", choices=sorted(DTYPE_CODES), default="float32")
+    parser.add_argument("--table", choices=["events", "users"], action="append",
+                        help="table to migrate (default: both)")
+    parser.add_argument("--dry-run", action="store_true", help="count rows without writing")
+    parser.add_argument("--reencode", action="store_true", help="also rewrite compact rows stored in another dtype")
+    parser.add_argument("--vector-column", action="store_true",
+                        help="also fill the pgvector events.embedding column")
+    args = parser.parse_args()
+
+    load_dotenv()
+    supabase = create_client(os.environ.get("SUPABASE_URL", ""), os.environ.get("SUPABASE_KEY", ""))
+    for table in args.table or ["events", "users"]:
+        count = migrate_table(supabase, table, args.dtype, args.dry_run, args.reencode, args.vector_column)
+        verb = "would rewrite" if args.dry_run else "rewrote"
+        print(f"[Migrate] {table}: {verb} {count} rows")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,47 @@
+"""Shared embedding model server for multi-worker deployments.
+
+Run from the api/ directory, next to the API workers:
+
+    python -m scripts.model_server --socket /tmp/commongrounds-model.sock
+
+Loads all-MiniLM-L6-v2 once and serves encode requests over a Unix socket.
+API workers started with EMBEDDING_MODEL_SOCKET pointing at the same path
+send their texts here instead of each loading torch and the model (see
+engine/ml_models/model_server.py).
+"""
+
+import argparse
+import os
+
+from engine.ml_models.embedding_toolbox import EmbeddingToolbox
+from engine.ml_models.model_server import ModelServer
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--socket", default=os.environ.get("EMBEDDING_MODEL_SOCKET", "/tmp/commongrounds-model.sock"))
+    parser.add_argument("--model", default="all-MiniLM-L6-v2")
+    parser.add_argument("--backend", choices=["torch", "onnx"], default=os.environ.get("EMBEDDING_BACKEND", "torch"))
+    parser.add_argument("--quantize", action="store_true",
+                        default=os.environ.get("EMBEDDING_ONNX_QUANTIZE", "false").lower() == "true",
+                        help="dynamic int8 quantization (onnx backend)")
+    parser.add_argument("--threads", type=int, default=int(os.environ.get("EMBEDDING_THREADS", "0")) or None)
+    parser.add_argument("--max-batch", type=int, default=int(os.environ.get("EMBEDDING_BATCH_MAX_SIZE", "64")),
+                        help="texts per forward pass")
+    parser.add_argument("--max-wait-ms", type=float, default=float(os.environ.get("EMBEDDING_BATCH_MAX_WAIT_MS", "5")),
+                        help="ms a request waits for others to join its batch")
+    args = parser.parse_args()
+
+    toolbox = EmbeddingToolbox(model_name=args.model, backend=args.backend, threads=args.threads,
+                               onnx_quantize=args.quantize)
+    toolbox.instantiate()
+    with ModelServer(args.socket, toolbox.model, args.max_batch, args.max_wait_ms / 1000) as server:
+        print(f"[ModelServer] Serving {args.model} on {args.socket}")
+        try:
+            server.serve_forever()
+        finally:
+            os.unlink(args.socket)
+
+
+if __name__ == "__main__":
+    main()
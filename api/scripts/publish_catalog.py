@@ -0,0 +1,57 @@
+"""Catalog loader for multi-worker deployments.
+
+Run from the api/ directory, next to the API workers:
+
+    python -m scripts.publish_catalog --dir /dev/shm/commongrounds
+    python -m scripts.publish_catalog --dir /dev/shm/commongrounds --once
+
+Loads the events table, writes one embedding snapshot per mode into --dir
+and keeps refreshing, republishing whenever new events arrive. API workers
+started with SHARED_CATALOG_DIR pointing at the same directory map the
+snapshots read-only instead of each holding their own copy of the matrix
+(see engine/shared_index.py). A tmpfs directory such as /dev/shm keeps the
+snapshots off disk.
+"""
+
+import argparse
+import os
+import time
+
+from dotenv import load_dotenv
+from supabase import create_client
+
+from engine.event_catalog import EventCatalog
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--dir", default=os.environ.get("SHARED_CATALOG_DIR"), help="snapshot directory")
+    parser.add_argument("--interval", type=float, default=float(os.environ.get("CATALOG_REFRESH_SECONDS", "30")),
+                        help="seconds between refreshes")
+    parser.add_argument("--once", action="store_true", help="publish once and exit")
+    args = parser.parse_args()
+    if not args.dir:
+        parser.error("--dir or SHARED_CATALOG_DIR is required")
+    os.makedirs(args.dir, exist_ok=True)
+
+    load_dotenv()
+    supabase = create_client(os.environ.get("SUPABASE_URL", ""), os.environ.get("SUPABASE_KEY", ""))
+    catalog = EventCatalog(supabase)
+    catalog.load()
+    catalog.publish(args.dir)
+    print(f"[Publish] {len(catalog.index(True))} matcha and {len(catalog.index(False))} coffee vectors -> {args.dir}")
+
+    while not args.once:
+        time.sleep(args.interval)
+        try:
+            added = catalog.refresh()
+        except Exception as e:
+            print(f"[Publish] Refresh failed: {e}")
+            continue
+        if added:
+            catalog.publish(args.dir)
+            print(f"[Publish] Republished with {added} new events (watermark {catalog.watermark})")
+
+
+if __name__ == "__main__":
+    main()
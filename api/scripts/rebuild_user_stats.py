@@ -0,0 +1,32 @@
+"""Recompute the running user_mode_stats aggregates from raw analytics.
+
+Run from the api/ directory:
+
+    python -m scripts.rebuild_user_stats              # every user
+    python -m scripts.rebuild_user_stats --user-id 42
+
+Needed once after applying sql/004_user_mode_stats.sql, and whenever
+analytics rows are edited or deleted outside the swipe endpoints.
+"""
+
+import argparse
+import os
+
+from dotenv import load_dotenv
+from supabase import create_client
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--user-id", type=int, help="only rebuild this user's rows")
+    args = parser.parse_args()
+
+    load_dotenv()
+    supabase = create_client(os.environ.get("SUPABASE_URL", ""), os.environ.get("SUPABASE_KEY", ""))
+    data = supabase.rpc("rebuild_user_mode_stats", {"p_user_id": args.user_id}).execute()
+    target = f"user {args.user_id}" if args.user_id is not None else "all users"
+    print(f"[Stats] Rebuilt {data.data} (user, mode) rows for {target}")
+
+
+if __name__ == "__main__":
+    main()
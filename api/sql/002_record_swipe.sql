@@ -0,0 +1,39 @@
+-- Atomic swipe recording used by POST /swipe
+--
+-- Inserts the analytics row and appends the event to the user's seen (and,
+-- for right swipes, liked_events) array in one transaction. The update takes
+-- the user's row lock, so concurrent swipes from the same user serialize
+-- instead of overwriting each other's read-modify-write.
+
+create or replace function record_swipe(
+    p_user_id bigint,
+    p_event_id bigint,
+    p_time_spent double precision,
+    p_liked boolean,
+    p_matcha_mode boolean
+)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_analytics_id bigint;
+begin
+    update users
+    set seen = array_append(coalesce(seen, '{}'), p_event_id),
+        liked_events = case
+            when p_liked then array_append(coalesce(liked_events, '{}'), p_event_id)
+            else liked_events
+        end
+    where id = p_user_id;
+
+    if not found then
+        raise exception 'User % not found', p_user_id using errcode = 'P0002';
+    end if;
+
+    insert into analytics (user_id, event_id, time_spent, liked, matcha_mode)
+    values (p_user_id, p_event_id, p_time_spent, p_liked, p_matcha_mode)
+    returning id into v_analytics_id;
+
+    return v_analytics_id;
+end;
+$$;
@@ -0,0 +1,49 @@
+-- Batched swipe ingestion used by the write-behind queue
+-- (SWIPE_INGEST_MODE=queued, engine/swipe_queue.py)
+--
+-- record_swipes() takes a JSON array of swipes, inserts them into analytics
+-- and appends them to every affected user's seen/liked_events arrays in one
+-- statement. Each swipe carries a client-generated ingest_id; swipes already
+-- recorded (a batch replayed from the journal after a crash) are skipped, and
+-- only newly inserted swipes are appended to the user arrays.
+
+alter table analytics add column if not exists ingest_id uuid unique;
+
+create or replace function record_swipes(p_swipes jsonb)
+returns int
+language sql
+as $$
+    with incoming as (
+        select (s ->> 'ingest_id')::uuid as ingest_id,
+               (s ->> 'user_id')::bigint as user_id,
+               (s ->> 'event_id')::bigint as event_id,
+               (s ->> 'time_spent')::double precision as time_spent,
+               (s ->> 'liked')::boolean as liked,
+               (s ->> 'matcha_mode')::boolean as matcha_mode,
+               ord
+        from jsonb_array_elements(p_swipes) with ordinality as t(s, ord)
+    ),
+    inserted as (
+        insert into analytics (ingest_id, user_id, event_id, time_spent, liked, matcha_mode)
+        select ingest_id, user_id, event_id, time_spent, liked, matcha_mode
+        from incoming
+        order by ord
+        on conflict (ingest_id) do nothing
+        returning id, user_id, event_id, liked
+    ),
+    appended as (
+        update users u
+        set seen = coalesce(u.seen, '{}') || agg.seen,
+            liked_events = coalesce(u.liked_events, '{}') || agg.liked
+        from (
+            select user_id,
+                   array_agg(event_id order by id) as seen,
+                   coalesce(array_agg(event_id order by id) filter (where liked), '{}') as liked
+            from inserted
+            group by user_id
+        ) agg
+        where u.id = agg.user_id
+        returning u.id
+    )
+    select count(*)::int from inserted;
+$$;
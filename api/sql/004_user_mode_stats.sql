@@ -0,0 +1,151 @@
+-- Running per-(user, mode) swipe aggregates for GET /users/{id}/analytics
+--
+-- Every swipe path bumps one user_mode_stats row in the same transaction as
+-- its analytics insert, so the dashboard reads at most two rows instead of a
+-- user's whole analytics history. Left-swipe figures are derived:
+--   swipes_left = interactions - swipes_right
+--   left_time_seconds = time_spent_seconds - right_time_seconds
+--
+-- rebuild_user_mode_stats() recomputes the table from raw analytics, for one
+-- user or everyone (python -m scripts.rebuild_user_stats).
+
+create table if not exists user_mode_stats (
+    user_id bigint not null,
+    matcha_mode boolean not null,
+    interactions bigint not null default 0,
+    swipes_right bigint not null default 0,
+    time_spent_seconds double precision not null default 0,
+    right_time_seconds double precision not null default 0,
+    updated_at timestamptz not null default now(),
+    primary key (user_id, matcha_mode)
+);
+
+create or replace function rebuild_user_mode_stats(p_user_id bigint default null)
+returns int
+language plpgsql
+as $$
+declare
+    v_rows int;
+begin
+    delete from user_mode_stats where p_user_id is null or user_id = p_user_id;
+
+    insert into user_mode_stats (user_id, matcha_mode, interactions, swipes_right,
+                                 time_spent_seconds, right_time_seconds)
+    select user_id,
+           coalesce(matcha_mode, false),
+           count(*),
+           count(*) filter (where liked),
+           coalesce(sum(time_spent), 0),
+           coalesce(sum(time_spent) filter (where liked), 0)
+    from analytics
+    where user_id is not null and (p_user_id is null or user_id = p_user_id)
+    group by user_id, coalesce(matcha_mode, false);
+
+    get diagnostics v_rows = row_count;
+    return v_rows;
+end;
+$$;
+
+-- Single swipe (sql/002_record_swipe.sql) now also bumps the aggregates
+create or replace function record_swipe(
+    p_user_id bigint,
+    p_event_id bigint,
+    p_time_spent double precision,
+    p_liked boolean,
+    p_matcha_mode boolean
+)
+returns bigint
+language plpgsql
+as $$
+declare
+    v_analytics_id bigint;
+begin
+    update users
+    set seen = array_append(coalesce(seen, '{}'), p_event_id),
+        liked_events = case
+            when p_liked then array_append(coalesce(liked_events, '{}'), p_event_id)
+            else liked_events
+        end
+    where id = p_user_id;
+
+    if not found then
+        raise exception 'User % not found', p_user_id using errcode = 'P0002';
+    end if;
+
+    insert into analytics (user_id, event_id, time_spent, liked, matcha_mode)
+    values (p_user_id, p_event_id, p_time_spent, p_liked, p_matcha_mode)
+    returning id into v_analytics_id;
+
+    insert into user_mode_stats as s (user_id, matcha_mode, interactions, swipes_right,
+                                      time_spent_seconds, right_time_seconds)
+    values (p_user_id, p_matcha_mode, 1, case when p_liked then 1 else 0 end,
+            coalesce(p_time_spent, 0), case when p_liked then coalesce(p_time_spent, 0) else 0 end)
+    on conflict (user_id, matcha_mode) do update
+    set interactions = s.interactions + excluded.interactions,
+        swipes_right = s.swipes_right + excluded.swipes_right,
+        time_spent_seconds = s.time_spent_seconds + excluded.time_spent_seconds,
+        right_time_seconds = s.right_time_seconds + excluded.right_time_seconds,
+        updated_at = now();
+
+    return v_analytics_id;
+end;
+$$;
+
+-- Batched swipes (sql/003_record_swipes.sql) now also bump the aggregates
+create or replace function record_swipes(p_swipes jsonb)
+returns int
+language sql
+as $$
+    with incoming as (
+        select (s ->> 'ingest_id')::uuid as ingest_id,
+               (s ->> 'user_id')::bigint as user_id,
+               (s ->> 'event_id')::bigint as event_id,
+               (s ->> 'time_spent')::double precision as time_spent,
+               (s ->> 'liked')::boolean as liked,
+               (s ->> 'matcha_mode')::boolean as matcha_mode,
+               ord
+        from jsonb_array_elements(p_swipes) with ordinality as t(s, ord)
+    ),
+    inserted as (
+        insert into analytics (ingest_id, user_id, event_id, time_spent, liked, matcha_mode)
+        select ingest_id, user_id, event_id, time_spent, liked, matcha_mode
+        from incoming
+        order by ord
+        on conflict (ingest_id) do nothing
+        returning id, user_id, event_id, time_spent, liked, matcha_mode
+    ),
+    appended as (
+        update users u
+        set seen = coalesce(u.seen, '{}') || agg.seen,
+            liked_events = coalesce(u.liked_events, '{}') || agg.liked
+        from (
+            select user_id,
+                   array_agg(event_id order by id) as seen,
+                   coalesce(array_agg(event_id order by id) filter (where liked), '{}') as liked
+            from inserted
+            group by user_id
+        ) agg
+        where u.id = agg.user_id
+        returning u.id
+    ),
+    bumped as (
+        insert into user_mode_stats as s (user_id, matcha_mode, interactions, swipes_right,
+                                          time_spent_seconds, right_time_seconds)
+        select user_id,
+               matcha_mode,
+               count(*),
+               count(*) filter (where liked),
+               coalesce(sum(time_spent), 0),
+               coalesce(sum(time_spent) filter (where liked), 0)
+        from inserted
+        group by user_id, matcha_mode
+        on conflict (user_id, matcha_mode) do update
+        set interactions = s.interactions + excluded.interactions,
+            swipes_right = s.swipes_right + excluded.swipes_right,
+            time_spent_seconds = s.time_spent_seconds + excluded.time_spent_seconds,
+            right_time_seconds = s.right_time_seconds + excluded.right_time_seconds,
+            updated_at = now()
+        returning 1
+    )
+    select count(*)::int from inserted;
+$$;
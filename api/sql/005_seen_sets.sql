@@ -0,0 +1,28 @@
+-- Incremental seen-set loading for GET /events (engine/seen_set.py)
+--
+-- users.seen is append-only, so a worker holding a user's seen set for the
+-- first n entries only needs entries n+1.. to catch up:
+--
+--   seen_count        length of seen, selected with the profile instead of
+--                     the whole array
+--   seen_tail()       entries after an offset
+--   seen_packed       delta/varint-encoded SeenSet of the first
+--   seen_packed_count seen entries, written back by the API after long
+--                     loads so cold workers start from it
+
+alter table users
+    add column if not exists seen_count integer
+        generated always as (coalesce(cardinality(seen), 0)) stored;
+
+alter table users add column if not exists seen_packed text;
+alter table users add column if not exists seen_packed_count integer;
+
+create or replace function seen_tail(p_user_id bigint, p_offset integer)
+returns bigint[]
+language sql
+stable
+as $$
+    select coalesce(seen[p_offset + 1:], '{}')
+    from users
+    where id = p_user_id;
+$$;
@@ -0,0 +1,30 @@
+-- Swipe feedback on user embeddings (USER_VECTOR_SOURCE=feedback)
+--
+-- POST /swipe moves the user's stored vector of the swiped mode towards
+-- liked events and away from left-swiped ones (engine/user_vectors.py) and
+-- writes it back with set_user_embedding(). Only the one mode's key of
+-- users.embeddings is replaced, so concurrent updates of the other mode are
+-- not overwritten by a read-modify-write from the API.
+--
+-- Every write bumps users.embedding_version and only applies if the row is
+-- still at the version the vector was read at (compare-and-set). Swipes of
+-- the same user handled by different workers, or by concurrent tasks of one
+-- worker, therefore never overwrite each other's steps: the loser gets null
+-- back, reloads the vector and applies its swipe again.
+
+alter table users add column if not exists embedding_version bigint not null default 0;
+
+-- Earlier unconditional version of the function
+drop function if exists set_user_embedding(bigint, text, text);
+
+create or replace function set_user_embedding(p_user_id bigint, p_mode text, p_embedding text,
+                                              p_version bigint)
+returns bigint
+language sql
+as $$
+    update users
+    set embeddings = jsonb_set(coalesce(embeddings::jsonb, '{}'::jsonb), array[p_mode], to_jsonb(p_embedding)),
+        embedding_version = embedding_version + 1
+    where id = p_user_id and embedding_version = p_version
+    returning embedding_version;
+$$;
@@ -0,0 +1,90 @@
+"""Columnar analytics against the row-by-row aggregate_mode."""
+
+from datetime import datetime
+
+import numpy as np
+import pytest
+
+from engine.analytics import aggregate_mode
+from engine.analytics_columns import AnalyticsColumns, GroupedAggregates, aggregate_modes
+from models import Analytics
+
+
+def history(rows=500, users=7, seed=0):
+    rng = np.random.default_rng(seed)
+    swipes = []
+    for i in range(rows):
+        missing = rng.random(3) < 0.05
+        swipes.append(Analytics(
+            id=i + 1,
+            created_at=datetime(2026, 1, 1),
+            user_id=int(rng.integers(1, users + 1)),
+            event_id=int(rng.integers(1, 100)),
+            time_spent=None if missing[0] else float(rng.exponential(4.0)),
+            liked=None if missing[1] else bool(rng.random() < 0.4),
+            matcha_mode=None if missing[2] else bool(rng.random() < 0.5),
+        ))
+    return swipes
+
+
+@pytest.mark.parametrize("seed", range(5))
+def test_aggregate_modes_matches_aggregate_mode(seed):
+    swipes = history(seed=seed)
+    modes = aggregate_modes(AnalyticsColumns.from_records(swipes))
+    for mode in (True, False):
+        assert modes[mode] == aggregate_mode(swipes, mode)
+
+
+def test_raw_rows_and_models_give_the_same_columns():
+    swipes = history()
+    from_models = aggregate_modes(AnalyticsColumns.from_records(swipes))
+    from_dicts = aggregate_modes(AnalyticsColumns.from_records([s.model_dump() for s in swipes]))
+    assert from_models == from_dicts
+
+
+@pytest.mark.parametrize("swipes", [
+    [],
+    [Analytics(id=1, created_at=datetime(2026, 1, 1), user_id=1, event_id=1, liked=True, matcha_mode=True)],
+    [Analytics(id=1, created_at=datetime(2026, 1, 1), user_id=1, event_id=1, time_spent=2.5, liked=False)],
+])
+def test_edge_cases_match(swipes):
+    modes = aggregate_modes(AnalyticsColumns.from_records(swipes))
+    for mode in (True, False):
+        assert modes[mode] == aggregate_mode(swipes, mode)
+
+
+def test_by_user_matches_each_users_history():
+    swipes = history()
+    grouped = GroupedAggregates.by_user(AnalyticsColumns.from_records(swipes))
+    assert grouped.keys.tolist() == sorted({s.user_id for s in swipes})
+    for i, user_id in enumerate(grouped.keys):
+        own = [s for s in swipes if s.user_id == user_id]
+        for mode, metrics in grouped.metrics(i).items():
+            assert metrics == aggregate_mode(own, mode)
+
+
+def test_by_cohort_and_table():
+    swipes = history()
+    columns = AnalyticsColumns.from_records(swipes)
+    grouped = GroupedAggregates.by_cohort(columns, {1: "a", 2: "a", 3: "b"})
+    assert grouped.keys.tolist() == ["a", "b", "unknown"]
+
+    table = grouped.table()
+    cohort_a = [s for s in swipes if s.user_id in (1, 2)]
+    coffee = aggregate_mode(cohort_a, False)
+    assert table["coffee_interactions"][0] == coffee["interactions"]
+    assert table["coffee_like_rate"][0] == pytest.approx(coffee["like_rate"])
+    assert table["coffee_avg_time"][0] == pytest.approx(coffee["avg_time_per_interaction"])
+    assert table["coffee_hesitation"][0] == pytest.approx(coffee["hesitation_score"])
+
+
+def test_save_load_and_concat(tmp_path):
+    swipes = history()
+    columns = AnalyticsColumns.from_records(swipes)
+    columns.save(tmp_path / "analytics.npz")
+    loaded = AnalyticsColumns.load(tmp_path / "analytics.npz")
+    assert aggregate_modes(loaded) == aggregate_modes(columns)
+
+    parts = AnalyticsColumns.concat([AnalyticsColumns.from_records(swipes[:200]),
+                                     AnalyticsColumns.from_records(swipes[200:])])
+    assert aggregate_modes(parts) == aggregate_modes(columns)
@@ -0,0 +1,95 @@
+"""EmbeddingBatcher ordering, chunking, merging and error propagation."""
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+import pytest
+
+from engine.ml_models.embedding_batcher import EmbeddingBatcher
+
+
+class StubModel:
+    """Encodes the text "n" as [n, 1, 0, 0] and records every forward pass."""
+
+    def __init__(self, fail_on=None):
+        self.batches = []
+        self.fail_on = fail_on
+        self.lock = threading.Lock()
+
+    def encode(self, texts, batch_size=32, convert_to_numpy=True, normalize_embeddings=True):
+        with self.lock:
+            self.batches.append(list(texts))
+        if self.fail_on in texts:
+            raise RuntimeError("model failed")
+        return np.array([[float(text), 1.0, 0.0, 0.0] for text in texts], dtype=np.float32)
+
+    def get_sentence_embedding_dimension(self):
+        return 4
+
+
+@pytest.fixture
+def model():
+    return StubModel()
+
+
+def test_results_come_back_in_order(model):
+    batcher = EmbeddingBatcher(model, max_batch=8, max_wait=0.001)
+    try:
+        texts = [str(i) for i in range(5)]
+        np.testing.assert_array_equal(batcher.encode(texts)[:, 0], np.arange(5))
+        assert batcher.encode("7").tolist() == [7.0, 1.0, 0.0, 0.0]
+        assert batcher.get_sentence_embedding_dimension() == 4
+    finally:
+        batcher.close()
+
+
+def test_large_encodes_are_chunked_by_batch_size(model):
+    batcher = EmbeddingBatcher(model, max_batch=16, max_wait=0.001)
+    try:
+        vectors = batcher.encode([str(i) for i in range(50)], batch_size=8)
+    finally:
+        batcher.close()
+    np.testing.assert_array_equal(vectors[:, 0], np.arange(50))
+    assert [len(batch) for batch in model.batches] == [8] * 6 + [2]
+
+
+def test_batch_size_is_capped_at_max_batch(model):
+    batcher = EmbeddingBatcher(model, max_batch=4, max_wait=0.001)
+    try:
+        batcher.encode([str(i) for i in range(10)], batch_size=100)
+    finally:
+        batcher.close()
+    assert max(len(batch) for batch in model.batches) == 4
+
+
+def test_concurrent_single_encodes_share_a_forward_pass(model):
+    batcher = EmbeddingBatcher(model, max_batch=64, max_wait=0.2)
+    try:
+        with ThreadPoolExecutor(16) as pool:
+            vectors = list(pool.map(batcher.encode, [str(i) for i in range(16)]))
+    finally:
+        batcher.close()
+    # Every caller gets its own row back
+    assert [vector[0] for vector in vectors] == list(range(16))
+    assert len(model.batches) < 16
+    assert batcher.stats()["items"] == 16
+
+
+def test_model_errors_reach_the_caller():
+    model = StubModel(fail_on="3")
+    batcher = EmbeddingBatcher(model, max_batch=8, max_wait=0.001)
+    try:
+        with pytest.raises(RuntimeError, match="model failed"):
+            batcher.encode(["1", "3"])
+        # The batching thread survives and serves later calls
+        assert batcher.encode("2")[0] == 2.0
+    finally:
+        batcher.close()
+
+
+def test_closed_batcher_rejects_work(model):
+    batcher = EmbeddingBatcher(model, max_wait=0.001)
+    batcher.close()
+    with pytest.raises(RuntimeError):
+        batcher.submit(["1"])
@@ -0,0 +1,63 @@
+"""Compact embedding storage format round-trips."""
+
+import json
+
+import numpy as np
+import pytest
+
+from engine.ml_models.embedding_codec import (
+    decode_embedding, decode_many, encode_embedding, is_encoded, stored_dtype,
+)
+
+
+@pytest.fixture
+def vector():
+    rng = np.random.default_rng(0)
+    v = rng.normal(size=384).astype(np.float32)
+    return v / np.linalg.norm(v)
+
+
+def test_float32_round_trip_is_exact(vector):
+    encoded = encode_embedding(vector)
+    assert is_encoded(encoded)
+    assert stored_dtype(encoded) == "float32"
+    decoded = decode_embedding(encoded)
+    assert decoded.dtype == np.float32
+    np.testing.assert_array_equal(decoded, vector)
+    # ~2KB of base64 against ~8KB of JSON floats
+    assert len(encoded) < len(json.dumps(vector.tolist())) / 3
+
+
+def test_float16_round_trip_is_close(vector):
+    encoded = encode_embedding(vector, "float16")
+    assert stored_dtype(encoded) == "float16"
+    decoded = decode_embedding(encoded)
+    assert decoded.dtype == np.float32
+    np.testing.assert_allclose(decoded, vector, atol=1e-3)
+    assert float(decoded @ vector) > 0.9999
+    assert len(encoded) < len(encode_embedding(vector)) * 0.6
+
+
+def test_legacy_lists_still_decode(vector):
+    assert is_encoded(vector.tolist()) is False
+    assert stored_dtype(vector.tolist()) is None
+    np.testing.assert_array_equal(decode_embedding(vector.tolist()), vector)
+
+
+def test_decode_into_rows(vector):
+    stored = [encode_embedding(vector), encode_embedding(-vector, "float16"), (vector * 2).tolist()]
+    matrix = decode_many(stored, dim=384)
+    np.testing.assert_array_equal(matrix[0], vector)
+    np.testing.assert_allclose(matrix[1], -vector, atol=1e-3)
+    np.testing.assert_array_equal(matrix[2], vector * 2)
+
+    out = np.zeros(384, dtype=np.float32)
+    assert decode_embedding(stored[0], out=out) is out
+    np.testing.assert_array_equal(out, vector)
+
+
+def test_rejects_unknown_encodings(vector):
+    with pytest.raises(ValueError):
+        encode_embedding(vector, "int8")
+    with pytest.raises(ValueError):
+        decode_embedding("WFgBAYAB" + encode_embedding(vector)[8:])
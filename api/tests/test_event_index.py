@@ -0,0 +1,73 @@
+"""EventIndex against the per-event cosine loop it replaced."""
+
+import numpy as np
+import pytest
+
+from engine.event_index import EventIndex
+from engine.seen_set import SeenSet
+
+
+def loop_top_events(user_embedding, event_embeddings_dict, seen, top_k):
+    """The original _get_top_events: cosine per event, sort, cut."""
+    user = np.asarray(user_embedding, dtype=np.float64)
+    similarities = []
+    for event_id, embedding in event_embeddings_dict.items():
+        if event_id in seen:
+            continue
+        event = np.asarray(embedding, dtype=np.float64)
+        similarities.append((event_id, float(user @ event / (np.linalg.norm(user) * np.linalg.norm(event)))))
+    similarities.sort(key=lambda x: x[1], reverse=True)
+    return [event_id for event_id, _ in similarities][:top_k]
+
+
+def catalog(events=300, dim=32, seed=0):
+    rng = np.random.default_rng(seed)
+    vectors = rng.normal(size=(events, dim)).astype(np.float32)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    # Non-contiguous ids, as in the events table
+    return {int(event_id): vector.tolist() for event_id, vector in zip(rng.permutation(events * 3)[:events], vectors)}
+
+
+@pytest.mark.parametrize("top_k", [1, 10, 299, 1000])
+def test_search_matches_loop(top_k):
+    embeddings = catalog()
+    index = EventIndex.from_dict(embeddings)
+    rng = np.random.default_rng(1)
+    ids = list(embeddings)
+    for _ in range(20):
+        user = rng.normal(size=32).astype(np.float32)
+        user /= np.linalg.norm(user)
+        seen = [int(i) for i in rng.choice(ids, 40, replace=False)] + [10 ** 9]
+        assert index.search(user, seen, top_k) == loop_top_events(user, embeddings, set(seen), top_k)
+
+
+def test_seen_set_filters_like_a_list():
+    embeddings = catalog()
+    index = EventIndex.from_dict(embeddings)
+    user = np.asarray(next(iter(embeddings.values())), dtype=np.float32)
+    seen = list(embeddings)[::3]
+    assert index.search(user, SeenSet(seen), 25) == index.search(user, seen, 25)
+    assert not set(index.search(user, SeenSet(seen), 1000)) & set(seen)
+
+
+def test_everything_seen_or_empty():
+    embeddings = catalog(events=5)
+    index = EventIndex.from_dict(embeddings)
+    user = np.ones(32, dtype=np.float32)
+    assert index.search(user, list(embeddings), 3) == []
+    assert index.search(user, [], 0) == []
+    assert EventIndex(dim=32).search(user, [], 3) == []
+
+
+def test_add_grows_and_replaces():
+    index = EventIndex(dim=4, capacity=1)
+    basis = np.eye(4, dtype=np.float32)
+    for event_id in range(10):
+        index.add(event_id, basis[event_id % 4])
+    assert len(index) == 10
+    index.add(3, basis[0])
+    assert len(index) == 10
+    np.testing.assert_array_equal(index.vector(3), basis[0])
+    assert set(index.search(basis[0], [], 4)) == {0, 3, 4, 8}
+    with pytest.raises(ValueError):
+        index.add(11, np.ones(5, dtype=np.float32))
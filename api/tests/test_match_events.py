@@ -0,0 +1,89 @@
+"""match_events (sql/001_match_events.sql) against a real pgvector database.
+
+Needs a local Supabase stack with the sql/ files applied (`supabase start`,
+then psql ... -f sql/001_match_events.sql and the rest), pointed to by
+SUPABASE_TEST_URL / SUPABASE_TEST_KEY. Skipped when those are not set, so it
+never runs against the production project by accident. The rows it seeds are
+deleted again afterwards.
+"""
+
+import os
+import uuid
+
+import numpy as np
+import pytest
+
+URL = os.environ.get("SUPABASE_TEST_URL")
+KEY = os.environ.get("SUPABASE_TEST_KEY")
+
+pytestmark = pytest.mark.skipif(not (URL and KEY), reason="SUPABASE_TEST_URL/SUPABASE_TEST_KEY not set")
+
+EVENTS = 60
+
+
+@pytest.fixture(scope="module")
+def seeded():
+    from supabase import create_client
+
+    client = create_client(URL, KEY)
+    rng = np.random.default_rng(0)
+    query = rng.normal(size=384)
+    query /= np.linalg.norm(query)
+    # Events close to the query (cosine > 0.9), so they outrank anything else
+    # in the table, at increasing distances
+    vectors = query + np.linspace(0.01, 0.3, EVENTS)[:, None] * rng.normal(size=(EVENTS, 384)) / np.sqrt(384)
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    marker = f"match_events test {uuid.uuid4()}"
+    rows = [{"title": marker, "matcha_mode": True, "embedding": vector.tolist(),
+             "embeddings": {"matcha": vector.tolist()}} for vector in vectors]
+    events = client.table("events").insert(rows).execute().data
+    ids = [event["id"] for event in events]
+    # Ranked by true cosine similarity to the query
+    order = np.argsort(-(vectors @ query), kind="stable")
+    ranked = [ids[i] for i in order]
+    user = client.table("users").insert({"name": marker, "seen": []}).execute().data[0]
+    try:
+        yield client, query.astype(np.float32).tolist(), ranked, user["id"]
+    finally:
+        client.table("users").delete().eq("id", user["id"]).execute()
+        client.table("events").delete().in_("id", ids).execute()
+
+
+def match(client, query, user_id, k, unsaved=()):
+    data = client.rpc("match_events", {
+        "query_embedding": query,
+        "p_matcha_mode": True,
+        "p_seen": list(unsaved),
+        "match_count": k,
+        "p_user_id": user_id,
+    }).execute().data
+    return [row["id"] for row in data], [row["similarity"] for row in data]
+
+
+def set_seen(client, user_id, seen):
+    client.table("users").update({"seen": seen}).eq("id", user_id).execute()
+
+
+def test_returns_nearest_events_in_order(seeded):
+    client, query, ranked, user_id = seeded
+    set_seen(client, user_id, [])
+    ids, similarities = match(client, query, user_id, 10)
+    assert ids == ranked[:10]
+    assert similarities == sorted(similarities, reverse=True)
+
+
+def test_excludes_stored_seen_list(seeded):
+    client, query, ranked, user_id = seeded
+    # A heavy swiper has seen the closest matches: the filter must not leave
+    # the page short
+    set_seen(client, user_id, ranked[:45])
+    ids, _ = match(client, query, user_id, 10)
+    assert ids == ranked[45:55]
+
+
+def test_excludes_unsaved_seen_ids(seeded):
+    client, query, ranked, user_id = seeded
+    set_seen(client, user_id, ranked[:5])
+    ids, _ = match(client, query, user_id, 10, unsaved=ranked[5:10])
+    assert ids == ranked[10:20]
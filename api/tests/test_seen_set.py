@@ -0,0 +1,94 @@
+"""SeenSet encoding and operations, and SeenSetCache resumption."""
+
+import numpy as np
+import pytest
+
+from engine.seen_set import SeenSet, SeenSetCache
+
+
+@pytest.mark.parametrize("ids", [
+    [],
+    [0],
+    [5, 3, 5, 1],
+    [127, 128, 16383, 16384, 2 ** 31, 2 ** 62],
+    list(np.random.default_rng(0).integers(0, 10 ** 6, 5000)),
+])
+def test_round_trips(ids):
+    seen = SeenSet(ids)
+    assert seen.ids.tolist() == sorted(set(int(i) for i in ids))
+    assert SeenSet.from_bytes(seen.to_bytes()).ids.tolist() == seen.ids.tolist()
+    assert SeenSet.decode(seen.encode()).ids.tolist() == seen.ids.tolist()
+
+
+def test_encoding_is_compact():
+    ids = np.arange(1, 20001) * 3
+    # Small deltas take one varint byte each, after the 8 byte header
+    assert len(SeenSet(ids).to_bytes()) == 8 + len(ids)
+
+
+def test_rejects_bad_input():
+    with pytest.raises(ValueError):
+        SeenSet([-1]).to_bytes()
+    with pytest.raises(ValueError):
+        SeenSet.from_bytes(b"CS")
+    with pytest.raises(ValueError):
+        SeenSet.from_bytes(b"XX" + SeenSet([1]).to_bytes()[2:])
+    with pytest.raises(ValueError):
+        SeenSet.from_bytes(SeenSet([1, 2, 3]).to_bytes()[:-1])
+
+
+def test_membership_and_mask():
+    seen = SeenSet([10, 2, 7])
+    assert 7 in seen and 3 not in seen and 11 not in seen
+    assert seen.mask([1, 2, 7, 10, 11]).tolist() == [False, True, True, True, False]
+    assert SeenSet().mask([1, 2]).tolist() == [False, False]
+    assert seen.mask([]).tolist() == []
+    assert list(seen) == [2, 7, 10]
+
+
+def test_add_and_union():
+    seen = SeenSet([5, 1])
+    assert seen.add(3) is True
+    assert seen.add(3) is False
+    assert seen.ids.tolist() == [1, 3, 5]
+
+    bigger = seen.union([9, 1])
+    assert bigger.ids.tolist() == [1, 3, 5, 9]
+    assert seen.ids.tolist() == [1, 3, 5]
+    assert seen.union([]).ids.tolist() == [1, 3, 5]
+
+
+def test_cache_resume_from():
+    cache = SeenSetCache()
+    seen, covered = cache.resume_from(1, 4)
+    assert (len(seen), covered) == (0, 0)
+
+    cache.put(1, SeenSet([1, 2, 3, 4]), 4)
+    seen, covered = cache.resume_from(1, 4)
+    assert covered == 4 and len(seen) == 4
+
+    # The user swiped since: load the tail from entry 5 on
+    assert cache.resume_from(1, 6)[1] == 4
+
+    # The cache is ahead of the row read (lagging replica): keep the cached set
+    seen, covered = cache.resume_from(1, 2)
+    assert covered == 4 and seen.ids.tolist() == [1, 2, 3, 4]
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["tail_loads"], stats["full_loads"]) == (2, 1, 1)
+
+
+def test_cache_keeps_the_fresher_entry_and_evicts_lru():
+    cache = SeenSetCache(max_entries=2)
+    cache.put(1, SeenSet([1, 2, 3]), 3)
+    cache.put(1, SeenSet([1]), 1)
+    assert cache.get(1)[1] == 3
+
+    cache.put(2, SeenSet([1]), 1)
+    cache.get(1)
+    cache.put(3, SeenSet([1]), 1)
+    assert cache.get(2) is None
+    assert cache.get(1) is not None
+
+    cache.invalidate(1)
+    assert cache.get(1) is None
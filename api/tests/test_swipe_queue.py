@@ -0,0 +1,176 @@
+"""SwipeQueue journal replay, ingest_id dedupe, dead-lettering and pending reads."""
+
+import fcntl
+import json
+import os
+import time
+
+from engine.swipe_queue import SwipeQueue
+
+
+class Store:
+    """Stands in for record_swipes: keeps rows, ignores ingest_ids it already has."""
+
+    def __init__(self, fail=lambda batch: None):
+        self.rows = {}
+        self.fail = fail
+        self.calls = []
+
+    def flush(self, batch):
+        self.calls.append(batch)
+        self.fail(batch)
+        for record in batch:
+            self.rows.setdefault(record["ingest_id"], record)
+
+
+def swipe(user_id, event_id, liked=True):
+    return {"user_id": user_id, "event_id": event_id, "time_spent": 1.0, "liked": liked, "matcha_mode": False}
+
+
+def write_journal(path, records, committed=None):
+    with open(path, "w", encoding="utf-8") as f:
+        for seq, record in enumerate(records, start=1):
+            f.write(json.dumps(dict(record, seq=seq)) + "\n")
+    if committed is not None:
+        with open(path + ".committed", "w", encoding="utf-8") as f:
+            f.write(str(committed))
+
+
+def test_flushes_in_batches_without_seq(tmp_path):
+    store = Store()
+    queue = SwipeQueue(store.flush, str(tmp_path / "swipes"), flush_size=2, flush_interval=0.01)
+    queue.start()
+    ids = [queue.put(swipe(1, event_id)) for event_id in range(5)]
+    queue.stop()
+
+    assert sorted(store.rows) == sorted(ids)
+    assert all("seq" not in record for batch in store.calls for record in batch)
+    assert queue.stats()["flushed"] == 5
+    # Drained: the journal is truncated
+    assert os.path.getsize(tmp_path / f"swipes.{os.getpid()}") == 0
+
+
+def test_replays_uncommitted_records_of_a_dead_worker(tmp_path):
+    base = str(tmp_path / "swipes")
+    records = [dict(swipe(1, event_id), ingest_id=f"id-{event_id}") for event_id in range(4)]
+    write_journal(f"{base}.999999", records, committed=2)
+    with open(f"{base}.999999", "a", encoding="utf-8") as f:
+        f.write('{"user_id": 1, "event_')  # torn last line
+
+    store = Store()
+    queue = SwipeQueue(store.flush, base, flush_interval=0.01)
+    queue.start()
+    queue.stop()
+
+    assert sorted(store.rows) == ["id-2", "id-3"]
+    assert not os.path.exists(f"{base}.999999")
+    assert not os.path.exists(f"{base}.999999.committed")
+
+
+def test_replay_keeps_ingest_id_so_a_repeated_batch_is_deduplicated(tmp_path):
+    base = str(tmp_path / "swipes")
+    store = Store()
+    # Crash between the database commit and the checkpoint: the store has the
+    # row, the journal does not know it was flushed
+    record = dict(swipe(1, 7), ingest_id="already-written")
+    store.flush([record])
+    write_journal(f"{base}.{os.getpid()}", [record])
+
+    queue = SwipeQueue(store.flush, base, flush_interval=0.01)
+    queue.start()
+    queue.stop()
+
+    assert store.calls[-1][0]["ingest_id"] == "already-written"
+    assert list(store.rows) == ["already-written"]
+
+
+def test_does_not_adopt_a_journal_held_by_a_live_worker(tmp_path):
+    base = str(tmp_path / "swipes")
+    write_journal(f"{base}.999998", [dict(swipe(1, 1), ingest_id="live")])
+
+    with open(f"{base}.999998", "r+", encoding="utf-8") as held:
+        fcntl.flock(held.fileno(), fcntl.LOCK_EX)
+        store = Store()
+        queue = SwipeQueue(store.flush, base, flush_interval=0.01)
+        queue.start()
+        queue.stop()
+
+    assert store.rows == {}
+    assert os.path.exists(f"{base}.999998")
+
+
+def test_unflushed_swipes_survive_a_stop_during_an_outage(tmp_path):
+    base = str(tmp_path / "swipes")
+
+    def outage(batch):
+        raise ConnectionError("database unreachable")
+
+    queue = SwipeQueue(Store(outage).flush, base, flush_interval=0.01, retry_backoff=0.01)
+    queue.start()
+    ingest_id = queue.put(swipe(1, 1))
+    queue.stop()
+
+    store = Store()
+    queue = SwipeQueue(store.flush, base, flush_interval=0.01)
+    queue.start()
+    queue.stop()
+    assert list(store.rows) == [ingest_id]
+
+
+def test_rejected_swipes_are_dead_lettered(tmp_path):
+    base = str(tmp_path / "swipes")
+
+    def reject_event_2(batch):
+        if any(record["event_id"] == 2 for record in batch):
+            raise ValueError("violates foreign key constraint")
+
+    store = Store(reject_event_2)
+    queue = SwipeQueue(store.flush, base, flush_size=10, flush_interval=0.01,
+                       rejects=lambda e: isinstance(e, ValueError))
+    queue.start()
+    for event_id in range(4):
+        queue.put(swipe(1, event_id))
+    queue.stop()
+
+    assert sorted(record["event_id"] for record in store.rows.values()) == [0, 1, 3]
+    with open(base + ".dead", encoding="utf-8") as f:
+        dead = [json.loads(line) for line in f]
+    assert [record["event_id"] for record in dead] == [2]
+    assert "foreign key" in dead[0]["error"]
+    assert queue.stats()["dead_lettered"] == 1
+
+
+def test_gives_up_after_max_attempts(tmp_path):
+    base = str(tmp_path / "swipes")
+
+    def outage(batch):
+        raise ConnectionError("database unreachable")
+
+    store = Store(outage)
+    queue = SwipeQueue(store.flush, base, flush_size=2, flush_interval=5, retry_backoff=0.001, max_attempts=3)
+    queue.start()
+    queue.put(swipe(1, 1))
+    queue.put(swipe(1, 2))
+    deadline = time.monotonic() + 5
+    while queue.stats()["pending"] and time.monotonic() < deadline:
+        time.sleep(0.01)
+    queue.stop()
+
+    stats = queue.stats()
+    assert stats["failed_flushes"] == 2
+    assert stats["dead_lettered"] == 2
+    assert stats["pending"] == 0
+
+
+def test_pending_for_returns_one_users_unflushed_swipes(tmp_path):
+    store = Store()
+    queue = SwipeQueue(store.flush, None, flush_size=100, flush_interval=60)
+    queue.put(swipe(1, 10))
+    queue.put(swipe(2, 11))
+    queue.put(swipe(1, 12, liked=False))
+
+    pending = queue.pending_for(1)
+    assert [(record["event_id"], record["liked"]) for record in pending] == [(10, True), (12, False)]
+    pending[0]["event_id"] = 99
+    assert queue.pending_for(1)[0]["event_id"] == 10
+    assert queue.pending_for(3) == []